@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量任务执行器
+把文件分块提交到进程池（或线程池）并行处理，每完成一个分块就产出其结果；
+同时在处理中的分块数有上限，已产出的分块不再保留，内存占用与文件数无关
+
+进程池适合解码、重写等CPU密集的任务；处理网络共享盘上的文件时大部分时间在等待I/O，
+线程池没有进程启动和参数序列化的开销，通常更快
+"""
+
+import os
+import itertools
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# 每个工作进程最多同时排队的分块数
+CHUNKS_PER_WORKER = 2
+
+
+def default_workers():
+    """默认工作进程数：CPU核心数"""
+    return os.cpu_count() or 1
+
+
+def default_chunksize(total, workers):
+    """根据文件数和进程数估算分块大小，保证每个进程能分到多个分块以均衡负载"""
+    if workers <= 1:
+        return 1
+    return max(1, min(32, total // (workers * 8)))
+
+
+def _run_chunk(func, start, chunk):
+    """在工作进程中依次处理一个分块，返回 [(序号, 是否成功, 结果或错误信息), ...]"""
+    results = []
+    for offset, filepath in enumerate(chunk):
+        try:
+            results.append((start + offset, True, func(filepath)))
+        except Exception as e:
+            results.append((start + offset, False, str(e)))
+    return results
+
+
+def iter_batch(func, files, workers=None, chunksize=None, use_threads=False):
+    """并行处理文件，按完成顺序产出 (序号, 是否成功, 结果或错误信息)
+
+    使用进程池时 func 必须是模块级函数，以便传递给工作进程；use_threads为True时改用线程池，
+    func 必须是线程安全的。workers为1时在当前线程中顺序执行
+    """
+    files = list(files)
+    workers = workers or default_workers()
+    if chunksize is None:
+        chunksize = default_chunksize(len(files), workers)
+
+    if workers <= 1 or len(files) <= 1:
+        for index, filepath in enumerate(files):
+            yield from _run_chunk(func, index, [filepath])
+        return
+
+    executor_class = ThreadPoolExecutor if use_threads else ProcessPoolExecutor
+    workers = min(workers, len(files))
+    chunks = ((start, files[start:start + chunksize]) for start in range(0, len(files), chunksize))
+    with executor_class(max_workers=workers) as executor:
+        pending = {executor.submit(_run_chunk, func, start, chunk)
+                   for start, chunk in itertools.islice(chunks, workers * CHUNKS_PER_WORKER)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for start, chunk in itertools.islice(chunks, len(done)):
+                pending.add(executor.submit(_run_chunk, func, start, chunk))
+            for future in done:
+                yield from future.result()
+
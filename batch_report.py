@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量处理报告
+每处理完一个文件就生成一条记录（路径、类型、发现和删除的元数据、处理前后大小、耗时），
+并立即追加写入JSON Lines或CSV报告文件，内存占用与文件数无关；
+报告中已成功的文件可在中断后重新运行时跳过
+"""
+
+import os
+import csv
+import json
+import time
+import heapq
+import hashlib
+import functools
+
+import metadata_engine as engine
+import batch_executor
+import scan_cache
+import dedup
+
+REPORT_FIELDS = ('path', 'action', 'type', 'ok', 'fields_found', 'fields_removed',
+                 'bytes_before', 'bytes_after', 'elapsed', 'result', 'error', 'cached', 'duplicate_of')
+
+REPORT_FORMATS = ('jsonl', 'csv')
+
+# 无法识别文件类型时的错误信息，对应记录的 type 为None
+UNSUPPORTED_ERROR = "不支持的文件类型"
+
+# CSV中列表字段的分隔符
+CSV_LIST_SEPARATOR = ';'
+
+# 按输入顺序产出时最多暂存的记录数；超出后不再等待最前面未完成的文件，它完成后立即产出
+REORDER_WINDOW = 4096
+
+
+def make_row(filepath, action, **values):
+    """生成一条报告记录，未给出的字段为None；未给出 type 时按扩展名确定，不读取文件"""
+    handler = engine.get_handler(filepath)
+    row = {field: None for field in REPORT_FIELDS}
+    row.update(path=filepath, action=action, type=handler.name if handler else None, ok=True,
+               cached=False)
+    row.update(values)
+    if row['elapsed'] is not None:
+        row['elapsed'] = round(row['elapsed'], 6)
+    return row
+
+
+def handler_name(handler):
+    return handler.name if handler else None
+
+
+def failure_row(filepath, action, error):
+    if error == UNSUPPORTED_ERROR:
+        return make_row(filepath, action, type=None, ok=False, error=error)
+    return make_row(filepath, action, ok=False, error=error)
+
+
+def probe_row(filepath):
+    """快速探测，返回报告记录"""
+    started = time.perf_counter()
+    size = os.path.getsize(filepath)
+    handler, header = engine.sniff_handler(filepath)
+    flags = engine.probe_metadata(filepath, handler, header)
+    return make_row(filepath, 'probe', type=handler_name(handler),
+                    fields_found=sorted(flags) if flags is not None else None,
+                    bytes_before=size, bytes_after=size,
+                    elapsed=time.perf_counter() - started,
+                    result=engine.format_probe_info(filepath, flags))
+
+
+def inspect_row(filepath):
+    """读取属性摘要，返回报告记录"""
+    started = time.perf_counter()
+    size = os.path.getsize(filepath)
+    handler = engine.detect_handler(filepath)
+    record = engine.read_metadata(filepath, engine.SUMMARY_OPTIONS, handler)
+    found = None
+    if record is not None and not record.error:
+        found = sorted(record.fields) + sorted(record.flags)
+    return make_row(filepath, 'inspect', type=handler_name(handler), fields_found=found,
+                    bytes_before=size, bytes_after=size,
+                    elapsed=time.perf_counter() - started,
+                    result=engine.format_summary_info(filepath, size, record))
+
+
+def clear_row(filepath, options=engine.DEFAULT_OPTIONS):
+    """清除属性，返回报告记录；失败或无法识别文件类型时抛出异常
+
+    清除前不另行扫描，fields_found 为None
+    """
+    handler = engine.detect_handler(filepath)
+    if handler is None:
+        raise ValueError(UNSUPPORTED_ERROR)
+    result = engine.scrub_file(filepath, options, handler)
+    return make_row(filepath, 'clear', type=handler.name, fields_removed=result.removed,
+                    bytes_before=result.bytes_before, bytes_after=result.bytes_after,
+                    elapsed=result.elapsed, result=result.message)
+
+
+ROW_BUILDERS = {
+    'probe': probe_row,
+    'inspect': inspect_row,
+    'clear': clear_row,
+}
+
+
+def cached_row(action, filepath, entry):
+    """由扫描缓存记录生成报告记录，不读取文件内容"""
+    size = os.path.getsize(filepath)
+    if action == 'probe':
+        flags = entry['flags']
+        return make_row(filepath, action, fields_found=sorted(flags), bytes_before=size,
+                        bytes_after=size, elapsed=0.0, cached=True,
+                        result=engine.format_probe_info(filepath, flags))
+    return make_row(filepath, action, fields_removed=[], bytes_before=size,
+                    bytes_after=size, elapsed=0.0, cached=True,
+                    result=scan_cache.CACHED_SCRUBBED_MESSAGE)
+
+
+def copied_row(row, representative, filepath, size):
+    """去重时由代表文件的记录生成重复文件的记录"""
+    copied = dict(row)
+    copied.update(path=filepath, bytes_before=size, bytes_after=os.path.getsize(filepath),
+                  elapsed=0.0, duplicate_of=representative,
+                  result=dedup.describe_copy(row['result'], representative, filepath, size))
+    return copied
+
+
+def _in_input_order(rows, window=REORDER_WINDOW):
+    """把按完成顺序产出的 (序号, 记录) 调整为按序号顺序，先完成的记录暂存到前面的文件完成为止
+
+    暂存的记录超过 window 条时按序号产出最小的一条，跳过的文件完成后不再排序，立即产出
+    """
+    buffered = {}
+    waiting = []
+    next_index = 0
+    for index, row in rows:
+        if index < next_index:
+            yield index, row
+            continue
+        buffered[index] = row
+        heapq.heappush(waiting, index)
+        while waiting and (waiting[0] == next_index or len(buffered) > window):
+            index = heapq.heappop(waiting)
+            yield index, buffered.pop(index)
+            next_index = index + 1
+    while waiting:
+        index = heapq.heappop(waiting)
+        yield index, buffered.pop(index)
+
+
+def iter_rows(action, files, workers, chunksize=None, options=engine.DEFAULT_OPTIONS, cache=None,
+              dedup_stats=None, use_threads=False, ordered=False):
+    """批量处理文件，产出 (序号, 报告记录)
+
+    ordered为False时按完成顺序产出，各次运行的顺序不固定；为True时按输入顺序产出，
+    但个别文件处理过慢、其后已有 REORDER_WINDOW 条记录完成时，该文件的记录在完成时才产出。
+    提供 cache 时，缓存命中的文件直接由缓存生成记录，不再提交给工作进程；
+    清除时提供 dedup_stats 字典则内容相同的文件只处理一次，去重统计写入该字典
+    """
+    rows = _iter_rows_completed(action, files, workers, chunksize, options, cache, dedup_stats,
+                                use_threads)
+    return _in_input_order(rows) if ordered else rows
+
+
+def _iter_rows_completed(action, files, workers, chunksize, options, cache, dedup_stats, use_threads):
+    pending = list(range(len(files)))
+    if cache is not None and action in ('probe', 'clear'):
+        hits, pending = scan_cache.partition(cache, files, action)
+        for index, entry in hits:
+            yield index, cached_row(action, files[index], entry)
+
+    func = ROW_BUILDERS[action]
+    if action == 'clear':
+        func = functools.partial(func, options=options)
+    pending_files = [files[index] for index in pending]
+    if action == 'clear' and dedup_stats is not None:
+        results = dedup.iter_deduplicated(func, pending_files, workers, chunksize, dedup_stats,
+                                          use_threads, describe=copied_row,
+                                          durability=options.durability)
+    else:
+        results = batch_executor.iter_batch(func, pending_files, workers, chunksize, use_threads)
+
+    for index, ok, value in results:
+        filepath = pending_files[index]
+        if not ok:
+            yield pending[index], failure_row(filepath, action, value)
+            continue
+        if cache is not None:
+            found = value['fields_found']
+            scan_cache.record_result(cache, action, filepath, set(found) if found is not None else None)
+        yield pending[index], value
+
+
+def guess_format(path):
+    """根据扩展名判断报告格式，默认JSON Lines"""
+    return 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+
+def _path_key(filepath):
+    """报告中已完成路径的紧凑键，避免在内存中保存完整路径"""
+    return hashlib.blake2b(filepath.encode('utf-8', 'surrogatepass'), digest_size=8).digest()
+
+
+def _trim_partial_line(path):
+    """删除中断时写了一半的最后一行"""
+    with open(path, 'rb+') as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size == 0:
+            return
+        position = size
+        while position > 0:
+            step = min(64 * 1024, position)
+            f.seek(position - step)
+            block = f.read(step)
+            newline = block.rfind(b'\n')
+            if newline >= 0:
+                end = position - step + newline + 1
+                if end != size:
+                    f.truncate(end)
+                return
+            position -= step
+        f.truncate(0)
+
+
+class CompletedFiles:
+    """报告中已成功处理的文件集合，按路径哈希保存"""
+
+    def __init__(self):
+        self._keys = set()
+
+    def add(self, filepath):
+        self._keys.add(_path_key(filepath))
+
+    def __contains__(self, filepath):
+        return _path_key(filepath) in self._keys
+
+    def __len__(self):
+        return len(self._keys)
+
+
+def load_completed(path, report_format=None):
+    """读取已有报告，返回其中成功处理的文件集合；报告不存在时返回空集合"""
+    completed = CompletedFiles()
+    if not os.path.exists(path):
+        return completed
+    report_format = report_format or guess_format(path)
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if report_format == 'csv':
+            for row in csv.DictReader(f):
+                if row.get('ok') == 'True' and row.get('path'):
+                    completed.add(row['path'])
+        else:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue
+                if row.get('ok') and row.get('path'):
+                    completed.add(row['path'])
+    return completed
+
+
+class ReportWriter:
+    """把报告记录逐条追加写入JSON Lines或CSV文件
+
+    resume为True时在已有报告末尾继续写入（先删除中断时写了一半的行），否则覆盖旧报告
+    """
+
+    def __init__(self, path, report_format=None, resume=False):
+        self.path = path
+        self.report_format = report_format or guess_format(path)
+        if self.report_format not in REPORT_FORMATS:
+            raise ValueError(f"不支持的报告格式: {self.report_format}")
+
+        appending = resume and os.path.exists(path) and os.path.getsize(path) > 0
+        fieldnames = REPORT_FIELDS
+        if appending:
+            _trim_partial_line(path)
+            appending = os.path.getsize(path) > 0
+        if appending and self.report_format == 'csv':
+            # 续写旧版本生成的CSV时沿用其表头，各行的列保持一致
+            with open(path, 'r', encoding='utf-8', newline='') as f:
+                fieldnames = next(csv.reader(f), None) or REPORT_FIELDS
+        self._file = open(path, 'a' if appending else 'w', encoding='utf-8', newline='')
+        self._csv = None
+        if self.report_format == 'csv':
+            self._csv = csv.DictWriter(self._file, fieldnames=fieldnames, extrasaction='ignore')
+            if not appending:
+                self._csv.writeheader()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, row):
+        """写入一条记录并立即刷新到文件"""
+        if self._csv is not None:
+            values = dict(row)
+            for field in ('fields_found', 'fields_removed'):
+                if values.get(field) is not None:
+                    values[field] = CSV_LIST_SEPARATOR.join(values[field])
+            # 每条记录占一行，中断后续写时按行截断不会破坏记录
+            for field in ('result', 'error'):
+                if values.get(field):
+                    values[field] = values[field].replace('\n', ' | ')
+            self._csv.writerow(values)
+        else:
+            self._file.write(json.dumps(row, ensure_ascii=False) + '\n')
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
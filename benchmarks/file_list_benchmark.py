@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文件列表加载基准测试
+在临时目录中生成大量空文件，测量“添加文件夹”从开始到界面可交互、
+到全部文件显示完成所需的时间，以及加载期间主线程最长的无响应时间
+
+用法:
+    python benchmarks/file_list_benchmark.py [--files 100000]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+# 主线程心跳间隔（毫秒），两次心跳之间的最大间隔即最长无响应时间
+HEARTBEAT_INTERVAL = 5
+
+EXTENSIONS = ['.jpg', '.png', '.pdf', '.docx']
+
+
+def create_files(directory, count, per_dir=1000):
+    """生成 count 个空文件，每个子目录最多 per_dir 个"""
+    for index in range(count):
+        subdir = os.path.join(directory, f"d{index // per_dir:04d}")
+        if index % per_dir == 0:
+            os.makedirs(subdir)
+        open(os.path.join(subdir, f"f{index:06d}{EXTENSIONS[index % len(EXTENSIONS)]}"), 'wb').close()
+
+
+def run(directory, expected):
+    """加载目录并返回 (可交互耗时, 首批显示耗时, 全部完成耗时, 最长无响应时间, 全选耗时, 读取选中耗时)，单位秒"""
+    import metadata_engine as engine
+    import file_properties_manager_crossplatform as gui
+
+    app = gui.FilePropertiesManager()
+    app.root.update()
+    timings = {}
+    last_beat = [None]
+    max_gap = [0.0]
+
+    def heartbeat():
+        now = time.perf_counter()
+        if last_beat[0] is not None:
+            max_gap[0] = max(max_gap[0], now - last_beat[0])
+        last_beat[0] = now
+        if 'first_row' not in timings and len(app.file_model):
+            timings['first_row'] = now - started
+        if len(app.file_model) >= expected and not app.insert_scheduled:
+            timings['done'] = now - started
+            app.root.quit()
+            return
+        app.root.after(HEARTBEAT_INTERVAL, heartbeat)
+
+    started = time.perf_counter()
+    app.load_files_async(engine.iter_supported_files([directory]))
+    timings['interactive'] = time.perf_counter() - started
+    app.root.after(0, heartbeat)
+    app.root.mainloop()
+
+    started = time.perf_counter()
+    app.select_all_files()
+    select_all = time.perf_counter() - started
+    started = time.perf_counter()
+    app.get_selected_files()
+    get_selected = time.perf_counter() - started
+    app.root.destroy()
+    return (timings['interactive'], timings.get('first_row'), timings['done'], max_gap[0],
+            select_all, get_selected)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="文件列表加载基准测试")
+    parser.add_argument('--files', type=int, default=100000, help="生成的文件数（默认: 100000）")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        started = time.perf_counter()
+        create_files(temp_dir, args.files)
+        print(f"生成 {args.files} 个文件: {time.perf_counter() - started:.2f} s")
+
+        try:
+            interactive, first_row, done, max_gap, select_all, get_selected = run(temp_dir, args.files)
+        except Exception as e:
+            print(f"跳过 ({e})")
+            return
+
+    print(f"开始加载到可交互: {interactive * 1000:.1f} ms")
+    if first_row is not None:
+        print(f"首批文件显示: {first_row * 1000:.1f} ms")
+    print(f"全部 {args.files} 个文件显示完成: {done:.2f} s")
+    print(f"加载期间主线程最长无响应: {max_gap * 1000:.1f} ms")
+    print(f"全选: {select_all * 1000:.1f} ms, 读取选中文件: {get_selected * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+启动时间基准测试
+测量导入引擎、命令行处理单张图片以及从启动到主窗口首次绘制完成所需的时间，
+并检查每个场景实际加载了哪些重量级依赖（PIL、PyMuPDF、python-docx、lxml）
+
+用法:
+    python benchmarks/startup_benchmark.py [--runs 5]
+"""
+
+import os
+import sys
+import time
+import json
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ['PIL', 'fitz', 'pymupdf', 'docx', 'lxml']
+
+# 每个场景在子进程中执行，完成后打印已加载的重量级模块
+REPORT_MODULES = (
+    "import sys, json\n"
+    f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))\n"
+)
+
+SCENARIOS = {
+    '导入引擎': (
+        "import metadata_engine\n"
+    ),
+    '查看单张图片': (
+        "import metadata_engine\n"
+        "metadata_engine.get_file_summary_info(IMAGE_PATH)\n"
+    ),
+    '启动到主窗口': (
+        "import file_properties_manager_crossplatform as gui\n"
+        "app = gui.FilePropertiesManager()\n"
+        "app.root.update()\n"
+        "app.root.destroy()\n"
+    ),
+}
+
+
+def create_sample_image(directory):
+    """生成一个最小的JPEG文件（不依赖PIL）"""
+    path = os.path.join(directory, 'sample.jpg')
+    with open(path, 'wb') as f:
+        f.write(bytes.fromhex(
+            'ffd8ffe000104a46494600010100000100010000'
+            'ffdb004300' + '01' * 64 +
+            'ffc0000b080001000101011100'
+            'ffc4001f0000010501010101010100000000000000000102030405060708090a0b'
+            'ffda0008010100003f00d2cf20ffd9'))
+    return path
+
+
+def run_scenario(code, image_path):
+    """在新的解释器中执行一次场景，返回 (耗时秒数, 已加载的重量级模块) ；失败返回 (None, 错误信息)"""
+    script = f"IMAGE_PATH = {image_path!r}\n" + code + REPORT_MODULES
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-W', 'ignore', '-c', script],
+                            cwd=PROJECT_DIR, capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        return None, result.stderr.strip().splitlines()[-1] if result.stderr else "未知错误"
+    return elapsed, json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="启动时间基准测试")
+    parser.add_argument('--runs', type=int, default=5, help="每个场景重复次数（默认: 5）")
+    args = parser.parse_args(argv)
+
+    baseline, _ = run_scenario("", "")
+    print(f"空解释器启动: {baseline * 1000:.1f} ms\n")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        image_path = create_sample_image(temp_dir)
+        for name, code in SCENARIOS.items():
+            timings = []
+            modules = []
+            for _ in range(args.runs):
+                elapsed, modules = run_scenario(code, image_path)
+                if elapsed is None:
+                    break
+                timings.append(elapsed)
+
+            if not timings:
+                print(f"{name}: 跳过 ({modules})")
+                continue
+            median = statistics.median(timings)
+            print(f"{name}: 中位数 {median * 1000:.1f} ms "
+                  f"(最快 {min(timings) * 1000:.1f} ms, 共 {len(timings)} 次)")
+            print(f"  已加载的依赖: {', '.join(modules) if modules else '无'}")
+
+
+if __name__ == "__main__":
+    main()
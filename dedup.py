@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内容去重
+先按文件大小、再按流式哈希把内容完全相同的文件分组，每组只清除一个代表文件，
+清除结果以reflink（支持时）或普通复制的方式写到组内其余路径
+"""
+
+import os
+import hashlib
+import functools
+
+import batch_executor
+import safe_writer
+from metadata_engine import format_file_size
+
+HASH_BUFFER_SIZE = 1024 * 1024
+
+# 先比较文件开头的哈希，开头不同的同大小文件无需完整读取
+HEAD_HASH_SIZE = 64 * 1024
+
+CHANGED_ERROR = "文件在分组后已被修改，未复制清除结果"
+
+
+def hash_file(filepath, limit=None):
+    """流式计算文件内容的BLAKE2b哈希；limit不为None时只读取开头 limit 字节"""
+    digest = hashlib.blake2b(digest_size=32)
+    remaining = limit
+    with open(filepath, 'rb') as f:
+        while remaining is None or remaining > 0:
+            size = HASH_BUFFER_SIZE if remaining is None else min(HASH_BUFFER_SIZE, remaining)
+            data = f.read(size)
+            if not data:
+                break
+            digest.update(data)
+            if remaining is not None:
+                remaining -= len(data)
+    return digest.hexdigest()
+
+
+def _split_by_hash(paths, func, workers, use_threads=False):
+    """按 func 计算的哈希把路径分组；无法读取的文件各自单独成组"""
+    buckets = {}
+    singles = []
+    for index, ok, value in batch_executor.iter_batch(func, paths, workers, use_threads=use_threads):
+        if ok:
+            buckets.setdefault(value, []).append(paths[index])
+        else:
+            singles.append([paths[index]])
+    return list(buckets.values()) + singles
+
+
+def file_signature(filepath):
+    """文件的 (大小, 修改时间ns, inode)，用于判断分组之后文件是否被改动"""
+    stat = os.stat(filepath)
+    return stat.st_size, stat.st_mtime_ns, stat.st_ino
+
+
+def group_duplicates(files, workers=1, use_threads=False):
+    """把内容相同的文件分为一组，返回 (分组列表, 读取的字节数, {路径: 分组前的 file_signature})
+
+    每组的第一个路径为代表文件；分组按代表文件在输入中的顺序排列，组内保持输入顺序；
+    无法读取的文件不在签名字典中
+    """
+    order = {filepath: index for index, filepath in enumerate(files)}
+    signatures = {}
+    by_size = {}
+    for filepath in files:
+        try:
+            signatures[filepath] = file_signature(filepath)
+            size = signatures[filepath][0]
+        except OSError:
+            size = None
+        by_size.setdefault(size, []).append(filepath)
+
+    groups = []
+    hashed_bytes = 0
+    for size, paths in by_size.items():
+        if size is None or len(paths) == 1:
+            groups.extend([filepath] for filepath in paths)
+            continue
+        candidates = [paths]
+        if size > HEAD_HASH_SIZE:
+            candidates = _split_by_hash(
+                paths, functools.partial(hash_file, limit=HEAD_HASH_SIZE), workers, use_threads)
+            hashed_bytes += HEAD_HASH_SIZE * len(paths)
+        for candidate in candidates:
+            if len(candidate) == 1:
+                groups.append(candidate)
+                continue
+            groups.extend(_split_by_hash(candidate, hash_file, workers, use_threads))
+            hashed_bytes += size * len(candidate)
+
+    for group in groups:
+        group.sort(key=order.__getitem__)
+    groups.sort(key=lambda group: order[group[0]])
+    return groups, hashed_bytes, signatures
+
+
+def materialize(src_path, dst_path, durability=safe_writer.DURABILITY_FILE):
+    """把 src_path 的内容原子地写到 dst_path，保留 dst_path 原有的权限位、属主和扩展属性"""
+    with safe_writer.AtomicOutput(dst_path, durability) as output:
+        safe_writer.clone_file(src_path, output.path)
+
+
+def describe_copy(value, representative, filepath, size):
+    """重复文件的结果：在代表文件的结果描述后注明复制来源"""
+    return f"{value}（与 {os.path.basename(representative)} 内容相同，已复制清除结果）"
+
+
+def iter_deduplicated(func, files, workers=None, chunksize=None, stats=None, use_threads=False,
+                      describe=describe_copy, durability=safe_writer.DURABILITY_FILE):
+    """对每组内容相同的文件只调用一次 func，按完成顺序产出 (序号, 是否成功, 结果或错误信息)
+
+    代表文件处理成功后，其结果复制到组内其余文件，这些文件的结果由
+    describe(代表文件结果, 代表文件路径, 文件路径, 原文件大小) 生成；提供 stats 字典时写入
+    groups（分组数）、duplicates（复制得到结果的文件数）、saved_bytes（免于处理的字节数）
+    和 hashed_bytes（分组时读取的字节数）；durability 为写入复制结果时的持久化级别。
+    复制前核对重复文件的大小、修改时间和inode，分组之后被改动过的文件不覆盖，记为失败
+    """
+    files = list(files)
+    groups, hashed_bytes, signatures = group_duplicates(files, workers or batch_executor.default_workers(),
+                                            use_threads)
+    index_of = {filepath: index for index, filepath in enumerate(files)}
+    representatives = [group[0] for group in groups]
+
+    if stats is not None:
+        stats.update(groups=len(groups), duplicates=0, saved_bytes=0, hashed_bytes=hashed_bytes)
+
+    for group_index, ok, value in batch_executor.iter_batch(func, representatives, workers, chunksize,
+                                                            use_threads):
+        group = groups[group_index]
+        yield index_of[group[0]], ok, value
+        for filepath in group[1:]:
+            if not ok:
+                yield index_of[filepath], False, value
+                continue
+            try:
+                size = signatures[filepath][0]
+                if file_signature(filepath) != signatures[filepath]:
+                    yield index_of[filepath], False, CHANGED_ERROR
+                    continue
+                materialize(group[0], filepath, durability)
+            except Exception as e:
+                yield index_of[filepath], False, f"复制清除结果失败: {str(e)}"
+                continue
+            if stats is not None:
+                stats['duplicates'] += 1
+                stats['saved_bytes'] += size
+            yield index_of[filepath], True, describe(value, group[0], filepath, size)
+
+
+def format_savings(stats):
+    """生成去重节省情况的说明文字"""
+    return (f"内容去重: {stats['groups']} 组，{stats['duplicates']} 个重复文件直接复制清除结果，"
+            f"节省处理 {format_file_size(stats['saved_bytes'])}"
+            f"（分组时读取 {format_file_size(stats['hashed_bytes'])}）")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量文件列表模型
+以路径为键索引Treeview项目，并维护选中集合，
+添加、查找、选择、计数和移除都不需要遍历Treeview
+"""
+
+
+class FileListModel:
+    """批量文件列表：路径→Treeview项目ID的有序字典、反向索引和选中路径集合
+
+    模型本身不访问Tk，调用方负责在修改模型的同时更新Treeview
+    """
+
+    def __init__(self):
+        self._items = {}
+        self._paths = {}
+        self._selected = set()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, filepath):
+        return filepath in self._items
+
+    def __iter__(self):
+        """按添加顺序产出路径"""
+        return iter(self._items)
+
+    @property
+    def selected_count(self):
+        return len(self._selected)
+
+    def add(self, filepath, item):
+        """登记新添加的路径及其Treeview项目ID；路径已存在时返回False"""
+        if filepath in self._items:
+            return False
+        self._items[filepath] = item
+        self._paths[item] = filepath
+        return True
+
+    def remove(self, filepaths):
+        """移除路径，返回对应的Treeview项目ID列表"""
+        items = []
+        for filepath in filepaths:
+            item = self._items.pop(filepath, None)
+            if item is None:
+                continue
+            del self._paths[item]
+            self._selected.discard(filepath)
+            items.append(item)
+        return items
+
+    def item_of(self, filepath):
+        return self._items.get(filepath)
+
+    def path_of(self, item):
+        return self._paths.get(item)
+
+    def is_selected(self, filepath):
+        return filepath in self._selected
+
+    def set_selected(self, filepath, selected):
+        if selected:
+            self._selected.add(filepath)
+        else:
+            self._selected.discard(filepath)
+
+    def toggle(self, filepath):
+        """切换选择状态，返回切换后是否选中"""
+        selected = filepath not in self._selected
+        self.set_selected(filepath, selected)
+        return selected
+
+    def select_all(self):
+        self._selected = set(self._items)
+
+    def clear_selection(self):
+        self._selected.clear()
+
+    def selected_paths(self):
+        """按添加顺序返回选中的路径"""
+        if len(self._selected) == len(self._items):
+            return list(self._items)
+        return [filepath for filepath in self._items if filepath in self._selected]
+
+    def items(self):
+        """按添加顺序产出 (路径, Treeview项目ID)"""
+        return self._items.items()
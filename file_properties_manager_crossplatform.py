@@ -11,21 +11,41 @@ import sys
 import platform
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-from PIL import Image
-from PIL.ExifTags import TAGS
-import fitz  # PyMuPDF
-import docx
 import threading
 import traceback
-import subprocess
+import time
+import queue
+import collections
+import multiprocessing
 
-# 平台检测
-SYSTEM = platform.system()
-IS_WINDOWS = SYSTEM == "Windows"
-IS_MACOS = SYSTEM == "Darwin"
-IS_LINUX = SYSTEM == "Linux"
+import metadata_engine as engine
+import batch_executor
+import scan_cache
+import dedup
+import progress_channel
+import batch_report
+import job_journal
+from file_list_model import FileListModel
+from metadata_engine import IS_WINDOWS, IS_MACOS
 
 class FilePropertiesManager:
+    # PDF清除方式的显示名称
+    PDF_MODE_LABELS = {
+        engine.PDF_MODE_FULL: "完整重写",
+        engine.PDF_MODE_INCREMENTAL: "增量更新",
+        engine.PDF_MODE_COMPACT: "压缩重写",
+    }
+
+    # 文件列表后台加载：后台线程每批交给主线程的文件数，
+    # 主线程每次插入Treeview的时间预算（秒）和两次插入之间的间隔（毫秒）
+    FILE_LOAD_BATCH = 500
+    FILE_INSERT_BUDGET = 0.012
+    FILE_INSERT_INTERVAL = 15
+
+    # 批量处理结果的刷新间隔（毫秒，约20帧/秒）和结果文本框保留的最大行数
+    BATCH_FRAME_INTERVAL = 50
+    BATCH_TEXT_MAX_LINES = 100000
+    
     def __init__(self):
         self.root = tk.Tk()
         
@@ -41,11 +61,20 @@ class FilePropertiesManager:
         self.root.configure(bg='#f0f0f0')
         
         # 文件列表
-        self.file_list = []
-        self.selected_files = []
+        self.file_model = FileListModel()
+
+        # 后台加载的文件行：后台线程放入 file_queue，主线程取出后暂存在 pending_rows 中分批插入
+        self.file_queue = queue.Queue()
+        self.pending_rows = collections.deque()
+        self.loading_jobs = 0
+        self.load_failures = 0
+        self.insert_scheduled = False
         
         # 创建主框架
         self.create_widgets()
+
+        # 启动后检查上次中断的批量清除任务
+        self.root.after(200, self.check_unfinished_jobs)
         
         # 当前选中的文件路径（单文件模式）
         self.current_file = None
@@ -81,18 +110,63 @@ class FilePropertiesManager:
         batch_btn_frame.grid(row=2, column=0, columnspan=3, pady=5)
 
         ttk.Button(batch_btn_frame, text="批量添加文件", command=self.batch_add_files).pack(side=tk.LEFT, padx=5)
+        ttk.Button(batch_btn_frame, text="添加文件夹", command=self.add_folder).pack(side=tk.LEFT, padx=5)
         ttk.Button(batch_btn_frame, text="批量查看属性", command=self.batch_view_properties).pack(side=tk.LEFT, padx=5)
         ttk.Button(batch_btn_frame, text="一键批量清除", command=self.batch_clear_properties).pack(side=tk.LEFT, padx=5)
         ttk.Button(batch_btn_frame, text="移除已处理文件", command=self.remove_processed_files).pack(side=tk.LEFT, padx=5)
         ttk.Button(batch_btn_frame, text="全选", command=self.select_all_files).pack(side=tk.LEFT, padx=5)
         ttk.Button(batch_btn_frame, text="取消全选", command=self.deselect_all_files).pack(side=tk.LEFT, padx=5)
 
+        # 并行进程数
+        ttk.Label(batch_btn_frame, text="并行进程数:").pack(side=tk.LEFT, padx=(15, 2))
+        self.worker_count_var = tk.IntVar(value=batch_executor.default_workers())
+        ttk.Spinbox(batch_btn_frame, from_=1, to=max(64, batch_executor.default_workers()),
+                    textvariable=self.worker_count_var, width=4).pack(side=tk.LEFT)
+
+        # PDF清除方式
+        ttk.Label(batch_btn_frame, text="PDF清除方式:").pack(side=tk.LEFT, padx=(15, 2))
+        self.pdf_mode_var = tk.StringVar(value=self.PDF_MODE_LABELS[engine.PDF_MODE_FULL])
+        ttk.Combobox(batch_btn_frame, textvariable=self.pdf_mode_var, state='readonly', width=8,
+                     values=list(self.PDF_MODE_LABELS.values())).pack(side=tk.LEFT)
+
+        # 批量查看时只读取文件头尾快速检测
+        self.quick_probe_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(batch_btn_frame, text="快速检测",
+                        variable=self.quick_probe_var).pack(side=tk.LEFT, padx=(15, 0))
+
+        # 跳过自上次检测或清除后未变化的文件
+        self.use_cache_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(batch_btn_frame, text="使用扫描缓存",
+                        variable=self.use_cache_var).pack(side=tk.LEFT, padx=(15, 0))
+
+        # 批量清除时内容相同的文件只处理一次
+        self.dedup_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(batch_btn_frame, text="内容去重",
+                        variable=self.dedup_var).pack(side=tk.LEFT, padx=(15, 0))
+
+        # 网络共享盘等I/O密集场景使用线程池
+        self.use_threads_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(batch_btn_frame, text="线程模式",
+                        variable=self.use_threads_var).pack(side=tk.LEFT, padx=(15, 0))
+
+        # 批量处理报告
+        report_frame = ttk.Frame(top_frame)
+        report_frame.grid(row=3, column=0, columnspan=3, pady=5)
+        ttk.Button(report_frame, text="设置报告文件", command=self.choose_report_file).pack(side=tk.LEFT, padx=5)
+        ttk.Button(report_frame, text="不保存报告",
+                   command=lambda: self.report_path_var.set("")).pack(side=tk.LEFT, padx=5)
+        self.report_path_var = tk.StringVar()
+        ttk.Label(report_frame, text="报告:").pack(side=tk.LEFT, padx=(15, 2))
+        ttk.Label(report_frame, textvariable=self.report_path_var, width=60).pack(side=tk.LEFT)
+
         # 文件列表区域
         self.create_file_list_area()
 
         # 进度条
         self.progress = ttk.Progressbar(self.root, mode='determinate', length=300)
-        self.progress.pack(fill=tk.X, padx=10, pady=5)
+        self.progress.pack(fill=tk.X, padx=10, pady=(5, 0))
+        self.progress_status_var = tk.StringVar()
+        ttk.Label(self.root, textvariable=self.progress_status_var).pack(fill=tk.X, padx=10)
 
         # 属性显示区域
         self.create_properties_display()
@@ -108,6 +182,9 @@ class FilePropertiesManager:
         
         ttk.Label(title_frame, text="文件列表", font=('Arial', 12, 'bold')).pack(side=tk.LEFT)
         ttk.Label(title_frame, text="(支持批量选择)").pack(side=tk.LEFT, padx=10)
+
+        self.file_status_var = tk.StringVar(value="总计: 0 个文件 | 已选择: 0 个文件")
+        ttk.Label(title_frame, textvariable=self.file_status_var).pack(side=tk.RIGHT, padx=10)
         
         # 文件列表框架
         list_frame = ttk.Frame(self.root)
@@ -200,16 +277,23 @@ class FilePropertiesManager:
         
         self.system_text.insert(1.0, "\n".join(info))
         
+    def get_dialog_filetypes(self):
+        """根据引擎注册的处理器生成文件对话框的类型过滤器"""
+        def patterns(extensions):
+            return " ".join(f"*{ext}" for ext in extensions)
+
+        filetypes = [("支持的文件", patterns(engine.supported_extensions()))]
+        for category, label in engine.CATEGORY_LABELS.items():
+            extensions = engine.supported_extensions(category)
+            if extensions:
+                filetypes.append((f"{label}文件", patterns(extensions)))
+        filetypes.append(("所有文件", "*.*"))
+        return filetypes
+
     def browse_file(self):
         filename = filedialog.askopenfilename(
             title="选择文件",
-            filetypes=[
-                ("支持的文件", "*.jpg *.jpeg *.png *.gif *.bmp *.pdf *.docx *.doc"),
-                ("图片文件", "*.jpg *.jpeg *.png *.gif *.bmp"),
-                ("PDF文件", "*.pdf"),
-                ("Word文件", "*.docx *.doc"),
-                ("所有文件", "*.*")
-            ]
+            filetypes=self.get_dialog_filetypes()
         )
         if filename:
             self.file_path_var.set(filename)
@@ -219,91 +303,128 @@ class FilePropertiesManager:
         """批量添加文件"""
         filenames = filedialog.askopenfilenames(
             title="批量选择文件",
-            filetypes=[
-                ("支持的文件", "*.jpg *.jpeg *.png *.gif *.bmp *.pdf *.docx *.doc"),
-                ("图片文件", "*.jpg *.jpeg *.png *.gif *.bmp"),
-                ("PDF文件", "*.pdf"),
-                ("Word文件", "*.docx *.doc"),
-                ("所有文件", "*.*")
-            ]
+            filetypes=self.get_dialog_filetypes()
         )
-        
-        for filename in filenames:
-            if filename not in self.file_list:
-                self.file_list.append(filename)
-                self.add_file_to_tree(filename)
-                
+        if filenames:
+            self.load_files_async(list(filenames))
+
+    def add_folder(self):
+        """添加文件夹中所有支持的文件（包括子文件夹）"""
+        folder = filedialog.askdirectory(title="选择文件夹")
+        if folder:
+            self.load_files_async(engine.iter_supported_files([folder]))
+
+    def load_files_async(self, paths):
+        """在后台线程中枚举文件并读取大小，主线程按时间预算分批插入文件列表"""
+        self.loading_jobs += 1
+        threading.Thread(target=self._load_files_worker, args=(paths,), daemon=True).start()
+        if not self.insert_scheduled:
+            self.insert_scheduled = True
+            self.root.after(self.FILE_INSERT_INTERVAL, self._insert_pending_files)
+
+    def build_file_row(self, filepath):
+        """生成文件列表中一行的显示值，文件无法访问时抛出 OSError"""
+        file_size = os.path.getsize(filepath)
+        return filepath, (
+            os.path.basename(filepath),
+            engine.get_file_type_label(filepath),
+            self.format_file_size(file_size),
+            filepath
+        )
+
+    def _load_files_worker(self, paths):
+        """文件加载线程：不访问Tk，只把生成的行分批放入队列"""
+        batch = []
+        failed = 0
+        try:
+            for filepath in paths:
+                try:
+                    batch.append(self.build_file_row(filepath))
+                except OSError:
+                    failed += 1
+                    continue
+                if len(batch) >= self.FILE_LOAD_BATCH:
+                    self.file_queue.put(('rows', batch))
+                    batch = []
+        finally:
+            if batch:
+                self.file_queue.put(('rows', batch))
+            self.file_queue.put(('done', failed))
+
+    def _insert_pending_files(self):
+        """在时间预算内把队列中的文件行插入Treeview，未完成时稍后继续"""
+        deadline = time.perf_counter() + self.FILE_INSERT_BUDGET
+        while time.perf_counter() < deadline:
+            if not self.pending_rows:
+                try:
+                    kind, payload = self.file_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if kind == 'done':
+                    self.loading_jobs -= 1
+                    self.load_failures += payload
+                else:
+                    self.pending_rows.extend(payload)
+                continue
+            for _ in range(min(64, len(self.pending_rows))):
+                self._insert_file_row(*self.pending_rows.popleft())
+
+        if self.loading_jobs or self.pending_rows or not self.file_queue.empty():
+            self.file_status_var.set(f"正在加载... 已添加 {len(self.file_model)} 个文件")
+            self.root.after(self.FILE_INSERT_INTERVAL, self._insert_pending_files)
+            return
+
+        self.insert_scheduled = False
         self.update_batch_status()
+        if self.load_failures:
+            failures, self.load_failures = self.load_failures, 0
+            messagebox.showerror("错误", f"{failures} 个文件无法读取，未添加到列表")
+
+    def _insert_file_row(self, filepath, values):
+        if filepath in self.file_model:
+            return
+        item = self.file_tree.insert('', 'end', text='☐', values=values)
+        self.file_model.add(filepath, item)
         
     def add_file_to_tree(self, filepath):
         """添加文件到Treeview"""
         try:
-            filename = os.path.basename(filepath)
-            file_ext = os.path.splitext(filepath)[1].lower()
-            file_size = os.path.getsize(filepath)
-            
-            # 确定文件类型
-            if file_ext in ['.jpg', '.jpeg', '.png', '.gif', '.bmp']:
-                file_type = "图片"
-            elif file_ext == '.pdf':
-                file_type = "PDF"
-            elif file_ext in ['.docx', '.doc']:
-                file_type = "Word"
-            else:
-                file_type = "其他"
-                
-            # 插入到Treeview
-            self.file_tree.insert('', 'end', text='☐', values=(
-                filename,
-                file_type,
-                self.format_file_size(file_size),
-                filepath
-            ))
+            self._insert_file_row(*self.build_file_row(filepath))
             
         except Exception as e:
             messagebox.showerror("错误", f"添加文件失败: {str(e)}")
             
     def select_all_files(self):
         """全选文件"""
-        for item in self.file_tree.get_children():
-            self.file_tree.item(item, tags=['selected'])
-            self.file_tree.item(item, text='✓')
+        self.file_model.select_all()
+        for _, item in self.file_model.items():
+            self.file_tree.item(item, tags=['selected'], text='☑')
+        self.update_batch_status()
             
     def deselect_all_files(self):
         """取消全选"""
-        for item in self.file_tree.get_children():
-            self.file_tree.item(item, tags=[])
-            self.file_tree.item(item, text='')
+        self.file_model.clear_selection()
+        for _, item in self.file_model.items():
+            self.file_tree.item(item, tags=[], text='☐')
+        self.update_batch_status()
             
     def on_file_click(self, event):
         """单击文件切换选择状态"""
         region = self.file_tree.identify_region(event.x, event.y)
         if region == "tree":  # 点击了选择列
             item = self.file_tree.identify_row(event.y)
-            if item:
-                tags = list(self.file_tree.item(item, 'tags'))
-                current_text = self.file_tree.item(item, 'text')
-                
-                if 'selected' in tags:
-                    tags.remove('selected')
-                    self.file_tree.item(item, tags=tags)
-                    self.file_tree.item(item, text='☐')
+            filepath = self.file_model.path_of(item)
+            if filepath is not None:
+                if self.file_model.toggle(filepath):
+                    self.file_tree.item(item, tags=['selected'], text='☑')
                 else:
-                    tags.append('selected')
-                    self.file_tree.item(item, tags=tags)
-                    self.file_tree.item(item, text='☑')
+                    self.file_tree.item(item, tags=[], text='☐')
+                self.update_batch_status()
                 return "break"  # 阻止默认行为
                 
     def get_selected_files(self):
-        """获取选中的文件列表"""
-        selected_files = []
-        for item in self.file_tree.get_children():
-            tags = self.file_tree.item(item, 'tags')
-            if tags and 'selected' in tags:
-                values = self.file_tree.item(item, 'values')
-                if values and len(values) > 3:
-                    selected_files.append(values[3])  # 路径在最后一列
-        return selected_files
+        """获取选中的文件列表（按添加顺序）"""
+        return self.file_model.selected_paths()
             
     def view_properties(self):
         if not self.current_file:
@@ -314,30 +435,21 @@ class FilePropertiesManager:
             messagebox.showerror("错误", "文件不存在！")
             return
         
-        threading.Thread(target=self._load_properties, daemon=True).start()
+        threading.Thread(target=self._load_properties, args=(self.current_file,), daemon=True).start()
         
-    def _load_properties(self):
+    def _load_properties(self, filepath):
         try:
             self.root.after(0, lambda: self.progress.start())
             self.root.after(0, lambda: self.clear_all_displays())
             
-            basic_info = self.get_basic_properties()
+            basic_info = engine.get_basic_properties(filepath)
             self.root.after(0, lambda: self.basic_text.insert(1.0, basic_info))
             
-            file_ext = os.path.splitext(self.current_file)[1].lower()
-            
-            if file_ext in ['.jpg', '.jpeg', '.png', '.gif', '.bmp']:
-                exif_info = self.get_image_exif()
-                self.root.after(0, lambda: self.exif_text.insert(1.0, exif_info))
-                self.root.after(0, lambda: self.notebook.select(self.exif_frame))
-            elif file_ext == '.pdf':
-                pdf_info = self.get_pdf_properties()
-                self.root.after(0, lambda: self.pdf_text.insert(1.0, pdf_info))
-                self.root.after(0, lambda: self.notebook.select(self.pdf_frame))
-            elif file_ext in ['.docx', '.doc']:
-                word_info = self.get_word_properties()
-                self.root.after(0, lambda: self.word_text.insert(1.0, word_info))
-                self.root.after(0, lambda: self.notebook.select(self.word_frame))
+            category, props_info = engine.read_properties(filepath)
+            if category is not None:
+                text_widget, frame = self.get_category_display(category)
+                self.root.after(0, lambda: text_widget.insert(1.0, props_info))
+                self.root.after(0, lambda: self.notebook.select(frame))
                 
         except Exception as e:
             error_msg = f"加载属性时出错: {str(e)}\n{traceback.format_exc()}"
@@ -345,156 +457,20 @@ class FilePropertiesManager:
         finally:
             self.root.after(0, lambda: self.progress.stop())
             
+    def get_category_display(self, category):
+        """返回文件类别对应的 (文本框, 标签页)"""
+        displays = {
+            'image': (self.exif_text, self.exif_frame),
+            'pdf': (self.pdf_text, self.pdf_frame),
+            'word': (self.word_text, self.word_frame),
+            'office': (self.word_text, self.word_frame),
+        }
+        return displays[category]
+            
     def clear_all_displays(self):
         for text_widget in [self.system_text, self.basic_text, self.exif_text, self.pdf_text, self.word_text]:
             text_widget.delete(1.0, tk.END)
             
-    def get_basic_properties(self):
-        try:
-            stat = os.stat(self.current_file)
-            info = []
-            info.append(f"文件名: {os.path.basename(self.current_file)}")
-            info.append(f"完整路径: {self.current_file}")
-            info.append(f"文件大小: {self.format_file_size(stat.st_size)}")
-            info.append(f"创建时间: {self.format_timestamp(stat.st_ctime)}")
-            info.append(f"修改时间: {self.format_timestamp(stat.st_mtime)}")
-            info.append(f"访问时间: {self.format_timestamp(stat.st_atime)}")
-            
-            # 平台特定属性
-            if IS_WINDOWS:
-                try:
-                    import win32api
-                    import win32con
-                    attrs = win32api.GetFileAttributes(self.current_file)
-                    info.append(f"文件属性: {self.get_file_attributes(attrs)}")
-                except:
-                    pass
-            elif IS_MACOS:
-                # macOS文件属性
-                try:
-                    import subprocess
-                    result = subprocess.run(['ls', '-la', self.current_file], 
-                                          capture_output=True, text=True)
-                    if result.returncode == 0:
-                        parts = result.stdout.split()
-                        if len(parts) >= 10:
-                            info.append(f"权限: {parts[0]}")
-                            info.append(f"所有者: {parts[2]}")
-                            info.append(f"群组: {parts[3]}")
-                except:
-                    pass
-            elif IS_LINUX:
-                # Linux文件属性
-                try:
-                    result = subprocess.run(['ls', '-la', self.current_file], 
-                                          capture_output=True, text=True)
-                    if result.returncode == 0:
-                        parts = result.stdout.split()
-                        if len(parts) >= 9:
-                            info.append(f"权限: {parts[0]}")
-                            info.append(f"所有者: {parts[2]}")
-                            info.append(f"群组: {parts[3]}")
-                except:
-                    pass
-            
-            return "\n".join(info)
-        except Exception as e:
-            return f"获取基本属性失败: {str(e)}"
-            
-    def get_image_exif(self):
-        try:
-            image = Image.open(self.current_file)
-            exifdata = image.getexif()
-            
-            if not exifdata:
-                return "该图片没有EXIF信息"
-            
-            info = []
-            for tag_id in exifdata:
-                tag = TAGS.get(tag_id, tag_id)
-                data = exifdata.get(tag_id)
-                
-                # 处理二进制数据
-                if isinstance(data, bytes):
-                    try:
-                        data = data.decode('utf-8', errors='ignore')
-                    except:
-                        data = f"<二进制数据: {len(data)}字节>"
-                
-                info.append(f"{tag}: {data}")
-            
-            return "\n".join(info) if info else "没有EXIF信息"
-        except Exception as e:
-            return f"获取EXIF信息失败: {str(e)}"
-            
-    def get_pdf_properties(self):
-        try:
-            doc = fitz.open(self.current_file)
-            info = []
-            
-            # 获取PDF版本信息
-            metadata = doc.metadata
-            pdf_version = metadata.get('format', '未知') if metadata else '未知'
-            info.append(f"PDF版本: {pdf_version}")
-            info.append(f"页面数量: {len(doc)}")
-            
-            # 元数据
-            if metadata:
-                info.append("\n元数据:")
-                for key, value in metadata.items():
-                    if value:
-                        info.append(f"  {key}: {value}")
-            
-            # 页面信息
-            info.append("\n页面信息:")
-            for i, page in enumerate(doc):
-                rect = page.rect
-                info.append(f"  页面 {i+1}: {rect.width}x{rect.height} 点")
-            
-            doc.close()
-            return "\n".join(info)
-        except Exception as e:
-            return f"获取PDF属性失败: {str(e)}"
-            
-    def get_word_properties(self):
-        try:
-            if self.current_file.lower().endswith('.docx'):
-                doc = docx.Document(self.current_file)
-                
-                info = []
-                props = doc.core_properties
-                
-                info.append("文档属性:")
-                info.append(f"  标题: {props.title or '无'}")
-                info.append(f"  主题: {props.subject or '无'}")
-                info.append(f"  作者: {props.author or '无'}")
-                info.append(f"  类别: {props.category or '无'}")
-                info.append(f"  关键词: {props.keywords or '无'}")
-                info.append(f"  备注: {props.comments or '无'}")
-                info.append(f"  最后修改者: {props.last_modified_by or '无'}")
-                info.append(f"  修订号: {props.revision or '无'}")
-                
-                info.append(f"\n  创建时间: {props.created}")
-                info.append(f"  最后修改时间: {props.modified}")
-                info.append(f"  最后打印时间: {props.last_printed}")
-                
-                # 统计信息
-                paragraphs = len(doc.paragraphs)
-                tables = len(doc.tables)
-                
-                info.append(f"\n统计信息:")
-                info.append(f"  段落数: {paragraphs}")
-                info.append(f"  表格数: {tables}")
-                
-                return "\n".join(info)
-            else:  # .doc文件
-                if IS_WINDOWS:
-                    return "DOC格式需要安装Microsoft Word才能查看详细属性"
-                else:
-                    return "DOC格式在macOS/Linux上支持有限，建议使用DOCX格式"
-        except Exception as e:
-            return f"获取Word属性失败: {str(e)}"
-            
     def clear_properties(self):
         if not self.current_file:
             messagebox.showwarning("警告", "请先选择文件！")
@@ -505,7 +481,8 @@ class FilePropertiesManager:
             return
         
         if messagebox.askyesno("确认", "确定要清除此文件的所有属性信息吗？此操作不可撤销！"):
-            threading.Thread(target=self._clear_properties, daemon=True).start()
+            threading.Thread(target=self._clear_properties,
+                             args=(self.current_file, self.get_process_options()), daemon=True).start()
             
     def batch_view_properties(self):
         """批量查看属性"""
@@ -514,40 +491,35 @@ class FilePropertiesManager:
             messagebox.showwarning("警告", "请先选择要查看的文件！")
             return
             
-        threading.Thread(target=self._batch_view_properties_worker, args=(selected_files,), daemon=True).start()
+        channel = self.start_batch_display("批量查看", len(selected_files))
+        threading.Thread(target=self._batch_view_properties_worker,
+                             args=(channel, selected_files, self.get_worker_count(), self.quick_probe_var.get(),
+                                   self.use_cache_var.get(), self.use_threads_var.get(),
+                                   self.report_path_var.get()),
+                             daemon=True).start()
         
-    def _batch_view_properties_worker(self, files):
-        """批量查看属性工作线程"""
+    def _batch_view_properties_worker(self, channel, files, workers=1, quick_probe=False, use_cache=False,
+                                      use_threads=False, report_path=""):
+        """批量查看属性工作线程：每完成一个文件就把结果写入进度通道"""
+        summary = ""
         try:
-            self.root.after(0, lambda: self.progress.start())
-            self.root.after(0, lambda: self.batch_text.delete(1.0, tk.END))
+            rows = self._iter_batch_rows('probe' if quick_probe else 'inspect', files, workers,
+                                         use_cache=use_cache, use_threads=use_threads,
+                                         report_path=report_path)
             
-            total_files = len(files)
-            results = []
+            for row in rows:
+                if row['ok']:
+                    text = row['result']
+                else:
+                    text = f"文件 {row['path']} 处理失败: {row['error']}"
+                channel.publish(text + "\n\n")
             
-            for i, filepath in enumerate(files):
-                try:
-                    result = self.get_file_summary_info(filepath)
-                    results.append(result)
-                    
-                    # 更新进度
-                    progress = (i + 1) / total_files * 100
-                    self.root.after(0, lambda p=progress: self.progress.configure(value=p))
-                    
-                except Exception as e:
-                    results.append(f"文件 {filepath} 处理失败: {str(e)}")
-            
-            # 显示结果
-            summary = f"批量查看完成！共处理 {total_files} 个文件\n\n"
-            summary += "=" * 60 + "\n\n"
-            summary += "\n\n".join(results)
-            
-            self.root.after(0, lambda: self.batch_text.insert(1.0, summary))
-            self.root.after(0, lambda: self.notebook.select(self.batch_frame))
+            summary = "=" * 60 + f"\n批量查看完成！共处理 {len(files)} 个文件\n"
             
+        except Exception as e:
+            summary = f"\n批量查看出错: {str(e)}\n"
         finally:
-            self.root.after(0, lambda: self.progress.stop())
-            self.root.after(0, lambda: self.progress.configure(value=0))
+            channel.finish(summary)
             
     def batch_clear_properties(self):
         """一键批量清除属性"""
@@ -556,112 +528,190 @@ class FilePropertiesManager:
             messagebox.showwarning("警告", "请先选择要清除的文件！")
             return
             
-        if messagebox.askyesno("确认", f"确定要清除 {len(selected_files)} 个文件的所有属性信息吗？\n此操作不可撤销！"):
-            threading.Thread(target=self._batch_clear_properties_worker, args=(selected_files,), daemon=True).start()
+        if not messagebox.askyesno("确认", f"确定要清除 {len(selected_files)} 个文件的所有属性信息吗？\n此操作不可撤销！"):
+            return
             
-    def _batch_clear_properties_worker(self, files):
-        """批量清除属性工作线程"""
         try:
-            self.root.after(0, lambda: self.progress.start())
-            self.root.after(0, lambda: self.batch_text.delete(1.0, tk.END))
+            journal = job_journal.JobJournal.create('clear', selected_files, self.get_process_options())
+            if journal.done_count and not messagebox.askyesno(
+                    "继续任务", f"这批文件上次的清除任务未完成（{job_journal.format_job(journal)}）。\n"
+                                f"是否只处理失败和尚未处理的文件？"):
+                journal = job_journal.JobJournal.create('clear', selected_files, self.get_process_options(),
+                                                        resume=False)
+        except Exception as e:
+            messagebox.showerror("错误", f"无法创建任务日志: {str(e)}")
+            return
+        self.start_journaled_clear(journal)
+        
+    def start_journaled_clear(self, journal):
+        """启动按任务日志记录进度的批量清除，只处理日志中失败和尚未处理的文件"""
+        files = journal.pending_files()
+        channel = self.start_batch_display("批量清除", len(files))
+        threading.Thread(target=self._batch_clear_properties_worker,
+                         args=(channel, files, self.get_worker_count(), journal.options,
+                               self.use_cache_var.get(), self.dedup_var.get(),
+                               self.use_threads_var.get(), self.report_path_var.get(), journal),
+                         daemon=True).start()
+            
+    def check_unfinished_jobs(self):
+        """启动时在后台线程中读取任务日志，找到未完成的任务后回到主线程询问"""
+        threading.Thread(target=self._find_unfinished_jobs_worker, daemon=True).start()
+
+    def _find_unfinished_jobs_worker(self):
+        journals = job_journal.find_unfinished()
+        if journals:
+            self.root.after(0, lambda: self._ask_unfinished_jobs(journals))
+
+    def _ask_unfinished_jobs(self, journals):
+        """询问是否继续上次中断的批量清除任务"""
+        for journal in journals:
+            answer = messagebox.askyesnocancel(
+                "未完成的任务", f"发现上次未完成的批量清除任务（{job_journal.format_job(journal)}）。\n\n"
+                              f"是：继续处理失败和尚未处理的文件\n否：放弃该任务\n取消：下次启动时再询问")
+            if answer is None:
+                continue
+            if not answer:
+                journal.discard()
+                continue
+            self.load_files_async(journal.pending_files())
+            self.start_journaled_clear(journal)
+            return
             
-            total_files = len(files)
-            results = []
+    def _batch_clear_properties_worker(self, channel, files, workers=1, options=engine.DEFAULT_OPTIONS,
+                                       use_cache=False, deduplicate=False, use_threads=False,
+                                       report_path="", journal=None):
+        """批量清除属性工作线程：每完成一个文件就把结果写入进度通道和任务日志
+
+        全部成功后删除任务日志；有失败或中途出错时保留日志，下次只处理失败和尚未处理的文件
+        """
+        summary = ""
+        completed = False
+        try:
+            succeeded = failed = 0
+            dedup_stats = {} if deduplicate else None
             
-            for i, filepath in enumerate(files):
-                try:
-                    result = self.clear_file_properties(filepath)
-                    results.append(f"✅ {os.path.basename(filepath)}: {result}")
-                    
-                    # 更新进度
-                    progress = (i + 1) / total_files * 100
-                    self.root.after(0, lambda p=progress: self.progress.configure(value=p))
-                    
-                except Exception as e:
-                    results.append(f"❌ {os.path.basename(filepath)}: 失败 - {str(e)}")
-            
-            # 显示结果
-            summary = f"批量清除完成！共处理 {total_files} 个文件\n\n"
-            summary += "=" * 60 + "\n\n"
-            summary += "\n".join(results)
-            
-            self.root.after(0, lambda: self.batch_text.insert(1.0, summary))
-            self.root.after(0, lambda: self.notebook.select(self.batch_frame))
+            rows = self._iter_batch_rows('clear', files, workers, options, use_cache, dedup_stats,
+                                         use_threads, report_path)
+            
+            for row in rows:
+                filename = os.path.basename(row['path'])
+                if row['ok']:
+                    succeeded += 1
+                    channel.publish(f"✅ {filename}: {row['result']}\n")
+                else:
+                    failed += 1
+                    channel.publish(f"❌ {filename}: 失败 - {row['error']}\n")
+                if journal is not None:
+                    journal.record(row['path'], row['ok'], row['result'] if row['ok'] else row['error'])
+            
+            summary = "\n" + "=" * 60 + f"\n批量清除完成！共处理 {len(files)} 个文件，成功 {succeeded} 个，失败 {failed} 个\n"
+            if journal is not None and journal.total > len(files):
+                summary += f"已跳过任务日志中此前成功处理的 {journal.total - len(files)} 个文件\n"
+            if dedup_stats:
+                summary += dedup.format_savings(dedup_stats) + "\n"
+            completed = failed == 0
             
+        except Exception as e:
+            summary = f"\n批量清除出错: {str(e)}\n"
         finally:
-            self.root.after(0, lambda: self.progress.stop())
-            self.root.after(0, lambda: self.progress.configure(value=0))
+            if journal is not None:
+                try:
+                    if completed:
+                        journal.discard()
+                    else:
+                        journal.close()
+                        summary += "任务日志已保留，再次清除这批文件或重新启动程序时可继续处理\n"
+                except OSError as e:
+                    summary += f"任务日志写入失败: {str(e)}\n"
+            channel.finish(summary)
+            
+    def _iter_batch_rows(self, action, files, workers, options=engine.DEFAULT_OPTIONS, use_cache=False,
+                         dedup_stats=None, use_threads=False, report_path=""):
+        """并行处理文件，按完成顺序产出报告记录
+
+        扫描缓存和报告文件在当前线程中打开和关闭；report_path 不为空时每条记录立即写入报告
+        """
+        cache = scan_cache.ScanCache() if use_cache else None
+        report = None
+        try:
+            if report_path:
+                report = batch_report.ReportWriter(report_path)
+            for _, row in batch_report.iter_rows(action, files, workers, options=options, cache=cache,
+                                                 dedup_stats=dedup_stats, use_threads=use_threads):
+                if report is not None:
+                    report.write(row)
+                yield row
+        finally:
+            if report is not None:
+                report.close()
+            if cache is not None:
+                cache.close()
+            
+    def choose_report_file(self):
+        """选择批量处理报告的保存位置"""
+        filename = filedialog.asksaveasfilename(
+            title="保存批量处理报告",
+            defaultextension=".jsonl",
+            filetypes=[("JSON Lines", "*.jsonl"), ("CSV", "*.csv")]
+        )
+        if filename:
+            self.report_path_var.set(filename)
+            
+    def start_batch_display(self, title, total):
+        """清空批量结果页并开始按固定帧率刷新，返回供工作线程写入的进度通道"""
+        channel = progress_channel.ProgressChannel(total)
+        self.batch_text.delete(1.0, tk.END)
+        self.batch_text.insert(tk.END, f"{title}: 共 {total} 个文件\n" + "=" * 60 + "\n\n")
+        self.notebook.select(self.batch_frame)
+        self.progress.configure(value=0)
+        self.root.after(self.BATCH_FRAME_INTERVAL, self._refresh_batch_display, channel)
+        return channel
+            
+    def _refresh_batch_display(self, channel):
+        """取走进度通道中的更新，追加结果文本并刷新进度条和状态栏"""
+        frame = channel.take_frame()
+        if frame.text:
+            self.batch_text.insert(tk.END, frame.text)
+            self._trim_batch_text()
+        if frame.total:
+            self.progress.configure(value=frame.done / frame.total * 100)
+        self.progress_status_var.set(progress_channel.format_frame_status(frame))
+        if not frame.finished:
+            self.root.after(self.BATCH_FRAME_INTERVAL, self._refresh_batch_display, channel)
+            
+    def _trim_batch_text(self):
+        """结果文本超过最大行数时删除最早的行，限制文本框占用的内存"""
+        lines = int(self.batch_text.index('end-1c').split('.')[0])
+        excess = lines - self.BATCH_TEXT_MAX_LINES
+        if excess > 0:
+            self.batch_text.delete('1.0', f'{excess + 1}.0')
+            
+    def get_pdf_mode(self):
+        """读取界面选择的PDF清除方式"""
+        label = self.pdf_mode_var.get()
+        for mode, mode_label in self.PDF_MODE_LABELS.items():
+            if mode_label == label:
+                return mode
+        return engine.PDF_MODE_FULL
+            
+    def get_process_options(self):
+        """根据界面设置生成读取和清除选项"""
+        return engine.ProcessOptions(pdf_mode=self.get_pdf_mode())
+            
+    def get_worker_count(self):
+        """读取界面设置的并行进程数"""
+        try:
+            return max(1, int(self.worker_count_var.get()))
+        except (tk.TclError, ValueError):
+            return 1
             
     def get_file_summary_info(self, filepath):
         """获取文件摘要信息"""
-        try:
-            filename = os.path.basename(filepath)
-            file_ext = os.path.splitext(filepath)[1].lower()
-            file_size = os.path.getsize(filepath)
-            
-            info = [f"文件: {filename}"]
-            info.append(f"路径: {filepath}")
-            info.append(f"大小: {self.format_file_size(file_size)}")
-            
-            # 临时保存当前文件，以便其他方法使用
-            old_current = self.current_file
-            self.current_file = filepath
-            
-            try:
-                if file_ext in ['.jpg', '.jpeg', '.png', '.gif', '.bmp']:
-                    exif_info = self.get_image_exif()
-                    if "没有EXIF信息" not in exif_info and "失败" not in exif_info:
-                        info.append("状态: 包含EXIF信息")
-                    else:
-                        info.append("状态: 无EXIF信息")
-                        
-                elif file_ext == '.pdf':
-                    pdf_info = self.get_pdf_properties()
-                    if "获取PDF属性失败" not in pdf_info:
-                        lines = pdf_info.split('\n')
-                        for line in lines[:5]:  # 显示前5行
-                            if line.strip():
-                                info.append(line)
-                    else:
-                        info.append("状态: 无法读取PDF属性")
-                        
-                elif file_ext in ['.docx', '.doc']:
-                    word_info = self.get_word_properties()
-                    if "获取Word属性失败" not in word_info:
-                        lines = word_info.split('\n')
-                        for line in lines[:5]:  # 显示前5行
-                            if line.strip():
-                                info.append(line)
-                    else:
-                        info.append("状态: 无法读取Word属性")
-            finally:
-                # 恢复原来的当前文件
-                self.current_file = old_current
-            
-            return "\n".join(info)
-            
-        except Exception as e:
-            return f"文件 {filepath} 处理失败: {str(e)}"
+        return engine.get_file_summary_info(filepath)
             
-    def clear_file_properties(self, filepath):
+    def clear_file_properties(self, filepath, options=engine.DEFAULT_OPTIONS):
         """清除单个文件的属性"""
-        try:
-            file_ext = os.path.splitext(filepath)[1].lower()
-            
-            if file_ext in ['.jpg', '.jpeg', '.png', '.gif', '.bmp']:
-                self.clear_image_properties_file(filepath)
-                return "图片属性已清除"
-            elif file_ext == '.pdf':
-                self.clear_pdf_properties_file(filepath)
-                return "PDF属性已清除"
-            elif file_ext in ['.docx', '.doc']:
-                self.clear_word_properties(filepath)
-                return "Word属性已清除"
-            else:
-                return "不支持的文件类型"
-                
-        except Exception as e:
-            raise Exception(f"清除失败: {str(e)}")
+        return engine.clear_file_properties(filepath, options)
             
     def remove_processed_files(self):
         """移除已处理的文件"""
@@ -671,37 +721,23 @@ class FilePropertiesManager:
             return
             
         if messagebox.askyesno("确认", f"确定要从列表中移除 {len(selected_files)} 个已处理的文件吗？"):
-            # 获取选中的文件路径
-            selected_paths = set(selected_files)
-            
-            # 从文件列表中移除
-            self.file_list = [f for f in self.file_list if f not in selected_paths]
-            
-            # 从Treeview中移除
-            items_to_remove = []
-            for item in self.file_tree.get_children():
-                values = self.file_tree.item(item, 'values')
-                if values and len(values) > 3 and values[3] in selected_paths:
-                    items_to_remove.append(item)
-            
-            for item in items_to_remove:
-                self.file_tree.delete(item)
+            items_to_remove = self.file_model.remove(selected_files)
+            self.file_tree.delete(*items_to_remove)
                 
             self.update_batch_status()
             messagebox.showinfo("成功", f"已从列表中移除 {len(items_to_remove)} 个文件")
             
     def update_batch_status(self):
         """更新批量处理状态"""
-        total = len(self.file_tree.get_children())
-        selected = len(self.get_selected_files())
-        status = f"总计: {total} 个文件 | 已选择: {selected} 个文件"
-        # 这里可以添加状态栏显示
+        total = len(self.file_model)
+        selected = self.file_model.selected_count
+        self.file_status_var.set(f"总计: {total} 个文件 | 已选择: {selected} 个文件")
             
-    def _clear_properties(self):
+    def _clear_properties(self, filepath, options=engine.DEFAULT_OPTIONS):
         try:
             self.root.after(0, lambda: self.progress.start())
             
-            result = self.clear_file_properties(self.current_file)
+            result = self.clear_file_properties(filepath, options)
             
             self.root.after(0, lambda: messagebox.showinfo("成功", f"属性清除完成！{result}"))
             self.root.after(0, lambda: self.view_properties())  # 重新加载属性
@@ -712,122 +748,19 @@ class FilePropertiesManager:
         finally:
             self.root.after(0, lambda: self.progress.stop())
             
-    def clear_image_properties(self, filepath=None):
-        try:
-            target_file = filepath or self.current_file
-            image = Image.open(target_file)
-            
-            # 保存为新文件，不包含EXIF
-            temp_path = target_file + '.tmp'
-            image.save(temp_path, quality=95)
-            
-            # 替换原文件
-            os.replace(temp_path, target_file)
-            
-        except Exception as e:
-            raise Exception(f"清除图片属性失败: {str(e)}")
-            
-    def clear_image_properties_file(self, filepath):
-        """清除指定图片文件的属性"""
-        old_current = self.current_file
-        try:
-            self.current_file = filepath
-            self.clear_image_properties()
-        finally:
-            self.current_file = old_current
-            
-    def clear_pdf_properties(self, filepath=None):
-        try:
-            target_file = filepath or self.current_file
-            doc = fitz.open(target_file)
-            
-            # 清除元数据
-            doc.set_metadata({})
-            
-            # 保存到新文件
-            temp_path = target_file + '.tmp'
-            doc.save(temp_path)
-            doc.close()
-            
-            # 替换原文件
-            os.replace(temp_path, target_file)
-            
-        except Exception as e:
-            raise Exception(f"清除PDF属性失败: {str(e)}")
-            
-    def clear_pdf_properties_file(self, filepath):
-        """清除指定PDF文件的属性"""
-        old_current = self.current_file
-        try:
-            self.current_file = filepath
-            self.clear_pdf_properties()
-        finally:
-            self.current_file = old_current
-            
-    def clear_word_properties(self, filepath=None):
-        try:
-            target_file = filepath or self.current_file
-            if target_file.lower().endswith('.docx'):
-                doc = docx.Document(target_file)
-                
-                # 清除核心属性
-                props = doc.core_properties
-                props.title = None
-                props.subject = None
-                props.author = None
-                props.category = None
-                props.keywords = None
-                props.comments = None
-                props.last_modified_by = None
-                
-                # 保存到新文件
-                temp_path = target_file + '.tmp'
-                doc.save(temp_path)
-                
-                # 替换原文件
-                os.replace(temp_path, target_file)
-            else:
-                # 对于DOC文件，在macOS/Linux上不提供清除功能
-                raise Exception("DOC格式在macOS/Linux上不支持属性清除")
-                
-        except Exception as e:
-            raise Exception(f"清除Word属性失败: {str(e)}")
-            
-    def clear_word_properties_file(self, filepath):
-        """清除指定Word文件的属性"""
-        old_current = self.current_file
-        try:
-            self.current_file = filepath
-            self.clear_word_properties()
-        finally:
-            self.current_file = old_current
-            
     def format_file_size(self, size):
-        for unit in ['B', 'KB', 'MB', 'GB']:
-            if size < 1024:
-                return f"{size:.2f} {unit}"
-            size /= 1024
-        return f"{size:.2f} TB"
+        return engine.format_file_size(size)
         
     def format_timestamp(self, timestamp):
-        import datetime
-        return datetime.datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+        return engine.format_timestamp(timestamp)
         
     def get_file_attributes(self, attrs):
-        if IS_WINDOWS:
-            attributes = []
-            if attrs & 0x1: attributes.append("只读")
-            if attrs & 0x2: attributes.append("隐藏")
-            if attrs & 0x4: attributes.append("系统")
-            if attrs & 0x10: attributes.append("目录")
-            if attrs & 0x20: attributes.append("存档")
-            return ", ".join(attributes) if attributes else "无特殊属性"
-        else:
-            return "平台不支持文件属性检查"
+        return engine.get_file_attributes(attrs)
             
     def run(self):
         self.root.mainloop()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     app = FilePropertiesManager()
     app.run()
\ No newline at end of file
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按文件头识别文件类型
+只读取文件开头 SNIFF_SIZE 字节，按签名判断实际格式，返回对应处理器的名称；
+扩展名与内容不符的文件交给内容对应的处理器，而不是在PIL或PyMuPDF内部才失败
+
+签名表在导入时按首字节预先分组，识别一个文件头只需查一次字典并比较少数几个签名
+"""
+
+import image_streams
+
+# 识别时读取的文件头长度
+SNIFF_SIZE = 4096
+
+# PDF允许在 %PDF- 之前有少量其他数据
+PDF_HEADER_SEARCH = 1024
+
+# 无法从文件头区分具体格式的ZIP和OLE2容器，按扩展名在这些处理器中选择
+ZIP_FORMATS = ('docx', 'ooxml')
+
+# ZIP开头若干本地文件头中的部件路径前缀
+OOXML_PART_PREFIXES = ((b'word/', 'docx'), (b'xl/', 'ooxml'), (b'ppt/', 'ooxml'))
+
+
+def _sniff_riff(header, ext_name):
+    return 'webp' if header[8:12] == b'WEBP' else None
+
+
+def _sniff_zip(header, ext_name):
+    """Office文档的第一个部件通常是 [Content_Types].xml，其后很快出现正文部件的路径"""
+    for prefix, name in OOXML_PART_PREFIXES:
+        if prefix in header:
+            return name
+    return ext_name if ext_name in ZIP_FORMATS else None
+
+
+def _sniff_ftyp(header, ext_name):
+    if header[4:8] != b'ftyp':
+        return None
+    size = min(int.from_bytes(header[:4], 'big'), len(header))
+    brands = {header[position:position + 4] for position in range(8, size - 3, 4)}
+    return 'heif' if brands & image_streams.HEIF_BRANDS else None
+
+
+def _sniff_pdf(header, ext_name):
+    return 'pdf' if b'%PDF-' in header[:PDF_HEADER_SEARCH] else None
+
+
+# (文件开头的签名, 处理器名称或识别函数)
+SIGNATURES = (
+    (b'\xff\xd8\xff', 'jpeg'),
+    (image_streams.PNG_SIGNATURE, 'png'),
+    (b'RIFF', _sniff_riff),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+    (b'II*\x00', 'tiff'),
+    (b'MM\x00*', 'tiff'),
+    (b'II+\x00', 'tiff'),
+    (b'MM\x00+', 'tiff'),
+    (b'BM', 'image'),
+    (b'%PDF-', 'pdf'),
+    (b'PK\x03\x04', _sniff_zip),
+    (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'doc'),
+)
+
+# 签名不在文件开头的格式
+FALLBACK_SNIFFERS = (_sniff_ftyp, _sniff_pdf)
+
+
+def _build_dispatch(signatures):
+    """按签名首字节分组，组内较长的签名优先"""
+    dispatch = {}
+    for magic, target in signatures:
+        dispatch.setdefault(magic[0], []).append((magic, target))
+    for candidates in dispatch.values():
+        candidates.sort(key=lambda candidate: len(candidate[0]), reverse=True)
+    return dispatch
+
+
+_DISPATCH = _build_dispatch(SIGNATURES)
+
+
+def sniff(header, ext_name=None):
+    """根据文件头返回处理器名称，无法识别时返回None
+
+    ext_name 为按扩展名找到的处理器名称，只用于区分无法从文件头判断具体格式的容器
+    """
+    if not header:
+        return None
+    for magic, target in _DISPATCH.get(header[0], ()):
+        if header.startswith(magic):
+            return target(header, ext_name) if callable(target) else target
+    for sniffer in FALLBACK_SNIFFERS:
+        name = sniffer(header, ext_name)
+        if name:
+            return name
+    return None
+
+
+def read_header(filepath, size=SNIFF_SIZE):
+    """读取文件开头 size 字节；文件较短时返回整个文件"""
+    with open(filepath, 'rb') as f:
+        return f.read(size)
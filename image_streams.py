@@ -0,0 +1,818 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片元数据流式清除
+直接在文件结构（JPEG段、PNG块、WebP的RIFF块、GIF扩展块、TIFF的IFD、HEIF的box）层面删除元数据，
+像素数据原样复制，不做解码和重新编码
+
+文件以只读方式映射到内存，段和块的解析只访问段头所在的页面；
+清除时先算出要保留的字节区间，再由内核直接复制这些区间（copy_file_range / sendfile），
+不支持时从映射中以memoryview切片写出，数据不经过Python对象复制
+"""
+
+import os
+import mmap
+import errno
+import contextlib
+
+# JPEG标记
+JPEG_SOI = 0xD8
+JPEG_EOI = 0xD9
+JPEG_SOS = 0xDA
+JPEG_APP1 = 0xE1   # EXIF / XMP
+JPEG_APP13 = 0xED  # Photoshop IRB / IPTC
+JPEG_APP15 = 0xEF  # 原地清除时用作填充段
+JPEG_COM = 0xFE    # 注释
+
+# 需要删除的JPEG段
+JPEG_METADATA_MARKERS = {
+    JPEG_APP1: 'APP1',
+    JPEG_APP13: 'APP13',
+    JPEG_COM: 'COM',
+}
+
+# 没有长度字段的独立标记：TEM、RST0-RST7、SOI、EOI
+JPEG_STANDALONE_MARKERS = {0x01} | set(range(0xD0, 0xDA))
+
+# PNG文件签名
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# 需要删除的PNG块：文本、EXIF和修改时间
+PNG_METADATA_CHUNKS = {b'tEXt', b'zTXt', b'iTXt', b'eXIf', b'tIME'}
+
+# WebP（RIFF容器）中需要删除的块，以及VP8X块标志字节中对应的位
+WEBP_METADATA_CHUNKS = {b'EXIF': 'EXIF', b'XMP ': 'XMP'}
+WEBP_VP8X_METADATA_FLAGS = 0x08 | 0x04
+
+# GIF块引导符和扩展标签
+GIF_SIGNATURES = (b'GIF87a', b'GIF89a')
+GIF_EXTENSION = 0x21
+GIF_IMAGE = 0x2C
+GIF_TRAILER = 0x3B
+GIF_COMMENT_LABEL = 0xFE
+GIF_APPLICATION_LABEL = 0xFF
+GIF_XMP_APPLICATION = b'XMP DataXMP'
+
+# 保留的GIF应用扩展：动画循环次数和ICC颜色配置
+GIF_KEEP_APPLICATIONS = {b'NETSCAPE2.0', b'ANIMEXTS1.0', b'ICCRGBG1012'}
+
+# TIFF字段类型对应的单个值字节数
+TIFF_TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 6: 1, 7: 1, 8: 2, 9: 4, 10: 8, 11: 4, 12: 8, 13: 4}
+
+TIFF_EXIF_IFD = 34665
+TIFF_GPS_IFD = 34853
+TIFF_INTEROP_IFD = 40965
+
+# 需要从TIFF各IFD中删除的标签
+TIFF_METADATA_TAGS = {
+    269: 'DocumentName',
+    270: 'ImageDescription',
+    271: 'Make',
+    272: 'Model',
+    305: 'Software',
+    306: 'DateTime',
+    315: 'Artist',
+    316: 'HostComputer',
+    700: 'XMP',
+    33432: 'Copyright',
+    33723: 'IPTC',
+    34377: 'Photoshop',
+    TIFF_EXIF_IFD: 'ExifIFD',
+    TIFF_GPS_IFD: 'GPSInfo',
+}
+
+# 沿IFD链最多遍历的IFD数，防止损坏文件造成长时间循环
+TIFF_MAX_IFDS = 1024
+
+# HEIF（ISOBMFF容器）文件类型
+HEIF_BRANDS = {b'heic', b'heix', b'heim', b'heis', b'hevc', b'hevx', b'mif1', b'msf1'}
+HEIF_XMP_CONTENT_TYPE = 'application/rdf+xml'
+
+# HEIF的Exif和XMP项目无法在不重写box结构的情况下删除，改为就地替换为空内容：
+# Exif项目为指向空IFD的TIFF头，XMP项目为空的 xmpmeta 元素，其余字节填充
+HEIF_EMPTY_EXIF = b'\x00\x00\x00\x00MM\x00*\x00\x00\x00\x08\x00\x00\x00\x00\x00\x00'
+HEIF_EMPTY_XMP = b'<x:xmpmeta xmlns:x="adobe:ns:meta/"/>'
+
+# 小于该长度的保留区间直接从映射写出，不值得一次内核复制调用
+KERNEL_COPY_MIN_SIZE = 64 * 1024
+
+# 内核复制不可用时的错误码（系统或文件系统不支持、跨文件系统、目标不是套接字等）
+_KERNEL_COPY_UNSUPPORTED = {errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.EOPNOTSUPP,
+                            getattr(errno, 'ENOTSUP', errno.EOPNOTSUPP),
+                            getattr(errno, 'ENOTSOCK', errno.EINVAL)}
+
+
+@contextlib.contextmanager
+def map_file(f):
+    """以只读方式映射已打开的二进制文件，产出整个文件的memoryview；空文件产出空memoryview
+
+    使用者不应在退出 with 之后继续持有从中切出的memoryview
+    """
+    if os.fstat(f.fileno()).st_size == 0:
+        yield memoryview(b'')
+        return
+    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+    try:
+        yield view
+    finally:
+        view.release()
+        try:
+            mapped.close()
+        except BufferError:
+            # 仍有切片引用映射时由垃圾回收关闭
+            pass
+
+
+def _read_u16(data, position):
+    if position + 2 > len(data):
+        raise ValueError("文件不完整")
+    return (data[position] << 8) | data[position + 1]
+
+
+def _read_u32(data, position):
+    if position + 4 > len(data):
+        raise ValueError("文件不完整")
+    return int.from_bytes(data[position:position + 4], 'big')
+
+
+def _read_uint(data, position, size, order='big'):
+    """读取 size 字节的无符号整数，size为0时返回0"""
+    if position + size > len(data):
+        raise ValueError("文件不完整")
+    return int.from_bytes(data[position:position + size], order)
+
+
+def iter_jpeg_segments(data):
+    """遍历JPEG的段，直到第一个SOS（含）或EOI为止
+
+    data 为bytes、mmap或memoryview。产出 (标记, 段起点, 载荷起点, 段终点) 偏移，
+    段起点包括标记前的填充字节0xFF；独立标记的载荷为空。SOS之后的熵编码数据不再解析
+    """
+    size = len(data)
+    if size < 2 or data[0] != 0xFF or data[1] != JPEG_SOI:
+        raise ValueError("不是有效的JPEG文件")
+
+    position = 2
+    while True:
+        if position >= size:
+            raise ValueError("JPEG文件不完整")
+        if data[position] != 0xFF:
+            raise ValueError("JPEG段结构损坏")
+        start = position
+        while position < size and data[position] == 0xFF:
+            position += 1
+        if position >= size:
+            raise ValueError("JPEG文件不完整")
+        marker = data[position]
+        position += 1
+
+        if marker in JPEG_STANDALONE_MARKERS:
+            yield marker, start, position, position
+            if marker == JPEG_EOI:
+                return
+            continue
+
+        length = _read_u16(data, position)
+        if length < 2:
+            raise ValueError("JPEG段长度无效")
+        end = position + length
+        if end > size:
+            raise ValueError("文件不完整")
+        yield marker, start, position + 2, end
+        if marker == JPEG_SOS:
+            return
+        position = end
+
+
+def iter_png_chunks(data):
+    """遍历PNG的块直到IEND（含），产出 (块类型, 块起点, 数据起点, 块终点) 偏移，块终点包括CRC"""
+    size = len(data)
+    if bytes(data[:8]) != PNG_SIGNATURE:
+        raise ValueError("不是有效的PNG文件")
+
+    position = 8
+    while True:
+        length = _read_u32(data, position)
+        if position + 8 > size:
+            raise ValueError("文件不完整")
+        chunk_type = bytes(data[position + 4:position + 8])
+        end = position + 12 + length
+        if end > size:
+            raise ValueError("文件不完整")
+        yield chunk_type, position, position + 8, end
+        if chunk_type == b'IEND':
+            return
+        position = end
+
+
+def iter_riff_chunks(data):
+    """遍历WebP的RIFF块，产出 (块类型, 块起点, 数据起点, 数据终点) 偏移
+
+    相邻块之间的填充字节不计入数据；RIFF长度之外的数据不解析
+    """
+    if len(data) < 12 or bytes(data[:4]) != b'RIFF' or bytes(data[8:12]) != b'WEBP':
+        raise ValueError("不是有效的WebP文件")
+    riff_end = 8 + _read_uint(data, 4, 4, 'little')
+    if riff_end > len(data):
+        raise ValueError("文件不完整")
+
+    position = 12
+    while position < riff_end:
+        if position + 8 > riff_end:
+            raise ValueError("文件不完整")
+        chunk_type = bytes(data[position:position + 4])
+        data_end = position + 8 + _read_uint(data, position + 4, 4, 'little')
+        if data_end > riff_end:
+            raise ValueError("文件不完整")
+        yield chunk_type, position, position + 8, data_end
+        position = min(data_end + ((data_end - position) & 1), riff_end)
+
+
+def _skip_gif_sub_blocks(data, position):
+    """跳过GIF的数据子块序列，返回结束子块之后的偏移"""
+    size = len(data)
+    while True:
+        if position >= size:
+            raise ValueError("文件不完整")
+        length = data[position]
+        position += 1 + length
+        if length == 0:
+            return position
+
+
+def _gif_color_table_size(packed):
+    return 3 << ((packed & 0x07) + 1) if packed & 0x80 else 0
+
+
+def iter_gif_blocks(data):
+    """遍历GIF的扩展块和图像块直到结尾标记（含），产出 (标签, 块起点, 块终点) 偏移
+
+    扩展块的标签为扩展类型（如0xFE注释、0xFF应用扩展），图像块为0x2C，结尾标记为0x3B；
+    图像数据子块只读取长度字节
+    """
+    size = len(data)
+    if bytes(data[:6]) not in GIF_SIGNATURES:
+        raise ValueError("不是有效的GIF文件")
+    if size < 13:
+        raise ValueError("文件不完整")
+
+    position = 13 + _gif_color_table_size(data[10])
+    while True:
+        if position >= size:
+            raise ValueError("文件不完整")
+        start = position
+        introducer = data[position]
+        if introducer == GIF_TRAILER:
+            yield GIF_TRAILER, start, start + 1
+            return
+        if introducer == GIF_EXTENSION:
+            if position + 2 > size:
+                raise ValueError("文件不完整")
+            label = data[position + 1]
+            position = _skip_gif_sub_blocks(data, position + 2)
+        elif introducer == GIF_IMAGE:
+            if position + 11 > size:
+                raise ValueError("文件不完整")
+            label = GIF_IMAGE
+            position += 10 + _gif_color_table_size(data[position + 9])
+            # 跳过LZW最小码长
+            position = _skip_gif_sub_blocks(data, position + 1)
+        else:
+            raise ValueError("GIF块结构损坏")
+        if position > size:
+            raise ValueError("文件不完整")
+        yield label, start, position
+
+
+def gif_application_id(data, start):
+    """返回从 start 开始的应用扩展块的标识（应用名称和认证码）"""
+    if start + 3 > len(data):
+        raise ValueError("文件不完整")
+    length = data[start + 2]
+    return bytes(data[start + 3:start + 3 + length])
+
+
+def _tiff_header(data):
+    """返回 (字节序, 第一个IFD的偏移)"""
+    head = bytes(data[:4])
+    if head == b'II*\x00':
+        order = 'little'
+    elif head == b'MM\x00*':
+        order = 'big'
+    elif head in (b'II+\x00', b'MM\x00+'):
+        raise ValueError("暂不支持BigTIFF")
+    else:
+        raise ValueError("不是有效的TIFF文件")
+    return order, _read_uint(data, 4, 4, order)
+
+
+def _read_tiff_ifd(data, order, offset):
+    """读取一个IFD，返回 (条目列表, IFD长度, 下一个IFD的偏移)；条目为 (标签, 类型, 个数, 条目偏移)"""
+    count = _read_uint(data, offset, 2, order)
+    end = offset + 2 + 12 * count
+    if end + 4 > len(data):
+        raise ValueError("文件不完整")
+    entries = []
+    for position in range(offset + 2, end, 12):
+        entries.append((_read_uint(data, position, 2, order), _read_uint(data, position + 2, 2, order),
+                        _read_uint(data, position + 4, 4, order), position))
+    return entries, end + 4 - offset, _read_uint(data, end, 4, order)
+
+
+def read_tiff_ifds(data):
+    """沿IFD链读取TIFF每一页的IFD，返回 (字节序, [(IFD偏移, 条目列表, IFD长度, 下一个IFD的偏移), ...])"""
+    order, offset = _tiff_header(data)
+    ifds = []
+    seen = set()
+    while offset and len(ifds) < TIFF_MAX_IFDS:
+        if offset in seen:
+            raise ValueError("TIFF的IFD链存在循环")
+        seen.add(offset)
+        entries, length, next_offset = _read_tiff_ifd(data, order, offset)
+        ifds.append((offset, entries, length, next_offset))
+        offset = next_offset
+    return order, ifds
+
+
+def tiff_value_range(data, order, entry):
+    """返回条目值所在的 (偏移, 字节数)；不超过4字节的值保存在条目内"""
+    _, field_type, count, position = entry
+    size = TIFF_TYPE_SIZES.get(field_type, 1) * count
+    if size <= 4:
+        return position + 8, size
+    return _read_uint(data, position + 8, 4, order), size
+
+
+def _collect_tiff_sub_ifd(data, order, offset, ranges, depth=0):
+    """把子IFD（EXIF、GPS、互操作性）本身及其条目值所在的区间加入 ranges"""
+    entries, length, _ = _read_tiff_ifd(data, order, offset)
+    ranges.append((offset, offset + length))
+    for entry in entries:
+        start, size = tiff_value_range(data, order, entry)
+        if size > 4:
+            ranges.append((start, start + size))
+        if entry[0] == TIFF_INTEROP_IFD and depth < 2:
+            _collect_tiff_sub_ifd(data, order, _read_uint(data, entry[3] + 8, 4, order), ranges, depth + 1)
+
+
+def _merge_ranges(ranges, size):
+    """合并重叠的区间并截断到文件长度内"""
+    merged = []
+    for start, end in sorted(ranges):
+        start, end = min(start, size), min(end, size)
+        if start >= end:
+            continue
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def _patched_pieces(size, patches):
+    """由按偏移替换的内容 [(偏移, bytes)] 生成覆盖整个文件的输出片段"""
+    pieces = []
+    position = 0
+    for offset, content in sorted(patches, key=lambda patch: patch[0]):
+        if offset < position:
+            raise ValueError("元数据区域相互重叠，文件结构异常")
+        pieces.append((position, offset - position))
+        pieces.append(content)
+        position = offset + len(content)
+    if position > size:
+        raise ValueError("文件不完整")
+    pieces.append((position, size - position))
+    return pieces
+
+
+def _read_cstring(data, position, end):
+    """读取以0结尾的UTF-8字符串，返回 (字符串, 结尾之后的偏移)"""
+    raw = bytes(data[position:end])
+    terminator = raw.find(b'\x00')
+    if terminator < 0:
+        return raw.decode('utf-8', 'replace'), end
+    return raw[:terminator].decode('utf-8', 'replace'), position + terminator + 1
+
+
+def _iter_boxes(data, start, end):
+    """遍历 [start, end) 中的ISOBMFF box，产出 (box类型, 内容起点, box终点)"""
+    position = start
+    while position + 8 <= end:
+        size = _read_uint(data, position, 4)
+        box_type = bytes(data[position + 4:position + 8])
+        header = 8
+        if size == 1:
+            size = _read_uint(data, position + 8, 8)
+            header = 16
+        elif size == 0:
+            size = end - position
+        if size < header or position + size > end:
+            raise ValueError("HEIF box结构损坏")
+        yield box_type, position + header, position + size
+        position += size
+
+
+def _read_heif_items(data, start, end):
+    """解析 iinf box，返回 {项目ID: (项目类型, 内容类型)}"""
+    version = data[start]
+    position = start + 4 + (2 if version == 0 else 4)
+    items = {}
+    for box_type, box_start, box_end in _iter_boxes(data, position, end):
+        if box_type != b'infe':
+            continue
+        version = data[box_start]
+        position = box_start + 4
+        if version >= 2:
+            id_size = 2 if version == 2 else 4
+            item_id = _read_uint(data, position, id_size)
+            position += id_size + 2
+            item_type = bytes(data[position:position + 4])
+            _, position = _read_cstring(data, position + 4, box_end)
+            content_type = ''
+            if item_type == b'mime':
+                content_type, _ = _read_cstring(data, position, box_end)
+        else:
+            item_id = _read_uint(data, position, 2)
+            _, position = _read_cstring(data, position + 4, box_end)
+            content_type, _ = _read_cstring(data, position, box_end)
+            item_type = b'mime'
+        items[item_id] = (item_type, content_type)
+    return items
+
+
+def _read_heif_locations(data, start, idat_start):
+    """解析 iloc box，返回 {项目ID: [(文件偏移, 长度), ...]}；不在文件中直接存放的项目不返回"""
+    version = data[start]
+    position = start + 4
+    offset_size, length_size = data[position] >> 4, data[position] & 0x0F
+    base_offset_size = data[position + 1] >> 4
+    index_size = data[position + 1] & 0x0F if version in (1, 2) else 0
+    position += 2
+    id_size = 4 if version == 2 else 2
+    item_count = _read_uint(data, position, id_size)
+    position += id_size
+
+    locations = {}
+    for _ in range(item_count):
+        item_id = _read_uint(data, position, id_size)
+        position += id_size
+        construction_method = 0
+        if version in (1, 2):
+            construction_method = _read_uint(data, position, 2) & 0x0F
+            position += 2
+        position += 2  # data_reference_index
+        base_offset = _read_uint(data, position, base_offset_size)
+        position += base_offset_size
+        extent_count = _read_uint(data, position, 2)
+        position += 2
+        extents = []
+        for _ in range(extent_count):
+            position += index_size
+            offset = _read_uint(data, position, offset_size)
+            length = _read_uint(data, position + offset_size, length_size)
+            position += offset_size + length_size
+            extents.append((offset, length))
+
+        if construction_method == 0:
+            origin = base_offset
+        elif construction_method == 1 and idat_start is not None:
+            origin = idat_start + base_offset
+        else:
+            continue
+        # 长度为0表示延伸到文件末尾，这种项目不是元数据，忽略
+        if all(length for _, length in extents):
+            locations[item_id] = [(origin + offset, length) for offset, length in extents]
+    return locations
+
+
+def heif_metadata_items(data):
+    """找出HEIF文件中的Exif和XMP项目，返回 [(类型 'EXIF' 或 'XMP', [(文件偏移, 长度), ...]), ...]"""
+    boxes = _iter_boxes(data, 0, len(data))
+    first = next(boxes, None)
+    if first is None or first[0] != b'ftyp':
+        raise ValueError("不是有效的HEIF文件")
+    _, start, end = first
+    brands = {bytes(data[position:position + 4]) for position in range(start, end - 3, 4)}
+    if not brands & HEIF_BRANDS:
+        raise ValueError("不是有效的HEIF文件")
+
+    for box_type, meta_start, meta_end in boxes:
+        if box_type == b'meta':
+            break
+    else:
+        return []
+
+    children = {box_type: (start, end)
+                for box_type, start, end in _iter_boxes(data, meta_start + 4, meta_end)}
+    if b'iinf' not in children or b'iloc' not in children:
+        return []
+    idat_start = children[b'idat'][0] if b'idat' in children else None
+    items = _read_heif_items(data, *children[b'iinf'])
+    locations = _read_heif_locations(data, children[b'iloc'][0], idat_start)
+
+    metadata = []
+    for item_id, (item_type, content_type) in items.items():
+        if item_id not in locations:
+            continue
+        if item_type == b'Exif':
+            metadata.append(('EXIF', locations[item_id]))
+        elif item_type == b'mime' and content_type.split(';')[0].strip() == HEIF_XMP_CONTENT_TYPE:
+            metadata.append(('XMP', locations[item_id]))
+    for _, extents in metadata:
+        for offset, length in extents:
+            if offset + length > len(data):
+                raise ValueError("文件不完整")
+    return metadata
+
+
+def heif_item_bytes(data, extents):
+    return b''.join(bytes(data[offset:offset + length]) for offset, length in extents)
+
+
+def heif_exif_tiff(payload):
+    """从HEIF的Exif项目内容中取出TIFF结构的EXIF数据（跳过开头的TIFF头偏移）"""
+    if len(payload) < 4:
+        return b''
+    return payload[4 + int.from_bytes(payload[:4], 'big'):]
+
+
+def heif_item_is_empty(kind, payload):
+    """判断Exif/XMP项目是否已没有内容（例如已被清除）"""
+    if kind == 'XMP':
+        return payload.strip(b' \t\r\n\x00') in (b'', HEIF_EMPTY_XMP)
+    tiff = heif_exif_tiff(payload)
+    if len(tiff) < 10 or tiff[:2] not in (b'II', b'MM'):
+        return True
+    order = 'little' if tiff[:2] == b'II' else 'big'
+    offset = int.from_bytes(tiff[4:8], order)
+    return offset + 2 > len(tiff) or int.from_bytes(tiff[offset:offset + 2], order) == 0
+
+
+def _keep_spans(removed_ranges, stop):
+    """由按顺序排列的删除区间 [(起点, 终点)] 计算 [0, stop) 中保留的区间 [(偏移, 长度)]"""
+    spans = []
+    position = 0
+    for start, end in removed_ranges:
+        if start > position:
+            spans.append((position, start - position))
+        position = end
+    if stop > position:
+        spans.append((position, stop - position))
+    return spans
+
+
+def jpeg_keep_spans(data):
+    """计算清除JPEG的APP1、APP13和COM段后保留的区间，返回 (区间列表, 被删除段的名称列表)
+
+    SOS之后的熵编码数据和后续扫描全部保留；文件在SOS之前以EOI结束时，EOI之后的数据丢弃
+    """
+    removed = []
+    removed_ranges = []
+    stop = len(data)
+    for marker, start, _, end in iter_jpeg_segments(data):
+        if marker in JPEG_METADATA_MARKERS:
+            removed.append(JPEG_METADATA_MARKERS[marker])
+            removed_ranges.append((start, end))
+        elif marker == JPEG_EOI:
+            stop = end
+    return _keep_spans(removed_ranges, stop), removed
+
+
+def jpeg_inplace_patches(data):
+    """计算原地清除JPEG的APP1、APP13和COM段所需的修改，返回 ([(偏移, bytes)], 被清除段的名称列表)
+
+    段的位置和长度不变：标记改为APP15，段内容全部置零，解码器把这些段当作填充跳过
+    """
+    patches = []
+    removed = []
+    for marker, _, payload, end in iter_jpeg_segments(data):
+        if marker in JPEG_METADATA_MARKERS:
+            removed.append(JPEG_METADATA_MARKERS[marker])
+            patches.append((payload - 3, bytes((JPEG_APP15,))))
+            if end > payload:
+                patches.append((payload, bytes(end - payload)))
+    return patches, removed
+
+
+def png_keep_spans(data):
+    """计算清除PNG的 tEXt、zTXt、iTXt、eXIf 和 tIME 块后保留的区间，返回 (区间列表, 被删除块的类型列表)
+
+    其余块（包括IDAT）连同原CRC保留，IEND之后的数据丢弃
+    """
+    removed = []
+    removed_ranges = []
+    stop = 0
+    for chunk_type, start, _, end in iter_png_chunks(data):
+        if chunk_type in PNG_METADATA_CHUNKS:
+            removed.append(chunk_type.decode('ascii'))
+            removed_ranges.append((start, end))
+        stop = end
+    return _keep_spans(removed_ranges, stop), removed
+
+
+def webp_keep_spans(data):
+    """计算清除WebP的EXIF和XMP块后的输出片段，返回 (片段列表, 被删除块的名称列表)
+
+    同时清除VP8X块中对应的标志位并改写RIFF长度，图像和动画块原样保留
+    """
+    removed = []
+    pieces = []
+    riff_size = 4
+    riff_end = 8 + _read_uint(data, 4, 4, 'little')
+    for chunk_type, start, data_start, data_end in iter_riff_chunks(data):
+        if chunk_type in WEBP_METADATA_CHUNKS:
+            removed.append(WEBP_METADATA_CHUNKS[chunk_type])
+            continue
+        end = min(data_end + ((data_end - start) & 1), riff_end)
+        if chunk_type == b'VP8X' and data_end > data_start:
+            pieces.append((start, data_start - start))
+            pieces.append(bytes((data[data_start] & ~WEBP_VP8X_METADATA_FLAGS,)))
+            pieces.append((data_start + 1, end - data_start - 1))
+        else:
+            pieces.append((start, end - start))
+        riff_size += end - start
+    header = b'RIFF' + riff_size.to_bytes(4, 'little') + b'WEBP'
+    return [header] + pieces, removed
+
+
+def gif_keep_spans(data):
+    """计算清除GIF注释扩展和应用扩展（保留动画循环和颜色配置）后保留的区间，返回 (区间列表, 被删除块的名称列表)"""
+    removed = []
+    removed_ranges = []
+    stop = len(data)
+    for label, start, end in iter_gif_blocks(data):
+        if label == GIF_COMMENT_LABEL:
+            removed.append('Comment')
+            removed_ranges.append((start, end))
+        elif label == GIF_APPLICATION_LABEL:
+            identifier = gif_application_id(data, start)
+            if identifier in GIF_KEEP_APPLICATIONS:
+                continue
+            removed.append('XMP' if identifier == GIF_XMP_APPLICATION
+                           else identifier.decode('latin-1').rstrip('\x00'))
+            removed_ranges.append((start, end))
+        elif label == GIF_TRAILER:
+            stop = end
+    return _keep_spans(removed_ranges, stop), removed
+
+
+def tiff_keep_spans(data):
+    """计算清除TIFF各页IFD中元数据标签后的输出片段，返回 (片段列表, 被删除标签的名称列表)
+
+    IFD就地重写为只含其余条目；被删除标签的值以及EXIF、GPS子IFD原位置填0，
+    图像数据和其余字节的位置都不变，无需修改任何偏移
+    """
+    order, ifds = read_tiff_ifds(data)
+    removed = []
+    patches = []
+    cleared = []
+    for offset, entries, length, next_offset in ifds:
+        kept = []
+        for entry in entries:
+            tag = entry[0]
+            if tag not in TIFF_METADATA_TAGS:
+                kept.append(entry)
+                continue
+            if TIFF_METADATA_TAGS[tag] not in removed:
+                removed.append(TIFF_METADATA_TAGS[tag])
+            start, size = tiff_value_range(data, order, entry)
+            if size > 4:
+                cleared.append((start, start + size))
+            if tag in (TIFF_EXIF_IFD, TIFF_GPS_IFD):
+                try:
+                    _collect_tiff_sub_ifd(data, order, _read_uint(data, entry[3] + 8, 4, order), cleared)
+                except ValueError:
+                    # 子IFD指针损坏时只删除指针条目
+                    pass
+        if len(kept) == len(entries):
+            continue
+        ifd = bytearray(len(kept).to_bytes(2, order))
+        for entry in kept:
+            ifd += data[entry[3]:entry[3] + 12]
+        ifd += next_offset.to_bytes(4, order)
+        ifd += bytes(length - len(ifd))
+        patches.append((offset, bytes(ifd)))
+
+    patches.extend((start, bytes(end - start)) for start, end in _merge_ranges(cleared, len(data)))
+    return _patched_pieces(len(data), patches), removed
+
+
+def heif_keep_spans(data):
+    """计算清除HEIF中Exif和XMP项目内容后的输出片段，返回 (片段列表, 被清除项目的类型列表)
+
+    项目在 meta box 中的登记和文件中其余所有字节都不变，只替换项目内容
+    """
+    removed = []
+    patches = []
+    for kind, extents in heif_metadata_items(data):
+        if heif_item_is_empty(kind, heif_item_bytes(data, extents)):
+            continue
+        removed.append(kind)
+        total = sum(length for _, length in extents)
+        if kind == 'EXIF':
+            empty = HEIF_EMPTY_EXIF if total >= len(HEIF_EMPTY_EXIF) else b''
+            content = empty.ljust(total, b'\x00')
+        else:
+            empty = HEIF_EMPTY_XMP if total >= len(HEIF_EMPTY_XMP) else b''
+            content = empty.ljust(total, b' ')
+        position = 0
+        for offset, length in extents:
+            patches.append((offset, content[position:position + length]))
+            position += length
+    return _patched_pieces(len(data), patches), removed
+
+
+def _write_all(dst, data):
+    """把 data（memoryview）完整写入无缓冲的 dst"""
+    while len(data):
+        written = dst.write(data)
+        data = data[written:]
+
+
+def _copy_file_range(src_fd, dst_fd, offset, count):
+    return os.copy_file_range(src_fd, dst_fd, count, offset)
+
+
+def _sendfile(src_fd, dst_fd, offset, count):
+    return os.sendfile(dst_fd, src_fd, offset, count)
+
+
+def _kernel_copiers():
+    copiers = []
+    if hasattr(os, 'copy_file_range'):
+        copiers.append(_copy_file_range)
+    if hasattr(os, 'sendfile'):
+        copiers.append(_sendfile)
+    return copiers
+
+
+def copy_spans(src, dst, spans, data):
+    """把 src 中的区间 [(偏移, 长度)] 依次写到 dst 的当前位置；片段为bytes时直接写入该内容
+
+    data 为 src 的映射；dst 应以无缓冲方式打开（buffering=0）。较大的区间优先由内核复制，
+    不支持时从 data 以memoryview切片写出
+    """
+    copiers = _kernel_copiers()
+    src_fd = src.fileno()
+    dst_fd = dst.fileno()
+    for piece in spans:
+        if isinstance(piece, bytes):
+            _write_all(dst, memoryview(piece))
+            continue
+        offset, count = piece
+        while count >= KERNEL_COPY_MIN_SIZE and copiers:
+            try:
+                copied = copiers[0](src_fd, dst_fd, offset, count)
+            except OSError as e:
+                if e.errno not in _KERNEL_COPY_UNSUPPORTED:
+                    raise
+                copiers.pop(0)
+                continue
+            if copied == 0:
+                # 个别文件系统不报错但不复制任何数据，改用下一种方式
+                copiers.pop(0)
+                continue
+            offset += copied
+            count -= copied
+        if count:
+            with data[offset:offset + count] as chunk:
+                _write_all(dst, chunk)
+
+
+def _strip_file(src_path, dst_path, keep_spans):
+    with open(src_path, 'rb') as src, map_file(src) as data:
+        spans, removed = keep_spans(data)
+        with open(dst_path, 'wb', buffering=0) as dst:
+            copy_spans(src, dst, spans, data)
+    return removed
+
+
+def strip_jpeg_file(src_path, dst_path):
+    """按路径清除JPEG的APP1、APP13和COM段，图像数据原样复制，返回被删除段的名称列表"""
+    return _strip_file(src_path, dst_path, jpeg_keep_spans)
+
+
+def strip_png_file(src_path, dst_path):
+    """按路径清除PNG的元数据块，其余块连同原CRC原样复制、不重新压缩，返回被删除块的类型列表"""
+    return _strip_file(src_path, dst_path, png_keep_spans)
+
+
+def strip_webp_file(src_path, dst_path):
+    """按路径清除WebP的EXIF和XMP块，图像数据原样复制，返回被删除块的名称列表"""
+    return _strip_file(src_path, dst_path, webp_keep_spans)
+
+
+def strip_gif_file(src_path, dst_path):
+    """按路径清除GIF的注释和应用扩展，图像数据原样复制，返回被删除块的名称列表"""
+    return _strip_file(src_path, dst_path, gif_keep_spans)
+
+
+def strip_tiff_file(src_path, dst_path):
+    """按路径清除TIFF的元数据标签，图像数据原样复制，返回被删除标签的名称列表"""
+    return _strip_file(src_path, dst_path, tiff_keep_spans)
+
+
+def strip_heif_file(src_path, dst_path):
+    """按路径清除HEIF的Exif和XMP项目内容，图像数据原样复制，返回被清除项目的类型列表"""
+    return _strip_file(src_path, dst_path, heif_keep_spans)
@@ -0,0 +1,518 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+原地修补元数据
+对元数据区域可以等长覆盖的格式，只改写这些字节，不复制整个文件：
+JPEG的元数据段改为置零的APP15填充段；PDF的Info字典清空为空白、trailer和目录中对Info和XMP流的引用
+改为空格、XMP流内容改为空格，所有对象偏移不变，交叉引用表无需改动
+
+修改前先把被覆盖区域的原内容写入备份日志并同步到磁盘，全部修改写完并同步后删除日志；
+中途中断时日志仍在，recover() 写回原内容，文件恢复为修改前的状态。修补和恢复期间持有该文件的锁，
+其他进程不会恢复正在进行的修补；恢复前逐个区域核对内容仍是原内容或本次写入的内容，
+文件之后被其他程序改写过时不写回
+
+原地修改会同时影响指向同一文件的所有硬链接，且不改变文件的权限和属主
+"""
+
+import os
+import re
+import json
+import base64
+import hashlib
+import contextlib
+
+import image_streams
+import safe_writer
+import scan_cache
+
+PATCH_JOURNAL_VERSION = 2
+PATCH_JOURNAL_SUFFIX = '.json'
+PATCH_LOCK_SUFFIX = '.lock'
+
+# PDF尾部中查找 startxref 的范围
+PDF_TAIL_SIZE = 1024
+
+# 沿 /Prev 最多读取的交叉引用表数量，防止循环引用
+PDF_MAX_REVISIONS = 4096
+
+# Info字典中的键对应的 PyMuPDF metadata 键
+PDF_INFO_KEYS = {
+    b'Title': 'title',
+    b'Author': 'author',
+    b'Subject': 'subject',
+    b'Keywords': 'keywords',
+    b'Creator': 'creator',
+    b'Producer': 'producer',
+    b'CreationDate': 'creationDate',
+    b'ModDate': 'modDate',
+    b'Trapped': 'trapped',
+}
+
+_STARTXREF = re.compile(rb'startxref\s+(\d+)')
+_XREF_KEYWORD = re.compile(rb'\s*xref\s*')
+_XREF_SUBSECTION = re.compile(rb'(\d+)[ \t]+(\d+)[ \t]*(?:\r\n|\r|\n)')
+_XREF_ENTRY = re.compile(rb'(\d{10}) (\d{5}) ([nf])(?: \r| \n|\r\n|\r|\n)')
+_TRAILER = re.compile(rb'\s*trailer\s*<<')
+_INFO_REF = re.compile(rb'/Info\s+(\d+)\s+(\d+)\s+R')
+_ROOT_REF = re.compile(rb'/Root\s+(\d+)\s+(\d+)\s+R')
+_METADATA_REF = re.compile(rb'/Metadata\s+(\d+)\s+(\d+)\s+R')
+_INDIRECT_REF = re.compile(rb'(?<![0-9])(\d+)\s+(\d+)\s+R(?![A-Za-z0-9])')
+_PREV = re.compile(rb'/Prev\s+(\d+)')
+_INFO_KEY = re.compile(rb'/(' + b'|'.join(PDF_INFO_KEYS) + rb')(?![A-Za-z0-9])')
+_STREAM_KEYWORD = re.compile(rb'\s*stream(?:\r\n|\n)')
+_ENDSTREAM = re.compile(rb'(?:\r\n|\r|\n)?endstream')
+
+
+def default_patch_dir():
+    """默认备份日志目录：扫描缓存目录下的 patches 子目录"""
+    return os.path.join(os.path.dirname(scan_cache.default_cache_path()), 'patches')
+
+
+def _journal_path(filepath, directory):
+    digest = hashlib.blake2b(os.path.abspath(filepath).encode('utf-8', 'surrogatepass'), digest_size=16)
+    return os.path.join(directory, digest.hexdigest() + PATCH_JOURNAL_SUFFIX)
+
+
+def _lock_path(journal_path):
+    return journal_path[:-len(PATCH_JOURNAL_SUFFIX)] + PATCH_LOCK_SUFFIX
+
+
+def _content_digest(content):
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+def _lock_file(f, blocking, journal_path):
+    try:
+        import fcntl
+    except ImportError:
+        import msvcrt
+        f.seek(0)
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+        except OSError as e:
+            raise BlockingIOError(f"备份日志正被其他进程使用: {journal_path}") from e
+        return
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+    except BlockingIOError as e:
+        raise BlockingIOError(f"备份日志正被其他进程使用: {journal_path}") from e
+
+
+def _unlock_file(f):
+    try:
+        import fcntl
+    except ImportError:
+        import msvcrt
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        return
+    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+@contextlib.contextmanager
+def _locked(journal_path, blocking=True):
+    """持有日志对应的锁文件；blocking为False且锁被其他进程持有时抛出 BlockingIOError
+
+    释放前删除锁文件，目录中不留下锁文件。加锁后核对路径上仍是同一个文件（inode相同），
+    不同说明前一个持有者已将其删除，重新打开再加锁，两个进程不会各自锁住不同的文件
+    """
+    os.makedirs(os.path.dirname(journal_path), exist_ok=True)
+    lock_path = _lock_path(journal_path)
+    while True:
+        f = open(lock_path, 'a+b')
+        try:
+            _lock_file(f, blocking, journal_path)
+            opened = os.fstat(f.fileno())
+            try:
+                current = os.stat(lock_path)
+            except FileNotFoundError:
+                current = None
+        except BaseException:
+            f.close()
+            raise
+        if current is not None and (current.st_dev, current.st_ino) == (opened.st_dev, opened.st_ino):
+            break
+        _unlock_file(f)
+        f.close()
+    try:
+        yield
+    finally:
+        try:
+            os.remove(lock_path)
+        except OSError:
+            pass
+        _unlock_file(f)
+        f.close()
+
+
+# ---------------------------------------------------------------------------
+# PDF
+# ---------------------------------------------------------------------------
+
+def _pdf_string_end(data, position):
+    """position 指向字面字符串的 '('，返回匹配的 ')' 之后的偏移"""
+    depth = 0
+    size = len(data)
+    while position < size:
+        byte = data[position]
+        if byte == 0x5C:    # '\\' 转义下一个字节
+            position += 2
+            continue
+        if byte == 0x28:
+            depth += 1
+        elif byte == 0x29:
+            depth -= 1
+            if depth == 0:
+                return position + 1
+        position += 1
+    raise ValueError("PDF字符串不完整")
+
+
+def _pdf_dict_end(data, position):
+    """position 指向 '<<'，返回匹配的 '>>' 之后的偏移；跳过字符串和注释中的尖括号"""
+    depth = 0
+    size = len(data)
+    while position < size:
+        byte = data[position]
+        if byte == 0x28:    # '('
+            position = _pdf_string_end(data, position)
+            continue
+        if byte == 0x25:    # '%' 注释到行尾
+            while position < size and data[position] not in (0x0D, 0x0A):
+                position += 1
+            continue
+        if byte == 0x3C:    # '<'
+            if position + 1 < size and data[position + 1] == 0x3C:
+                depth += 1
+                position += 2
+                continue
+            while position < size and data[position] != 0x3E:
+                position += 1
+        elif byte == 0x3E and position + 1 < size and data[position + 1] == 0x3E:
+            depth -= 1
+            position += 2
+            if depth == 0:
+                return position
+            continue
+        position += 1
+    raise ValueError("PDF字典不完整")
+
+
+def _read_xref_section(data, offset):
+    """读取 offset 处的传统交叉引用表，返回 (子节列表 [(首对象号, 数量, 表项起点, 表项长度)], trailer字典区间)
+
+    offset 处是交叉引用流时返回None
+    """
+    match = _XREF_KEYWORD.match(data, offset)
+    if not match:
+        return None
+    position = match.end()
+    sections = []
+    while True:
+        trailer = _TRAILER.match(data, position)
+        if trailer:
+            start = trailer.end() - 2
+            return sections, (start, _pdf_dict_end(data, start))
+        subsection = _XREF_SUBSECTION.match(data, position)
+        if not subsection:
+            raise ValueError("PDF交叉引用表损坏")
+        first, count = int(subsection.group(1)), int(subsection.group(2))
+        position = subsection.end()
+        entry_length = 20
+        if count:
+            entry = _XREF_ENTRY.match(data, position)
+            if not entry:
+                raise ValueError("PDF交叉引用表损坏")
+            entry_length = entry.end() - position
+        sections.append((first, count, position, entry_length))
+        position += count * entry_length
+
+
+def _read_revisions(data):
+    """沿 startxref 和 /Prev 读取所有交叉引用表，新的在前，返回 [(子节列表, trailer字典bytes, trailer字典偏移)]
+
+    遇到交叉引用流或混合格式（/XRefStm）时返回None
+    """
+    tail_start = max(0, len(data) - PDF_TAIL_SIZE)
+    matches = list(_STARTXREF.finditer(bytes(data[tail_start:])))
+    if not matches:
+        raise ValueError("PDF文件尾部损坏")
+    offset = int(matches[-1].group(1))
+    revisions = []
+    seen = set()
+    while offset not in seen and len(revisions) < PDF_MAX_REVISIONS:
+        seen.add(offset)
+        if offset >= len(data):
+            raise ValueError("PDF交叉引用表偏移无效")
+        section = _read_xref_section(data, offset)
+        if section is None:
+            return None
+        sections, (start, end) = section
+        trailer = bytes(data[start:end])
+        if b'/XRefStm' in trailer:
+            return None
+        revisions.append((sections, trailer, start))
+        prev = _PREV.search(trailer)
+        if not prev:
+            break
+        offset = int(prev.group(1))
+    return revisions
+
+
+def _object_offsets(data, revisions, number, generation):
+    """返回对象在各版本交叉引用表中登记的全部偏移（去重、按出现顺序）"""
+    offsets = []
+    for sections, _, _ in revisions:
+        for first, count, position, entry_length in sections:
+            if not first <= number < first + count:
+                continue
+            entry = _XREF_ENTRY.match(data, position + (number - first) * entry_length)
+            if not entry:
+                raise ValueError("PDF交叉引用表损坏")
+            if entry.group(3) == b'n' and int(entry.group(2)) == generation:
+                offset = int(entry.group(1))
+                if offset not in offsets:
+                    offsets.append(offset)
+    return offsets
+
+
+def _object_dict(data, offset, number, generation):
+    """返回 offset 处对象的字典区间 (起点, 终点)；不是 'N G obj <<...>>' 形式时返回None"""
+    header = re.compile(rb'\s*' + str(number).encode() + rb'\s+' + str(generation).encode()
+                        + rb'\s+obj\s*<<')
+    match = header.match(data, offset)
+    if not match:
+        return None
+    start = match.end() - 2
+    return start, _pdf_dict_end(data, start)
+
+
+def _object_value_span(data, offset, number, generation):
+    """返回 offset 处对象中字符串值的内容区间（不含括号）；值不是字符串时返回None"""
+    header = re.compile(rb'\s*' + str(number).encode() + rb'\s+' + str(generation).encode()
+                        + rb'\s+obj\s*[(<]')
+    match = header.match(data, offset)
+    if not match:
+        return None
+    start = match.end() - 1
+    if data[start] == 0x28:
+        return start + 1, _pdf_string_end(data, start) - 1
+    if start + 1 < len(data) and data[start + 1] == 0x3C:
+        return None
+    end = start
+    while end < len(data) and data[end] != 0x3E:
+        end += 1
+    return start + 1, end
+
+
+def _blank(patches, start, end):
+    """把 [start, end) 登记为替换成空格"""
+    patches[start] = b' ' * (end - start)
+
+
+def pdf_inplace_patches(data):
+    """计算原地清除PDF的Info字典和XMP元数据所需的修改，返回 ([(偏移, bytes)], 被删除的元数据名称列表)
+
+    只支持传统交叉引用表（含增量更新和线性化文件），所有版本中的Info字典和目录引用的XMP流都被清除；
+    使用交叉引用流、对象不在登记的位置等无法原地修补的情况返回None
+    """
+    revisions = _read_revisions(data)
+    if revisions is None:
+        return None
+
+    patches = {}
+    info_refs = set()
+    root_refs = set()
+    for _, trailer, trailer_start in revisions:
+        info = _INFO_REF.search(trailer)
+        if info:
+            info_refs.add((int(info.group(1)), int(info.group(2))))
+            _blank(patches, trailer_start + info.start(), trailer_start + info.end())
+        root = _ROOT_REF.search(trailer)
+        if root:
+            root_refs.add((int(root.group(1)), int(root.group(2))))
+
+    removed = []
+    for number, generation in sorted(info_refs):
+        for offset in _object_offsets(data, revisions, number, generation):
+            span = _object_dict(data, offset, number, generation)
+            if span is None:
+                return None
+            start, end = span
+            content = bytes(data[start:end])
+            for key in _INFO_KEY.findall(content):
+                if PDF_INFO_KEYS[key] not in removed:
+                    removed.append(PDF_INFO_KEYS[key])
+            _blank(patches, start + 2, end - 2)
+            # 值为间接引用的字符串对象一并清空
+            for match in _INDIRECT_REF.finditer(content):
+                value_number, value_generation = int(match.group(1)), int(match.group(2))
+                for value_offset in _object_offsets(data, revisions, value_number, value_generation):
+                    value = _object_value_span(data, value_offset, value_number, value_generation)
+                    if value is None:
+                        return None
+                    _blank(patches, *value)
+
+    metadata_refs = set()
+    for number, generation in sorted(root_refs):
+        for offset in _object_offsets(data, revisions, number, generation):
+            span = _object_dict(data, offset, number, generation)
+            if span is None:
+                return None
+            start, end = span
+            for match in _METADATA_REF.finditer(bytes(data[start:end])):
+                metadata_refs.add((int(match.group(1)), int(match.group(2))))
+                _blank(patches, start + match.start(), start + match.end())
+
+    for number, generation in sorted(metadata_refs):
+        for offset in _object_offsets(data, revisions, number, generation):
+            span = _object_dict(data, offset, number, generation)
+            stream = span and _STREAM_KEYWORD.match(data, span[1])
+            if not stream:
+                return None
+            end = _ENDSTREAM.search(data, stream.end())
+            if not end:
+                raise ValueError("PDF流不完整")
+            _blank(patches, stream.end(), end.start())
+        if 'XMP' not in removed:
+            removed.append('XMP')
+
+    return sorted(patches.items()), removed
+
+
+# ---------------------------------------------------------------------------
+# 修补与恢复
+# ---------------------------------------------------------------------------
+
+def _write_patches(f, patches):
+    for offset, content in patches:
+        f.seek(offset)
+        f.write(content)
+    f.flush()
+
+
+def _sync_file(f, durability):
+    if durability != safe_writer.DURABILITY_NONE:
+        os.fsync(f.fileno())
+
+
+def patch_file(filepath, planner, durability=safe_writer.DURABILITY_FILE, directory=None):
+    """用 planner(映射) 计算修改并原地写入文件，返回被清除的元数据名称列表
+
+    planner 返回 ([(偏移, bytes)], 名称列表)，无法原地修补时返回None，此时本函数也返回None、文件不变。
+    该文件有上次中断留下的备份日志时先恢复；其他进程正在修补同一文件时等待其完成。
+    durability 为 none 时备份日志和文件都不同步到磁盘
+    """
+    directory = directory or default_patch_dir()
+    journal_path = _journal_path(filepath, directory)
+    with _locked(journal_path):
+        if os.path.exists(journal_path):
+            try:
+                _recover(journal_path)
+            except ValueError:
+                # 文件之后已被其他程序改写，旧备份不再适用
+                os.remove(journal_path)
+
+        with open(filepath, 'rb') as f, image_streams.map_file(f) as data:
+            plan = planner(data)
+            if plan is None:
+                return None
+            patches, removed = plan
+            patches = [(offset, content) for offset, content in patches if content]
+            size = len(data)
+            if any(offset + len(content) > size for offset, content in patches):
+                raise ValueError("文件不完整")
+            backup = [bytes(data[offset:offset + len(content)]) for offset, content in patches]
+        changed = [(patch, original) for patch, original in zip(patches, backup) if patch[1] != original]
+        if not changed:
+            return removed
+
+        journal = {
+            'version': PATCH_JOURNAL_VERSION,
+            'path': os.path.abspath(filepath),
+            'size': size,
+            'ranges': [[offset, base64.b64encode(original).decode('ascii'), _content_digest(content)]
+                       for (offset, content), original in changed],
+        }
+        journal_durability = (safe_writer.DURABILITY_NONE if durability == safe_writer.DURABILITY_NONE
+                              else safe_writer.DURABILITY_DIRECTORY)
+        with safe_writer.AtomicOutput(journal_path, journal_durability, preserve=False) as output:
+            with open(output.path, 'w', encoding='utf-8') as f:
+                json.dump(journal, f, ensure_ascii=False)
+
+        with open(filepath, 'r+b') as f:
+            _write_patches(f, [patch for patch, _ in changed])
+            _sync_file(f, durability)
+        os.remove(journal_path)
+        return removed
+
+
+def _recover(journal_path):
+    """在已持有锁时按备份日志写回原内容并删除日志，返回被恢复的文件路径"""
+    with open(journal_path, 'r', encoding='utf-8') as f:
+        journal = json.load(f)
+    if journal.get('version') != PATCH_JOURNAL_VERSION:
+        raise ValueError(f"不支持的备份日志版本: {journal.get('version')}")
+    filepath = journal['path']
+    if not os.path.exists(filepath):
+        raise ValueError(f"文件已不存在: {filepath}")
+    if os.path.getsize(filepath) != journal['size']:
+        raise ValueError(f"文件已被改写，无法恢复: {filepath}")
+
+    originals = []
+    with open(filepath, 'r+b') as f:
+        # 每个区域应是原内容（尚未写入）或本次修补写入的内容，否则文件已被其他程序改写
+        for offset, encoded, patched_digest in journal['ranges']:
+            original = base64.b64decode(encoded)
+            f.seek(offset)
+            current = f.read(len(original))
+            if current != original and _content_digest(current) != patched_digest:
+                raise ValueError(f"文件已被改写，无法恢复: {filepath}")
+            originals.append((offset, original))
+        _write_patches(f, originals)
+        os.fsync(f.fileno())
+    os.remove(journal_path)
+    return filepath
+
+
+def recover(journal_path):
+    """按备份日志写回被覆盖区域的原内容并删除日志，返回被恢复的文件路径
+
+    文件已不存在或之后被其他程序改写过时抛出 ValueError，日志保留；
+    其他进程正持有该文件的锁（修补正在进行）时抛出 BlockingIOError
+    """
+    with _locked(journal_path, blocking=False):
+        return _recover(journal_path)
+
+
+def recover_all(directory=None):
+    """恢复目录中所有中断的原地修补，按 (文件路径或日志路径, 是否成功, 错误信息或None) 产出
+
+    其他进程正在进行的修补跳过，不产出
+    """
+    directory = directory or default_patch_dir()
+    try:
+        names = sorted(os.listdir(directory))
+    except OSError:
+        return
+    for name in names:
+        if name.endswith(PATCH_LOCK_SUFFIX):
+            # 旧版本留下的锁文件：没有对应的日志且未被持有时删除
+            journal_path = os.path.join(directory, name[:-len(PATCH_LOCK_SUFFIX)] + PATCH_JOURNAL_SUFFIX)
+            if not os.path.exists(journal_path):
+                try:
+                    with _locked(journal_path, blocking=False):
+                        pass
+                except OSError:
+                    pass
+            continue
+        if not name.endswith(PATCH_JOURNAL_SUFFIX):
+            continue
+        journal_path = os.path.join(directory, name)
+        try:
+            yield recover(journal_path), True, None
+        except (BlockingIOError, FileNotFoundError):
+            # 修补正在其他进程中进行，或在列出目录之后已经完成
+            continue
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            yield journal_path, False, str(e)
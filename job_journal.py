@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量任务日志
+批量清除开始时把任务（操作、选项、文件列表）写入日志文件，此后每完成一个文件追加一行记录；
+程序或机器中途退出后重新打开同一任务，只处理失败和尚未处理的文件
+
+日志为JSON Lines文件：第一行是任务头，其后每行一条文件记录，同一路径以最后一条记录为准；
+每条记录以一次追加写入完成，中断时写了一半的最后一行在重新打开时删除
+"""
+
+import os
+import json
+import time
+import hashlib
+
+import metadata_engine as engine
+import safe_writer
+import scan_cache
+
+JOURNAL_VERSION = 1
+
+# 两次fsync之间的最长间隔（秒）；机器断电时最多丢失这段时间内的记录，
+# 这些文件重新处理一次即可（清除属性可重复执行）
+SYNC_INTERVAL = 1.0
+
+JOURNAL_SUFFIX = '.jsonl'
+
+
+def default_journal_dir():
+    """默认日志目录：扫描缓存目录下的 jobs 子目录"""
+    return os.path.join(os.path.dirname(scan_cache.default_cache_path()), 'jobs')
+
+
+def job_id(action, files, options=engine.DEFAULT_OPTIONS):
+    """由操作、全部选项和文件列表计算任务ID，同一批文件以相同选项再次处理时得到同一个ID"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{action}\0".encode('utf-8'))
+    for name in engine.ProcessOptions.__slots__:
+        digest.update(f"{name}={getattr(options, name)!r}\0".encode('utf-8'))
+    for filepath in files:
+        digest.update(filepath.encode('utf-8', 'surrogatepass') + b'\0')
+    return digest.hexdigest()
+
+
+def _encode(data):
+    return (json.dumps(data, ensure_ascii=False) + '\n').encode('utf-8', 'surrogatepass')
+
+
+class JobJournal:
+    """一个批量任务的日志，同一实例只能在一个线程中写入
+
+    用 create() 新建或继续任务，用 load() 打开已有日志；日志文件在第一次写入记录时才以追加方式打开
+    """
+
+    def __init__(self, path, header, records):
+        self.path = path
+        self.job = header['job']
+        self.action = header['action']
+        self.options = engine.ProcessOptions(**header['options'])
+        self.created = header['created']
+        self.files = header['files']
+        self._records = records
+        self._file = None
+        self._last_sync = time.monotonic()
+
+    @classmethod
+    def create(cls, action, files, options=engine.DEFAULT_OPTIONS, directory=None, resume=True):
+        """新建任务日志；resume为True且同一任务的日志已存在时继续该任务"""
+        files = list(files)
+        directory = directory or default_journal_dir()
+        os.makedirs(directory, exist_ok=True)
+        identifier = job_id(action, files, options)
+        path = os.path.join(directory, identifier + JOURNAL_SUFFIX)
+        if resume and os.path.exists(path):
+            try:
+                return cls.load(path)
+            except (OSError, ValueError, KeyError, TypeError):
+                pass
+
+        header = {
+            'version': JOURNAL_VERSION,
+            'job': identifier,
+            'action': action,
+            'options': {name: getattr(options, name) for name in engine.ProcessOptions.__slots__},
+            'created': time.time(),
+            'files': files,
+        }
+        with safe_writer.AtomicOutput(path, safe_writer.DURABILITY_DIRECTORY, preserve=False) as output:
+            with open(output.path, 'wb') as f:
+                f.write(_encode(header))
+        return cls(path, header, {})
+
+    @classmethod
+    def load(cls, path):
+        """打开已有任务日志，日志损坏时抛出 ValueError"""
+        with open(path, 'rb+') as f:
+            data = f.read()
+            end = data.rfind(b'\n') + 1
+            if end != len(data):
+                f.truncate(end)
+
+        lines = data[:end].splitlines()
+        if not lines:
+            raise ValueError(f"任务日志为空: {path}")
+        header = json.loads(lines[0].decode('utf-8', 'surrogatepass'))
+        if header.get('version') != JOURNAL_VERSION:
+            raise ValueError(f"不支持的任务日志版本: {header.get('version')}")
+
+        records = {}
+        for line in lines[1:]:
+            try:
+                record = json.loads(line.decode('utf-8', 'surrogatepass'))
+            except ValueError:
+                continue
+            records[record['path']] = record
+        return cls(path, header, records)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def total(self):
+        return len(self.files)
+
+    @property
+    def done_count(self):
+        """已成功处理的文件数"""
+        return sum(1 for record in self._records.values() if record['ok'])
+
+    @property
+    def failed_count(self):
+        return sum(1 for record in self._records.values() if not record['ok'])
+
+    def is_done(self, filepath):
+        record = self._records.get(filepath)
+        return record is not None and record['ok']
+
+    def pending_files(self):
+        """按原顺序返回失败和尚未处理的文件"""
+        return [filepath for filepath in self.files if not self.is_done(filepath)]
+
+    def record(self, filepath, ok, value):
+        """追加一个文件的处理结果"""
+        record = {'path': filepath, 'ok': ok, 'result' if ok else 'error': value}
+        self._records[filepath] = record
+        if self._file is None:
+            self._file = open(self.path, 'ab')
+        self._file.write(_encode(record))
+        self._file.flush()
+        now = time.monotonic()
+        if now - self._last_sync >= SYNC_INTERVAL:
+            os.fsync(self._file.fileno())
+            self._last_sync = now
+
+    def close(self):
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+    def discard(self):
+        """关闭并删除日志，任务全部成功或放弃任务时调用"""
+        self.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def find_unfinished(directory=None):
+    """返回目录中所有未完成的任务日志，最近创建的在前；损坏的日志被跳过"""
+    directory = directory or default_journal_dir()
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+
+    journals = []
+    for name in names:
+        if not name.endswith(JOURNAL_SUFFIX):
+            continue
+        try:
+            journals.append(JobJournal.load(os.path.join(directory, name)))
+        except (OSError, ValueError, KeyError, TypeError):
+            continue
+    journals.sort(key=lambda journal: journal.created, reverse=True)
+    return journals
+
+
+def format_job(journal):
+    """生成任务的说明文字"""
+    created = time.strftime('%Y-%m-%d %H:%M', time.localtime(journal.created))
+    text = f"创建于 {created}，共 {journal.total} 个文件，已完成 {journal.done_count} 个"
+    if journal.failed_count:
+        text += f"，失败 {journal.failed_count} 个"
+    return text
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文件属性管理器命令行版
+无需图形界面，可在服务器、定时任务和CI流水线中批量查看或清除文件属性
+
+用法示例:
+    python metadata_cli.py probe /mnt/share --json
+    python metadata_cli.py inspect ~/照片 "共享盘/**/*.pdf"
+    python metadata_cli.py clear /data/docs --workers 8 --json
+    python metadata_cli.py clear /data/docs --cache   # 再次运行时跳过未变化的文件
+    python metadata_cli.py clear /data/scans --in-place   # 大文件只改写元数据所在的字节
+    python metadata_cli.py inspect /mnt/share --report audit.csv --resume
+
+退出码:
+    0  全部文件处理成功
+    1  部分文件处理失败
+    2  参数错误或没有找到可处理的文件
+"""
+
+import sys
+import json
+import time
+import argparse
+
+import metadata_engine as engine
+import batch_executor
+import scan_cache
+import dedup
+import batch_report
+import safe_writer
+import inplace_patch
+
+EXIT_OK = 0
+EXIT_FAILURES = 1
+EXIT_USAGE = 2
+
+
+ACTIONS = tuple(batch_report.ROW_BUILDERS)
+
+
+def print_record(record, as_json):
+    if as_json:
+        print(json.dumps(record, ensure_ascii=False), flush=True)
+    elif record['ok']:
+        print(f"✅ {record['path']}: {record['result']}", flush=True)
+    else:
+        print(f"❌ {record['path']}: 失败 - {record['error']}", flush=True)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="批量查看或清除图片、PDF、Word文档的属性信息")
+    parser.add_argument('action', choices=sorted(ACTIONS),
+                        help="probe: 只读取文件头尾快速检测是否含有元数据; "
+                             "inspect: 查看属性摘要; clear: 清除属性")
+    parser.add_argument('paths', nargs='+',
+                        help="文件、目录或通配符（支持 ** 递归匹配）")
+    parser.add_argument('-w', '--workers', type=int, default=batch_executor.default_workers(),
+                        help="并行工作进程数（默认: CPU核心数）")
+    parser.add_argument('--threads', action='store_true',
+                        help="使用线程池代替进程池，适合网络共享盘等以等待I/O为主的场景")
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help="每次分配给工作进程的文件数（默认: 自动）")
+    parser.add_argument('--pdf-mode', choices=engine.PDF_MODES, default=engine.PDF_MODE_FULL,
+                        help="PDF清除方式: full 完整重写（默认）; incremental 增量追加，"
+                             "速度快但旧元数据仍留在文件早期版本中; compact 重写并回收无用对象")
+    parser.add_argument('--durability', choices=safe_writer.DURABILITY_LEVELS,
+                        default=safe_writer.DURABILITY_FILE,
+                        help="替换原文件时的持久化级别: none 不同步; file 替换前同步文件内容（默认）; "
+                             "dir 另外同步所在目录，断电后替换也不会丢失")
+    parser.add_argument('--in-place', action='store_true',
+                        help="JPEG和PDF原地修补元数据所在的字节，不复制整个文件，适合很大的文件；"
+                             "修改前备份被覆盖的区域，中断后下次清除时自动恢复")
+    parser.add_argument('--no-recursive', action='store_true',
+                        help="不递归进入子目录")
+    parser.add_argument('--sniff', action='store_true',
+                        help="扩展名不在支持列表中的文件按文件头识别类型，能识别的也处理")
+    parser.add_argument('--cache', nargs='?', const=scan_cache.default_cache_path(), default=None,
+                        metavar='PATH',
+                        help="使用持久化扫描缓存，跳过自上次探测或清除后未变化的文件"
+                             f"（默认位置: {scan_cache.default_cache_path()}）")
+    parser.add_argument('--cache-max-entries', type=int, default=None,
+                        help="缓存最多保留的记录数，超出时淘汰最久未更新的记录")
+    parser.add_argument('--cache-max-age', type=float, default=None, metavar='DAYS',
+                        help="淘汰超过指定天数未更新的缓存记录")
+    parser.add_argument('--dedup', action='store_true',
+                        help="清除时按内容去重：相同内容的文件只清除一次，结果复制到其余路径")
+    parser.add_argument('--report', metavar='PATH', default=None,
+                        help="把每个文件的处理记录逐条写入报告文件（.csv 为CSV，其他为JSON Lines）")
+    parser.add_argument('--report-format', choices=batch_report.REPORT_FORMATS, default=None,
+                        help="报告格式（默认按 --report 的扩展名判断）")
+    parser.add_argument('--resume', action='store_true',
+                        help="在已有报告末尾继续，跳过报告中已成功处理的文件")
+    parser.add_argument('--json', action='store_true',
+                        help="以JSON Lines格式输出每个文件的结果和最终汇总")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.workers < 1:
+        parser.error("--workers 必须大于等于1")
+    if args.chunksize is not None and args.chunksize < 1:
+        parser.error("--chunksize 必须大于等于1")
+    if args.resume and not args.report:
+        parser.error("--resume 需要同时指定 --report")
+
+    if args.action == 'clear':
+        for path, ok, error in inplace_patch.recover_all():
+            if ok:
+                print(f"已恢复上次中断的原地修补: {path}", file=sys.stderr)
+            else:
+                print(f"无法恢复原地修补 {path}: {error}", file=sys.stderr)
+
+    files = list(engine.iter_supported_files(args.paths, recursive=not args.no_recursive,
+                                              sniff=args.sniff))
+    if not files:
+        print("没有找到可处理的文件", file=sys.stderr)
+        return EXIT_USAGE
+
+    skipped = 0
+    if args.resume:
+        completed = batch_report.load_completed(args.report, args.report_format)
+        remaining = [filepath for filepath in files if filepath not in completed]
+        skipped = len(files) - len(remaining)
+        files = remaining
+
+    cache = None
+    if args.cache:
+        cache = scan_cache.ScanCache(args.cache, max_entries=args.cache_max_entries,
+                                     max_age_days=args.cache_max_age)
+
+    started = time.monotonic()
+    succeeded = failed = cached = 0
+    dedup_stats = {} if args.dedup else None
+    report = None
+    try:
+        if args.report:
+            report = batch_report.ReportWriter(args.report, args.report_format, resume=args.resume)
+        rows = batch_report.iter_rows(args.action, files, args.workers, args.chunksize,
+                                      options=engine.ProcessOptions(pdf_mode=args.pdf_mode,
+                                                                     durability=args.durability,
+                                                                     in_place=args.in_place),
+                                      cache=cache, dedup_stats=dedup_stats, use_threads=args.threads,
+                                      ordered=True)
+        for _, record in rows:
+            if report is not None:
+                report.write(record)
+            if record['ok']:
+                succeeded += 1
+            else:
+                failed += 1
+            if record.get('cached'):
+                cached += 1
+            print_record(record, args.json)
+    finally:
+        if report is not None:
+            report.close()
+        if cache is not None:
+            cache.close()
+
+    summary = {
+        'status': 'ok' if failed == 0 else 'failed',
+        'action': args.action,
+        'total': len(files),
+        'succeeded': succeeded,
+        'failed': failed,
+        'cached': cached,
+        'skipped': skipped,
+        'elapsed': round(time.monotonic() - started, 3),
+    }
+    if dedup_stats:
+        summary['dedup'] = dedup_stats
+    if args.json:
+        print(json.dumps({'summary': summary}, ensure_ascii=False))
+    else:
+        print(f"\n批量处理完成！共处理 {summary['total']} 个文件，"
+              f"成功 {succeeded} 个（其中缓存命中 {cached} 个），失败 {failed} 个，"
+              f"耗时 {summary['elapsed']} 秒")
+        if skipped:
+            print(f"已跳过报告中已成功处理的 {skipped} 个文件")
+        if dedup_stats:
+            print(dedup.format_savings(dedup_stats))
+
+    return EXIT_OK if failed == 0 else EXIT_FAILURES
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文件属性处理引擎
+不依赖任何图形界面，可在无显示环境的服务器上直接导入使用
+所有读取、清除函数都以文件路径和 ProcessOptions 为参数，不依赖共享状态，
+可在进程池或线程池中并发调用；按格式通过处理器注册表分发
+PIL、PyMuPDF、python-docx 只在第一次用到对应格式时才导入，以缩短启动时间
+"""
+
+import os
+import re
+import glob
+import platform
+import datetime
+import time
+import functools
+import threading
+from stat import filemode
+
+import image_streams
+import ooxml_streams
+import metadata_probe
+import file_sniffer
+import safe_writer
+import inplace_patch
+
+# 平台检测
+SYSTEM = platform.system()
+IS_WINDOWS = SYSTEM == "Windows"
+IS_MACOS = SYSTEM == "Darwin"
+IS_LINUX = SYSTEM == "Linux"
+
+# PDF清除方式
+PDF_MODE_FULL = 'full'                # 完整重写
+PDF_MODE_INCREMENTAL = 'incremental'  # 增量更新：只追加修改过的对象
+PDF_MODE_COMPACT = 'compact'          # 压缩重写：同时回收无用对象
+PDF_MODES = (PDF_MODE_FULL, PDF_MODE_INCREMENTAL, PDF_MODE_COMPACT)
+
+# PDF属性中最多列出的尺寸不同页面数
+PAGE_GEOMETRY_DEVIATIONS = 20
+
+# 文件类别对应的显示名称
+CATEGORY_LABELS = {
+    'image': "图片",
+    'pdf': "PDF",
+    'word': "Word",
+    'office': "Office",
+}
+
+# 文件类别对应的清除结果描述
+CATEGORY_CLEARED_MESSAGES = {
+    'image': "图片属性已清除",
+    'pdf': "PDF属性已清除",
+    'word': "Word属性已清除",
+    'office': "Office文档属性已清除",
+}
+
+
+class FormatHandler:
+    """单一文件格式的处理器：记录扩展名以及读取、探测、清除函数
+
+    reader(路径, 选项) 返回 MetadataRecord；prober(路径) 快速探测并返回元数据类型集合；
+    cleaner(路径, 选项) 清除属性并返回被删除的元数据名称列表，失败时抛出异常。选项为 ProcessOptions
+    scanner(数据) 在内存中的完整文件内容上探测，返回 (元数据类型集合, ...)，
+    文件小到识别类型时已整个读入时代替 prober 使用，不再重新打开文件
+    """
+
+    def __init__(self, name, category, extensions, reader, cleaner, prober=None, scanner=None):
+        self.name = name
+        self.category = category
+        self.extensions = tuple(ext.lower() for ext in extensions)
+        self.reader = reader
+        self.cleaner = cleaner
+        self.prober = prober
+        self.scanner = scanner
+
+    def __repr__(self):
+        return f"FormatHandler({self.name!r}, {self.category!r}, {self.extensions!r})"
+
+
+class ProcessOptions:
+    """单次读取或清除调用的选项，创建后不应修改，可在线程和进程之间共享
+
+    detailed    读取时是否统计页面尺寸、段落数等较慢的详细信息
+    pdf_mode    PDF清除方式，见 PDF_MODES
+    durability  清除后替换原文件时的持久化级别，见 safe_writer.DURABILITY_LEVELS
+    in_place    JPEG和PDF能原地修补时只改写元数据所在的字节，不复制整个文件，见 inplace_patch
+    """
+
+    __slots__ = ('detailed', 'pdf_mode', 'durability', 'in_place')
+
+    def __init__(self, detailed=True, pdf_mode=PDF_MODE_FULL, durability=safe_writer.DURABILITY_FILE,
+                 in_place=False):
+        if pdf_mode not in PDF_MODES:
+            raise ValueError(f"未知的PDF清除方式: {pdf_mode}")
+        if durability not in safe_writer.DURABILITY_LEVELS:
+            raise ValueError(f"未知的持久化级别: {durability}")
+        self.detailed = detailed
+        self.pdf_mode = pdf_mode
+        self.durability = durability
+        self.in_place = in_place
+
+    def replace(self, **changes):
+        """返回修改了部分选项的新对象"""
+        values = {name: getattr(self, name) for name in self.__slots__}
+        values.update(changes)
+        return ProcessOptions(**values)
+
+    def __repr__(self):
+        return (f"ProcessOptions(detailed={self.detailed!r}, pdf_mode={self.pdf_mode!r}, "
+                f"durability={self.durability!r}, in_place={self.in_place!r})")
+
+
+DEFAULT_OPTIONS = ProcessOptions()
+SUMMARY_OPTIONS = ProcessOptions(detailed=False)
+
+
+class MetadataRecord:
+    """单个文件的元数据读取结果
+
+    fields  可被清除的元数据字段 {字段名: 值}
+    flags   发现的元数据类型，如 {'EXIF', 'XMP'}
+    counts  统计数字，如 {'pages': 12}
+    details 其他仅用于显示的信息，如PDF版本、页面尺寸、创建时间
+    error   读取失败或格式不支持时的说明
+    """
+
+    __slots__ = ('path', 'category', 'fields', 'flags', 'counts', 'details', 'error')
+
+    def __init__(self, path, category):
+        self.path = path
+        self.category = category
+        self.fields = {}
+        self.flags = set()
+        self.counts = {}
+        self.details = {}
+        self.error = None
+
+    @property
+    def has_metadata(self):
+        return bool(self.fields or self.flags)
+
+    def to_dict(self):
+        return {
+            'path': self.path,
+            'category': self.category,
+            'fields': dict(self.fields),
+            'flags': sorted(self.flags),
+            'counts': dict(self.counts),
+            'error': self.error,
+        }
+
+    def __repr__(self):
+        return (f"MetadataRecord({self.path!r}, {self.category!r}, "
+                f"fields={len(self.fields)}, flags={sorted(self.flags)!r})")
+
+
+class ScrubResult:
+    """单个文件的清除结果
+
+    removed       被删除的元数据名称（JPEG段名、PNG块类型、PDF Info键、docProps字段等）
+    bytes_before  清除前的文件大小
+    bytes_after   清除后的文件大小
+    elapsed       清除耗时（秒）
+    message       显示给用户的结果描述
+    """
+
+    __slots__ = ('path', 'category', 'removed', 'bytes_before', 'bytes_after', 'elapsed', 'message')
+
+    def __init__(self, path, category, removed, bytes_before, bytes_after, elapsed, message):
+        self.path = path
+        self.category = category
+        self.removed = removed
+        self.bytes_before = bytes_before
+        self.bytes_after = bytes_after
+        self.elapsed = elapsed
+        self.message = message
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f"ScrubResult({self.path!r}, removed={self.removed!r})"
+
+
+# 处理器注册表
+_handlers = []
+_handlers_by_extension = {}
+_handlers_by_name = {}
+
+
+def register_handler(handler):
+    """注册格式处理器，后注册的处理器覆盖相同扩展名的旧处理器"""
+    _handlers.append(handler)
+    _handlers_by_name[handler.name] = handler
+    for ext in handler.extensions:
+        _handlers_by_extension[ext] = handler
+    return handler
+
+
+def get_handler(filepath):
+    """根据扩展名查找处理器，不支持时返回None"""
+    file_ext = os.path.splitext(filepath)[1].lower()
+    return _handlers_by_extension.get(file_ext)
+
+
+def sniff_handler(filepath):
+    """读取一次文件头，按内容识别格式，返回 (处理器, 文件头)
+
+    扩展名与内容不符时以内容为准；内容无法识别时处理器为None；文件无法读取时按扩展名查找，文件头为None
+    """
+    ext_handler = get_handler(filepath)
+    try:
+        header = file_sniffer.read_header(filepath)
+    except OSError:
+        return ext_handler, None
+    name = file_sniffer.sniff(header, ext_handler.name if ext_handler else None)
+    return _handlers_by_name.get(name), header
+
+
+def detect_handler(filepath):
+    """按文件内容查找处理器，见 sniff_handler"""
+    return sniff_handler(filepath)[0]
+
+
+def supported_extensions(category=None):
+    """返回已注册的扩展名列表，可按类别过滤"""
+    extensions = []
+    for handler in _handlers:
+        if category is not None and handler.category != category:
+            continue
+        for ext in handler.extensions:
+            if ext not in extensions:
+                extensions.append(ext)
+    return extensions
+
+
+def iter_supported_files(paths, recursive=True, sniff=False):
+    """展开目录和通配符，按注册的扩展名过滤，依次产出文件路径（去重、保持顺序）
+
+    sniff为True时，扩展名不在支持列表中的文件再按文件头识别，能识别的也产出
+    """
+    extensions = set(supported_extensions())
+    seen = set()
+
+    def accept(path):
+        if path in seen:
+            return False
+        if os.path.splitext(path)[1].lower() not in extensions:
+            if not sniff or detect_handler(path) is None:
+                return False
+        seen.add(path)
+        return True
+
+    def walk(directory):
+        pending = [directory]
+        while pending:
+            current = pending.pop()
+            try:
+                with os.scandir(current) as entries:
+                    entries = sorted(entries, key=lambda entry: entry.name)
+            except OSError:
+                continue
+            subdirs = []
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.is_file() and accept(entry.path):
+                        yield entry.path
+                except OSError:
+                    continue
+            if recursive:
+                pending.extend(reversed(subdirs))
+
+    for path in paths:
+        if os.path.isdir(path):
+            matches = [path]
+        elif os.path.isfile(path):
+            matches = [path]
+        else:
+            matches = sorted(glob.glob(path, recursive=True))
+        for match in matches:
+            if os.path.isdir(match):
+                yield from walk(match)
+            elif os.path.isfile(match) and accept(match):
+                yield match
+
+
+def get_file_category(filepath):
+    """返回文件类别（image/pdf/word），不支持时返回None"""
+    handler = get_handler(filepath)
+    return handler.category if handler else None
+
+
+def get_file_type_label(filepath):
+    """返回文件类型的显示名称"""
+    return CATEGORY_LABELS.get(get_file_category(filepath), "其他")
+
+
+# ---------------------------------------------------------------------------
+# 通用工具
+# ---------------------------------------------------------------------------
+
+# PyMuPDF不支持多线程同时操作文档，线程池中的PDF读取和清除按顺序进行
+_FITZ_LOCK = threading.RLock()
+
+
+def _import_fitz():
+    """按需导入PyMuPDF，新版本使用 pymupdf 模块名"""
+    try:
+        import pymupdf as fitz
+    except ImportError:
+        import fitz  # PyMuPDF
+    return fitz
+
+
+def format_file_size(size):
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if size < 1024:
+            return f"{size:.2f} {unit}"
+        size /= 1024
+    return f"{size:.2f} TB"
+
+
+def format_timestamp(timestamp):
+    return datetime.datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def get_file_attributes(attrs):
+    if IS_WINDOWS:
+        attributes = []
+        if attrs & 0x1: attributes.append("只读")
+        if attrs & 0x2: attributes.append("隐藏")
+        if attrs & 0x4: attributes.append("系统")
+        if attrs & 0x10: attributes.append("目录")
+        if attrs & 0x20: attributes.append("存档")
+        return ", ".join(attributes) if attributes else "无特殊属性"
+    else:
+        return "平台不支持文件属性检查"
+
+
+@functools.lru_cache(maxsize=None)
+def get_user_name(uid):
+    """uid转用户名（带缓存），查不到时返回数字"""
+    try:
+        import pwd
+        return pwd.getpwuid(uid).pw_name
+    except (ImportError, KeyError):
+        return str(uid)
+
+
+@functools.lru_cache(maxsize=None)
+def get_group_name(gid):
+    """gid转群组名（带缓存），查不到时返回数字"""
+    try:
+        import grp
+        return grp.getgrgid(gid).gr_name
+    except (ImportError, KeyError):
+        return str(gid)
+
+
+def get_basic_properties(filepath, stat_result=None):
+    """获取基本属性，可传入已有的stat结果（如 os.DirEntry.stat()）避免重复系统调用"""
+    try:
+        stat = stat_result if stat_result is not None else os.stat(filepath)
+        info = []
+        info.append(f"文件名: {os.path.basename(filepath)}")
+        info.append(f"完整路径: {filepath}")
+        info.append(f"文件大小: {format_file_size(stat.st_size)}")
+        info.append(f"创建时间: {format_timestamp(stat.st_ctime)}")
+        info.append(f"修改时间: {format_timestamp(stat.st_mtime)}")
+        info.append(f"访问时间: {format_timestamp(stat.st_atime)}")
+
+        # 平台特定属性
+        if IS_WINDOWS:
+            try:
+                import win32api
+                attrs = win32api.GetFileAttributes(filepath)
+                info.append(f"文件属性: {get_file_attributes(attrs)}")
+            except:
+                pass
+        elif IS_MACOS or IS_LINUX:
+            # macOS/Linux文件属性：直接由stat结果得出，不再调用 ls
+            info.append(f"权限: {filemode(stat.st_mode)}")
+            info.append(f"所有者: {get_user_name(stat.st_uid)}")
+            info.append(f"群组: {get_group_name(stat.st_gid)}")
+
+        return "\n".join(info)
+    except Exception as e:
+        return f"获取基本属性失败: {str(e)}"
+
+
+# ---------------------------------------------------------------------------
+# 图片
+# ---------------------------------------------------------------------------
+
+# PIL在 image.info 中给出的元数据键及其类型名
+IMAGE_INFO_FLAGS = {
+    'exif': 'EXIF',
+    'xmp': 'XMP',
+    'XML:com.adobe.xmp': 'XMP',
+    'photoshop': 'IPTC',
+    'comment': '注释',
+}
+
+# PNG的 image.info 中属于图像参数而不是文本元数据的键
+PNG_TECHNICAL_INFO = {'dpi', 'gamma', 'transparency', 'icc_profile', 'srgb',
+                      'chromaticity', 'aspect', 'interlace', 'bbox', 'duration', 'loop',
+                      'default_image', 'disposal', 'blend'}
+
+
+def _image_info_flags(image):
+    flags = {flag for key, flag in IMAGE_INFO_FLAGS.items() if image.info.get(key)}
+    if image.format == 'PNG':
+        if any(key not in PNG_TECHNICAL_INFO and key not in IMAGE_INFO_FLAGS for key in image.info):
+            flags.add('文本')
+    return flags
+
+
+def read_image_record(filepath, options=DEFAULT_OPTIONS):
+    """读取图片的EXIF字段和其他元数据类型"""
+    record = MetadataRecord(filepath, 'image')
+    try:
+        from PIL import Image
+        from PIL.ExifTags import TAGS
+
+        with Image.open(filepath) as image:
+            record.flags.update(_image_info_flags(image))
+            exifdata = image.getexif()
+            if exifdata:
+                record.flags.add('EXIF')
+            _add_exif_fields(record, exifdata, TAGS)
+    except Exception as e:
+        record.error = f"获取EXIF信息失败: {str(e)}"
+    return record
+
+
+def _add_exif_fields(record, exifdata, tags):
+    for tag_id in exifdata:
+        tag = tags.get(tag_id, tag_id)
+        data = exifdata.get(tag_id)
+
+        # 处理二进制数据
+        if isinstance(data, bytes):
+            try:
+                data = data.decode('utf-8', errors='ignore')
+            except:
+                data = f"<二进制数据: {len(data)}字节>"
+
+        record.fields[str(tag)] = data
+
+
+def read_scanned_image_record(filepath, options=DEFAULT_OPTIONS, scanner=metadata_probe.scan_jpeg):
+    """映射文件、按段或块结构找出元数据，只把EXIF数据交给PIL解析，不打开图像也不创建解码器"""
+    record = MetadataRecord(filepath, 'image')
+    try:
+        from PIL import Image
+        from PIL.ExifTags import TAGS
+
+        flags, exif = metadata_probe.scan_image_file(filepath, scanner)
+        record.flags.update(flags)
+        if exif:
+            exifdata = Image.Exif()
+            exifdata.load(exif)
+            _add_exif_fields(record, exifdata, TAGS)
+    except Exception as e:
+        record.error = f"获取EXIF信息失败: {str(e)}"
+    return record
+
+
+def probe_image(filepath):
+    """通过PIL读取图片头部，返回元数据类型集合（用于没有结构化探测的格式）"""
+    from PIL import Image
+
+    with Image.open(filepath) as image:
+        flags = _image_info_flags(image)
+        if image.getexif():
+            flags.add('EXIF')
+        return flags
+
+
+def format_image_record(record):
+    if record.error:
+        return record.error
+
+    info = [f"{tag}: {data}" for tag, data in record.fields.items()]
+    other = sorted(record.flags - {'EXIF'})
+    if not info and not other:
+        return "该图片没有EXIF信息"
+    if not info:
+        info.append("没有EXIF信息")
+    if other:
+        info.append(f"\n其他元数据: {', '.join(other)}")
+    return "\n".join(info)
+
+
+def read_tiff_record(filepath, options=DEFAULT_OPTIONS):
+    """按IFD读取TIFF第一页的文本元数据标签和各页的元数据类型，不解码图像"""
+    record = MetadataRecord(filepath, 'image')
+    try:
+        from PIL import Image
+        from PIL.ExifTags import TAGS
+
+        flags, _ = metadata_probe.scan_image_file(filepath, metadata_probe.scan_tiff)
+        record.flags.update(flags)
+        with open(filepath, 'rb') as f:
+            exifdata = Image.Exif()
+            exifdata.load_from_fp(f)
+            text_tags = {tag_id: exifdata[tag_id] for tag_id in exifdata
+                         if tag_id in image_streams.TIFF_METADATA_TAGS
+                         and tag_id not in metadata_probe.TIFF_TAG_FLAGS}
+        _add_exif_fields(record, text_tags, TAGS)
+    except Exception as e:
+        record.error = f"获取EXIF信息失败: {str(e)}"
+    return record
+
+
+def clear_image_properties(filepath, options=DEFAULT_OPTIONS):
+    try:
+        from PIL import Image
+
+        # 保存为新文件，不包含EXIF；关闭原图后再替换原文件
+        with safe_writer.AtomicOutput(filepath, options.durability) as output:
+            with Image.open(filepath) as image:
+                removed = sorted(_image_info_flags(image) | ({'EXIF'} if image.getexif() else set()))
+                image.save(output.path, format=image.format, quality=95)
+        return removed
+
+    except Exception as e:
+        raise Exception(f"清除图片属性失败: {str(e)}")
+
+
+def _stream_rewrite(filepath, strip, options):
+    """用 strip(源路径, 临时路径) 生成清除后的副本，成功后原子替换原文件，返回 strip 的结果"""
+    with safe_writer.AtomicOutput(filepath, options.durability) as output:
+        return strip(filepath, output.path)
+
+
+def clear_jpeg_properties(filepath, options=DEFAULT_OPTIONS):
+    """在段层面删除JPEG的EXIF/XMP、IPTC和注释，不重新编码图像
+
+    options.in_place 为True时这些段原地改为置零的填充段，文件大小不变
+    """
+    try:
+        if options.in_place:
+            return inplace_patch.patch_file(filepath, image_streams.jpeg_inplace_patches,
+                                            options.durability)
+        return _stream_rewrite(filepath, image_streams.strip_jpeg_file, options)
+    except Exception as e:
+        raise Exception(f"清除图片属性失败: {str(e)}")
+
+
+def clear_png_properties(filepath, options=DEFAULT_OPTIONS):
+    """在块层面删除PNG的文本、EXIF和时间信息，IDAT原样保留"""
+    try:
+        return _stream_rewrite(filepath, image_streams.strip_png_file, options)
+    except Exception as e:
+        raise Exception(f"清除图片属性失败: {str(e)}")
+
+
+def clear_webp_properties(filepath, options=DEFAULT_OPTIONS):
+    """在RIFF块层面删除WebP的EXIF和XMP，不重新编码图像"""
+    try:
+        return _stream_rewrite(filepath, image_streams.strip_webp_file, options)
+    except Exception as e:
+        raise Exception(f"清除图片属性失败: {str(e)}")
+
+
+def clear_gif_properties(filepath, options=DEFAULT_OPTIONS):
+    """删除GIF的注释和应用扩展（保留动画循环次数和颜色配置），LZW数据原样保留"""
+    try:
+        return _stream_rewrite(filepath, image_streams.strip_gif_file, options)
+    except Exception as e:
+        raise Exception(f"清除图片属性失败: {str(e)}")
+
+
+def clear_tiff_properties(filepath, options=DEFAULT_OPTIONS):
+    """从TIFF各页的IFD中删除描述、设备、EXIF、GPS、XMP、IPTC等标签，图像数据原样保留"""
+    try:
+        return _stream_rewrite(filepath, image_streams.strip_tiff_file, options)
+    except Exception as e:
+        raise Exception(f"清除图片属性失败: {str(e)}")
+
+
+def clear_heif_properties(filepath, options=DEFAULT_OPTIONS):
+    """清空HEIF中Exif和XMP项目的内容，图像数据原样保留"""
+    try:
+        return _stream_rewrite(filepath, image_streams.strip_heif_file, options)
+    except Exception as e:
+        raise Exception(f"清除图片属性失败: {str(e)}")
+
+
+# ---------------------------------------------------------------------------
+# PDF
+# ---------------------------------------------------------------------------
+
+# PyMuPDF metadata 中不属于文档信息字典的键
+PDF_NON_INFO_KEYS = ('format', 'encryption')
+
+
+def read_pdf_record(filepath, options=DEFAULT_OPTIONS):
+    """读取PDF的Info字典、XMP和页数；options.detailed为True时再统计页面尺寸"""
+    record = MetadataRecord(filepath, 'pdf')
+    try:
+        fitz = _import_fitz()
+        with _FITZ_LOCK:
+            doc = fitz.open(filepath)
+            try:
+                # 获取PDF版本信息
+                metadata = doc.metadata or {}
+                record.details['version'] = metadata.get('format') or '未知'
+                for key, value in metadata.items():
+                    if value and key not in PDF_NON_INFO_KEYS:
+                        record.fields[key] = value
+                if record.fields:
+                    record.flags.add('Info')
+                if doc.get_xml_metadata().strip():
+                    record.flags.add('XMP')
+                record.counts['pages'] = len(doc)
+
+                if options.detailed:
+                    sizes, deviations = summarize_page_geometry(doc)
+                    record.details['page_sizes'] = sizes
+                    record.details['page_deviations'] = deviations
+            finally:
+                doc.close()
+    except Exception as e:
+        record.error = f"获取PDF属性失败: {str(e)}"
+    return record
+
+
+def format_pdf_record(record):
+    if record.error:
+        return record.error
+
+    info = []
+    info.append(f"PDF版本: {record.details.get('version', '未知')}")
+    info.append(f"页面数量: {record.counts.get('pages', 0)}")
+
+    # 元数据
+    if record.fields:
+        info.append("\n元数据:")
+        for key, value in record.fields.items():
+            info.append(f"  {key}: {value}")
+    if 'XMP' in record.flags:
+        info.append("\nXMP元数据: 有")
+
+    # 页面信息：按尺寸汇总，只列出前N个尺寸不同的页面
+    if 'page_sizes' in record.details:
+        info.append("\n页面尺寸:")
+        for (width, height), count in record.details['page_sizes']:
+            info.append(f"  {width}x{height} 点: {count} 页")
+        deviations = record.details['page_deviations']
+        if deviations:
+            info.append(f"\n尺寸不同的页面（前{len(deviations)}个）:")
+            for pno, (width, height) in deviations:
+                info.append(f"  页面 {pno}: {width}x{height} 点")
+
+    return "\n".join(info)
+
+
+_PDF_BOX_PATTERNS = {
+    key: re.compile(r'/' + key + r'\s*\[\s*([-+\d.\s]+?)\s*\]') for key in ('MediaBox', 'CropBox')
+}
+_PDF_ROTATE_PATTERN = re.compile(r'/Rotate\s+(-?\d+)')
+_PDF_PARENT_PATTERN = re.compile(r'/Parent\s+(\d+)\s+\d+\s+R')
+
+
+def _page_tree_attributes(doc, xref, cache):
+    """解析页面树节点的 MediaBox、CropBox、Rotate（含继承值），父节点结果缓存在 cache 中"""
+    if xref in cache:
+        return cache[xref]
+    cache[xref] = (None, None, None)  # 防止损坏文件中的循环引用
+
+    source = doc.xref_object(xref, compressed=True)
+    attributes = []
+    for key in ('MediaBox', 'CropBox'):
+        match = _PDF_BOX_PATTERNS[key].search(source)
+        attributes.append([float(v) for v in match.group(1).split()] if match else None)
+    match = _PDF_ROTATE_PATTERN.search(source)
+    attributes.append(int(match.group(1)) if match else None)
+
+    if None in attributes:
+        match = _PDF_PARENT_PATTERN.search(source)
+        if match:
+            inherited = _page_tree_attributes(doc, int(match.group(1)), cache)
+            attributes = [own if own is not None else parent
+                          for own, parent in zip(attributes, inherited)]
+
+    cache[xref] = tuple(attributes)
+    return cache[xref]
+
+
+def _iter_page_sizes(doc):
+    """依次产出每页显示尺寸 (宽, 高)
+
+    直接从页面字典文本中读取尺寸和旋转，不实例化页面对象；
+    尺寸为间接引用等无法直接解析的页面才回退到加载页面
+    """
+    cache = {}
+    for pno in range(len(doc)):
+        mediabox, cropbox, rotate = _page_tree_attributes(doc, doc.page_xref(pno), cache)
+        box = cropbox or mediabox
+        if box is None or len(box) != 4:
+            rect = doc[pno].rect
+            yield round(rect.width, 1), round(rect.height, 1)
+            continue
+        width, height = abs(box[2] - box[0]), abs(box[3] - box[1])
+        if (rotate or 0) % 180 == 90:
+            width, height = height, width
+        yield round(width, 1), round(height, 1)
+
+
+def summarize_page_geometry(doc, max_deviations=PAGE_GEOMETRY_DEVIATIONS):
+    """统计页面尺寸：返回 ([(尺寸, 页数), ...] 按页数降序, [(页码, 尺寸), ...] 前N个与主尺寸不同的页面)"""
+    counts = {}
+    first_pages = {}
+    for pno, size in enumerate(_iter_page_sizes(doc)):
+        counts[size] = counts.get(size, 0) + 1
+        pages = first_pages.setdefault(size, [])
+        if len(pages) < max_deviations:
+            pages.append(pno + 1)
+
+    sizes = sorted(counts.items(), key=lambda item: -item[1])
+    if not sizes:
+        return [], []
+    main_size = sizes[0][0]
+    deviations = sorted((pno, size) for size, pages in first_pages.items()
+                        if size != main_size for pno in pages)
+    return sizes, deviations[:max_deviations]
+
+
+def _pdf_metadata_names(doc):
+    """返回已打开文档中有值的Info字段名称，存在XMP时再加上 'XMP'"""
+    names = [key for key, value in (doc.metadata or {}).items()
+             if value and key not in PDF_NON_INFO_KEYS]
+    if doc.get_xml_metadata().strip():
+        names.append('XMP')
+    return names
+
+
+def _clear_pdf_metadata(doc):
+    """清除已打开文档的Info字典和XMP元数据，返回被删除的元数据名称列表
+
+    Info字典位于对象流中时 set_metadata 不会改动它，因此同时删除trailer中的 /Info 引用
+    """
+    removed = _pdf_metadata_names(doc)
+    doc.set_metadata({})
+    doc.xref_set_key(-1, 'Info', 'null')
+    doc.del_xml_metadata()
+    return removed
+
+
+def _check_pdf_cleared(fitz, path):
+    """重新打开保存后的文件，仍有Info字段或XMP时抛出异常"""
+    doc = fitz.open(path)
+    try:
+        remaining = _pdf_metadata_names(doc)
+    finally:
+        doc.close()
+    if remaining:
+        raise ValueError(f"保存后仍存在以下属性: {', '.join(remaining)}")
+
+
+def clear_pdf_properties(filepath, options=DEFAULT_OPTIONS):
+    """清除PDF的Info字典和XMP元数据
+
+    options.pdf_mode:
+        full         重新序列化整个文档（丢弃无引用对象）后替换原文件
+        incremental  只在文件末尾追加修改过的对象，速度与文件大小基本无关；
+                     注意旧的元数据仍保留在文件的早期版本中，可被专门工具恢复。
+                     文件加密、损坏或无法增量保存时自动改为完整重写
+        compact      完整重写并回收孤立对象、压缩未压缩的流，速度最慢
+
+    增量模式先把原文件复制为临时文件（支持reflink的文件系统上不复制数据），在副本上追加后原子替换；
+    options.durability 为 none 时直接追加到原文件，最快但中途中断会留下不完整的文件
+
+    options.in_place 为True且文件使用传统交叉引用表时，原地清空所有版本的Info字典和XMP流，
+    不打开文档也不复制文件；无法原地修补时按 pdf_mode 处理
+    """
+    mode = options.pdf_mode
+    try:
+        if options.in_place:
+            removed = inplace_patch.patch_file(filepath, inplace_patch.pdf_inplace_patches,
+                                               options.durability)
+            if removed is not None:
+                return removed
+
+        fitz = _import_fitz()
+        with _FITZ_LOCK:
+            doc = fitz.open(filepath)
+            try:
+                if mode == PDF_MODE_INCREMENTAL and (
+                        doc.is_encrypted or doc.is_repaired or not doc.can_save_incrementally()):
+                    mode = PDF_MODE_FULL
+
+                if mode == PDF_MODE_INCREMENTAL and options.durability == safe_writer.DURABILITY_NONE:
+                    removed = _clear_pdf_metadata(doc)
+                    doc.save(filepath, incremental=True, encryption=fitz.PDF_ENCRYPT_KEEP)
+                    _check_pdf_cleared(fitz, filepath)
+                    return removed
+
+                if mode != PDF_MODE_INCREMENTAL:
+                    # 保存到新文件，关闭原文档后再替换原文件
+                    output = safe_writer.AtomicOutput(filepath, options.durability)
+                    try:
+                        removed = _clear_pdf_metadata(doc)
+                        if mode == PDF_MODE_COMPACT:
+                            doc.save(output.path, garbage=4, deflate=True)
+                        else:
+                            # garbage=1 去掉已不再被引用的旧XMP流等对象
+                            doc.save(output.path, garbage=1)
+                        _check_pdf_cleared(fitz, output.path)
+                    except BaseException:
+                        output.discard()
+                        raise
+            finally:
+                doc.close()
+
+            if mode != PDF_MODE_INCREMENTAL:
+                output.commit()
+                return removed
+
+            # 在原文件的副本上增量保存
+            with safe_writer.AtomicOutput(filepath, options.durability) as output:
+                safe_writer.clone_file(filepath, output.path)
+                doc = fitz.open(output.path)
+                try:
+                    removed = _clear_pdf_metadata(doc)
+                    doc.save(output.path, incremental=True, encryption=fitz.PDF_ENCRYPT_KEEP)
+                finally:
+                    doc.close()
+                _check_pdf_cleared(fitz, output.path)
+            return removed
+
+    except Exception as e:
+        raise Exception(f"清除PDF属性失败: {str(e)}")
+
+
+# ---------------------------------------------------------------------------
+# Word
+# ---------------------------------------------------------------------------
+
+# Office文档属性的显示名称
+OOXML_FIELD_LABELS = {
+    'core:title': "标题",
+    'core:subject': "主题",
+    'core:creator': "作者",
+    'core:category': "类别",
+    'core:keywords': "关键词",
+    'core:description': "备注",
+    'core:lastModifiedBy': "最后修改者",
+    'core:revision': "修订号",
+    'core:created': "创建时间",
+    'core:modified': "最后修改时间",
+    'core:lastPrinted': "最后打印时间",
+    'app:Company': "公司",
+    'app:Manager': "经理",
+    'app:HyperlinkBase': "超链接基础",
+}
+
+
+def read_ooxml_record(filepath, options=DEFAULT_OPTIONS, category='office'):
+    """读取DOCX/XLSX/PPTX的 docProps 属性；options.detailed为True时Word文档再统计段落和表格
+
+    category 由注册的处理器给出（按文件内容识别），不按扩展名判断
+    """
+    record = MetadataRecord(filepath, category)
+    try:
+        for key, value in ooxml_streams.read_document_properties(filepath).items():
+            if key in ooxml_streams.SCRUBBED_FIELDS or key.startswith('custom:'):
+                record.fields[key] = value
+                record.flags.add(key.split(':', 1)[0])
+            else:
+                record.details[key] = value
+
+        if options.detailed and category == 'word':
+            import docx
+
+            doc = docx.Document(filepath)
+            record.counts['paragraphs'] = len(doc.paragraphs)
+            record.counts['tables'] = len(doc.tables)
+    except Exception as e:
+        record.error = f"获取{CATEGORY_LABELS[category]}属性失败: {str(e)}"
+    return record
+
+
+def read_doc_record(filepath, options=DEFAULT_OPTIONS):
+    """DOC格式无法直接读取属性，只给出说明"""
+    record = MetadataRecord(filepath, 'word')
+    if IS_WINDOWS:
+        record.error = "DOC格式需要安装Microsoft Word才能查看详细属性"
+    else:
+        record.error = "DOC格式在macOS/Linux上支持有限，建议使用DOCX格式"
+    return record
+
+
+def format_ooxml_record(record):
+    if record.error:
+        return record.error
+
+    def label(key):
+        return OOXML_FIELD_LABELS.get(key, key)
+
+    values = dict(record.details)
+    values.update(record.fields)
+
+    info = ["文档属性:"]
+    for key in ('core:title', 'core:subject', 'core:creator', 'core:category', 'core:keywords',
+                'core:description', 'core:lastModifiedBy', 'core:revision'):
+        info.append(f"  {label(key)}: {values.get(key) or '无'}")
+
+    info.append(f"\n  {label('core:created')}: {values.get('core:created') or '无'}")
+    for key in ('core:modified', 'core:lastPrinted'):
+        info.append(f"  {label(key)}: {values.get(key) or '无'}")
+
+    app_fields = [key for key in record.fields if key.startswith('app:')]
+    if app_fields:
+        info.append("\n应用程序属性:")
+        for key in app_fields:
+            info.append(f"  {label(key)}: {record.fields[key]}")
+
+    custom_fields = [key for key in record.fields if key.startswith('custom:')]
+    if custom_fields:
+        info.append("\n自定义属性:")
+        for key in custom_fields:
+            info.append(f"  {key.split(':', 1)[1]}: {record.fields[key]}")
+
+    # 统计信息
+    if record.counts:
+        info.append(f"\n统计信息:")
+        info.append(f"  段落数: {record.counts.get('paragraphs', 0)}")
+        info.append(f"  表格数: {record.counts.get('tables', 0)}")
+
+    return "\n".join(info)
+
+
+def clear_word_properties(filepath, options=DEFAULT_OPTIONS):
+    """DOC格式不提供属性清除；DOCX由 clear_ooxml_properties 在ZIP层面清除"""
+    raise Exception("清除Word属性失败: DOC格式在macOS/Linux上不支持属性清除")
+
+
+def clear_ooxml_properties(filepath, options=DEFAULT_OPTIONS):
+    """在ZIP层面清除DOCX/XLSX/PPTX的 docProps 属性，其余部件原样复制"""
+    try:
+        return _stream_rewrite(filepath, ooxml_streams.scrub_ooxml_file, options)
+    except Exception as e:
+        raise Exception(f"清除Office文档属性失败: {str(e)}")
+
+
+# ---------------------------------------------------------------------------
+# 内置处理器注册
+# ---------------------------------------------------------------------------
+
+# 只读取文件头/尾部的快速探测函数
+probe_jpeg_file = functools.partial(metadata_probe.probe_file, prober=metadata_probe.probe_jpeg)
+probe_png_file = functools.partial(metadata_probe.probe_file, prober=metadata_probe.probe_png)
+probe_webp_file = functools.partial(metadata_probe.probe_file, prober=metadata_probe.probe_webp)
+probe_gif_file = functools.partial(metadata_probe.probe_file, prober=metadata_probe.probe_gif)
+probe_tiff_file = functools.partial(metadata_probe.probe_file, prober=metadata_probe.probe_tiff)
+probe_heif_file = functools.partial(metadata_probe.probe_file, prober=metadata_probe.probe_heif)
+probe_pdf_file = functools.partial(metadata_probe.probe_file, prober=metadata_probe.probe_pdf)
+probe_ooxml_file = functools.partial(metadata_probe.probe_file, prober=metadata_probe.probe_ooxml)
+
+# 按段、块结构读取的图片元数据
+read_jpeg_record = functools.partial(read_scanned_image_record, scanner=metadata_probe.scan_jpeg)
+read_png_record = functools.partial(read_scanned_image_record, scanner=metadata_probe.scan_png)
+read_webp_record = functools.partial(read_scanned_image_record, scanner=metadata_probe.scan_webp)
+read_gif_record = functools.partial(read_scanned_image_record, scanner=metadata_probe.scan_gif)
+read_heif_record = functools.partial(read_scanned_image_record, scanner=metadata_probe.scan_heif)
+
+register_handler(FormatHandler('jpeg', 'image', ['.jpg', '.jpeg'],
+                               read_jpeg_record, clear_jpeg_properties, probe_jpeg_file,
+                               metadata_probe.scan_jpeg))
+register_handler(FormatHandler('png', 'image', ['.png'],
+                               read_png_record, clear_png_properties, probe_png_file,
+                               metadata_probe.scan_png))
+register_handler(FormatHandler('webp', 'image', ['.webp'],
+                               read_webp_record, clear_webp_properties, probe_webp_file,
+                               metadata_probe.scan_webp))
+register_handler(FormatHandler('tiff', 'image', ['.tif', '.tiff'],
+                               read_tiff_record, clear_tiff_properties, probe_tiff_file,
+                               metadata_probe.scan_tiff))
+register_handler(FormatHandler('gif', 'image', ['.gif'],
+                               read_gif_record, clear_gif_properties, probe_gif_file,
+                               metadata_probe.scan_gif))
+register_handler(FormatHandler('heif', 'image', ['.heic', '.heif'],
+                               read_heif_record, clear_heif_properties, probe_heif_file,
+                               metadata_probe.scan_heif))
+register_handler(FormatHandler('image', 'image', ['.bmp'],
+                               read_image_record, clear_image_properties, probe_image))
+register_handler(FormatHandler('pdf', 'pdf', ['.pdf'],
+                               read_pdf_record, clear_pdf_properties, probe_pdf_file))
+register_handler(FormatHandler('docx', 'word', ['.docx'],
+                               functools.partial(read_ooxml_record, category='word'),
+                               clear_ooxml_properties, probe_ooxml_file))
+register_handler(FormatHandler('doc', 'word', ['.doc'],
+                               read_doc_record, clear_word_properties))
+register_handler(FormatHandler('ooxml', 'office', ['.xlsx', '.pptx'],
+                               read_ooxml_record, clear_ooxml_properties, probe_ooxml_file))
+
+# 各类别的记录格式化函数
+RECORD_FORMATTERS = {
+    'image': format_image_record,
+    'pdf': format_pdf_record,
+    'word': format_ooxml_record,
+    'office': format_ooxml_record,
+}
+
+
+# ---------------------------------------------------------------------------
+# 对外接口
+# ---------------------------------------------------------------------------
+
+def read_metadata(filepath, options=DEFAULT_OPTIONS, handler=None):
+    """读取文件元数据，返回 MetadataRecord；不支持的格式返回None
+
+    handler 为调用方已识别的处理器，省略时按文件头识别
+    """
+    if handler is None:
+        handler = detect_handler(filepath)
+    if handler is None:
+        return None
+    return handler.reader(filepath, options)
+
+
+def probe_metadata(filepath, handler=None, header=None):
+    """快速探测文件带有的元数据类型，只读取有限的字节
+
+    返回元数据类型集合（空集合表示没有元数据）；文件结构无法快速识别时改为完整读取，
+    不支持或无法判断时返回None。handler、header 为 sniff_handler 的结果，省略时重新识别；
+    文件头已包含整个文件时直接在文件头上探测
+    """
+    if handler is None:
+        handler, header = sniff_handler(filepath)
+    if handler is None:
+        return None
+    if handler.scanner is not None and header is not None and len(header) < file_sniffer.SNIFF_SIZE:
+        try:
+            return set(handler.scanner(header)[0])
+        except Exception:
+            pass
+    if handler.prober is not None:
+        try:
+            return set(handler.prober(filepath))
+        except Exception:
+            pass
+    record = handler.reader(filepath, SUMMARY_OPTIONS)
+    return None if record.error else set(record.flags)
+
+
+def has_metadata(filepath):
+    """快速判断文件是否含有可清除的元数据；不支持或无法判断时返回None"""
+    flags = probe_metadata(filepath)
+    return None if flags is None else bool(flags)
+
+
+def format_record(record):
+    """把 MetadataRecord 格式化为显示文本"""
+    return RECORD_FORMATTERS[record.category](record)
+
+
+def read_properties(filepath, options=DEFAULT_OPTIONS):
+    """读取文件的格式专有属性，返回 (类别, 文本)；不支持的格式返回 (None, None)"""
+    record = read_metadata(filepath, options)
+    if record is None:
+        return None, None
+    return record.category, format_record(record)
+
+
+def scrub_file(filepath, options=DEFAULT_OPTIONS, handler=None):
+    """清除单个文件的属性，返回 ScrubResult，失败时抛出异常
+
+    handler 为调用方已识别的处理器，省略时按文件头识别
+    """
+    if handler is None:
+        handler = detect_handler(filepath)
+    if handler is None:
+        raise Exception("不支持的文件类型")
+    try:
+        started = time.perf_counter()
+        bytes_before = os.path.getsize(filepath)
+        removed = handler.cleaner(filepath, options)
+        bytes_after = os.path.getsize(filepath)
+        elapsed = time.perf_counter() - started
+    except Exception as e:
+        raise Exception(f"清除失败: {str(e)}")
+    return ScrubResult(filepath, handler.category, list(removed or []), bytes_before, bytes_after,
+                       elapsed, CATEGORY_CLEARED_MESSAGES[handler.category])
+
+
+def clear_file_properties(filepath, options=DEFAULT_OPTIONS):
+    """清除单个文件的属性，返回结果描述，失败时抛出异常"""
+    handler = detect_handler(filepath)
+    if handler is None:
+        return "不支持的文件类型"
+    return scrub_file(filepath, options, handler).message
+
+
+def format_summary_status(record):
+    """由 MetadataRecord 生成摘要中的状态行"""
+    if record.error:
+        return [f"状态: {record.error}"]
+
+    info = []
+    if record.has_metadata:
+        info.append(f"状态: 包含元数据 ({', '.join(sorted(record.flags))})")
+        if record.fields:
+            info.append(f"元数据字段: {len(record.fields)} 个")
+    else:
+        info.append("状态: 无元数据")
+    if 'pages' in record.counts:
+        info.append(f"页面数量: {record.counts['pages']}")
+    return info
+
+
+def format_probe_info(filepath, flags):
+    """由快速探测结果（元数据类型集合或None）生成摘要文本"""
+    info = [f"文件: {os.path.basename(filepath)}"]
+    info.append(f"路径: {filepath}")
+    info.append(f"大小: {format_file_size(os.path.getsize(filepath))}")
+
+    if flags is None:
+        info.append("状态: 无法检测")
+    elif flags:
+        info.append(f"状态: 包含元数据 ({', '.join(sorted(flags))})")
+    else:
+        info.append("状态: 无元数据")
+
+    return "\n".join(info)
+
+
+def format_summary_info(filepath, file_size, record):
+    """由文件大小和 MetadataRecord（可为None）生成摘要文本"""
+    info = [f"文件: {os.path.basename(filepath)}"]
+    info.append(f"路径: {filepath}")
+    info.append(f"大小: {format_file_size(file_size)}")
+    if record is not None:
+        info.extend(format_summary_status(record))
+    return "\n".join(info)
+
+
+def get_file_summary_info(filepath):
+    """获取文件摘要信息"""
+    try:
+        file_size = os.path.getsize(filepath)
+        return format_summary_info(filepath, file_size, read_metadata(filepath, SUMMARY_OPTIONS))
+
+    except Exception as e:
+        return f"文件 {filepath} 处理失败: {str(e)}"
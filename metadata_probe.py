@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+元数据快速探测
+只读取文件中有限的字节（JPEG/PNG/WebP/TIFF/HEIF的结构头、GIF的块头、PDF文件尾部的trailer、
+Office文档的ZIP中央目录和 docProps 部件），判断文件是否带有元数据，
+不解码图像、不解析PDF页面、不加载文档正文
+
+每个探测函数返回发现的元数据类型集合（空集合表示没有元数据），
+文件结构无法识别时抛出 ValueError
+"""
+
+import re
+import struct
+import zlib
+
+import image_streams
+import ooxml_streams
+
+# PDF文件尾部读取长度，足以覆盖trailer或交叉引用流字典
+PDF_TAIL_SIZE = 64 * 1024
+
+# PNG文件尾部读取长度，用于发现IDAT之后的文本块
+PNG_TAIL_SIZE = 64 * 1024
+
+# docProps 部件的最大读取长度，超过时只按存在与否判断
+OOXML_PART_LIMIT = 256 * 1024
+
+# APP1段的标识
+JPEG_EXIF_HEADER = b'Exif\x00\x00'
+JPEG_XMP_HEADERS = (b'http://ns.adobe.com/xap/1.0/\x00', b'http://ns.adobe.com/xmp/extension/\x00')
+
+PNG_CHUNK_FLAGS = {
+    b'tEXt': '文本',
+    b'zTXt': '文本',
+    b'iTXt': '文本',
+    b'eXIf': 'EXIF',
+    b'tIME': '时间',
+}
+
+
+def scan_jpeg(data, want_exif=False):
+    """解析映射中JPEG各段的段头直到第一个SOS，返回 (元数据类型集合, EXIF数据或None)
+
+    want_exif为True时返回第一个EXIF段的内容（bytes，包括 Exif 标识），否则不复制段内容
+    """
+    flags = set()
+    exif = None
+    for marker, _, payload, end in image_streams.iter_jpeg_segments(data):
+        if marker == image_streams.JPEG_APP1:
+            head = bytes(data[payload:min(end, payload + 35)])
+            if head.startswith(JPEG_EXIF_HEADER):
+                flags.add('EXIF')
+                if want_exif and exif is None:
+                    exif = bytes(data[payload:end])
+            elif head.startswith(JPEG_XMP_HEADERS):
+                flags.add('XMP')
+            else:
+                flags.add('APP1')
+        elif marker == image_streams.JPEG_APP13:
+            flags.add('IPTC')
+        elif marker == image_streams.JPEG_COM:
+            flags.add('注释')
+    return flags, exif
+
+
+def probe_jpeg(f):
+    """读取JPEG各段的段头直到第一个SOS，返回元数据类型集合"""
+    return _probe_mapped(f, scan_jpeg)
+
+
+def _probe_mapped(f, scanner):
+    with image_streams.map_file(f) as data:
+        return scanner(data)[0]
+
+
+def _png_tail_flags(tail):
+    """在文件尾部查找CRC正确的元数据块"""
+    flags = set()
+    for chunk_type, flag in PNG_CHUNK_FLAGS.items():
+        for match in re.finditer(re.escape(chunk_type), tail):
+            start = match.start()
+            if start < 4:
+                continue
+            length = struct.unpack('>I', tail[start - 4:start])[0]
+            end = start + 4 + length
+            if end + 4 > len(tail):
+                continue
+            crc = struct.unpack('>I', tail[end:end + 4])[0]
+            if zlib.crc32(tail[start:end]) & 0xFFFFFFFF == crc:
+                flags.add(flag)
+                break
+    return flags
+
+
+def scan_png(data, want_exif=False):
+    """解析映射中PNG的全部块头，返回 (元数据类型集合, eXIf块内容或None)
+
+    只访问块头所在的页面，IDAT数据不读取
+    """
+    flags = set()
+    exif = None
+    for chunk_type, _, start, end in image_streams.iter_png_chunks(data):
+        if chunk_type in PNG_CHUNK_FLAGS:
+            flags.add(PNG_CHUNK_FLAGS[chunk_type])
+            if chunk_type == b'eXIf' and want_exif and exif is None:
+                exif = bytes(data[start:end - 4])
+    return flags, exif
+
+
+def probe_png(f):
+    """读取PNG块头直到第一个IDAT，再检查文件尾部，返回元数据类型集合"""
+    with image_streams.map_file(f) as data:
+        if bytes(data[:8]) != image_streams.PNG_SIGNATURE:
+            raise ValueError("不是有效的PNG文件")
+        flags = set()
+        chunks = image_streams.iter_png_chunks(data)
+        try:
+            for chunk_type, _, _, _ in chunks:
+                if chunk_type == b'IDAT':
+                    break
+                if chunk_type in PNG_CHUNK_FLAGS:
+                    flags.add(PNG_CHUNK_FLAGS[chunk_type])
+                if chunk_type == b'IEND':
+                    return flags
+        except ValueError:
+            # 与完整解析不同，IDAT之前的块齐全即可给出结果
+            return flags
+        finally:
+            chunks.close()
+
+        # 文本块也可以出现在IDAT之后，通常紧挨着IEND
+        flags.update(_png_tail_flags(bytes(data[-PNG_TAIL_SIZE:])))
+        return flags
+
+
+def scan_webp(data, want_exif=False):
+    """解析映射中WebP的RIFF块头，返回 (元数据类型集合, EXIF块内容或None)"""
+    flags = set()
+    exif = None
+    for chunk_type, _, start, end in image_streams.iter_riff_chunks(data):
+        if chunk_type in image_streams.WEBP_METADATA_CHUNKS:
+            flags.add(image_streams.WEBP_METADATA_CHUNKS[chunk_type])
+            if chunk_type == b'EXIF' and want_exif and exif is None:
+                exif = bytes(data[start:end])
+    return flags, exif
+
+
+def probe_webp(f):
+    """读取WebP的RIFF块头，返回元数据类型集合"""
+    return _probe_mapped(f, scan_webp)
+
+
+def scan_gif(data, want_exif=False):
+    """解析映射中GIF的块结构，返回 (元数据类型集合, None)；GIF没有EXIF"""
+    flags = set()
+    for label, start, _ in image_streams.iter_gif_blocks(data):
+        if label == image_streams.GIF_COMMENT_LABEL:
+            flags.add('注释')
+        elif label == image_streams.GIF_APPLICATION_LABEL:
+            identifier = image_streams.gif_application_id(data, start)
+            if identifier == image_streams.GIF_XMP_APPLICATION:
+                flags.add('XMP')
+            elif identifier not in image_streams.GIF_KEEP_APPLICATIONS:
+                flags.add('应用扩展')
+    return flags, None
+
+
+def probe_gif(f):
+    """读取GIF各块的块头（图像数据只读取子块长度），返回元数据类型集合"""
+    return _probe_mapped(f, scan_gif)
+
+
+# TIFF元数据标签对应的类型，未列出的为文本标签
+TIFF_TAG_FLAGS = {
+    700: 'XMP',
+    33723: 'IPTC',
+    34377: 'IPTC',
+    image_streams.TIFF_EXIF_IFD: 'EXIF',
+    image_streams.TIFF_GPS_IFD: 'GPS',
+}
+
+
+def scan_tiff(data, want_exif=False):
+    """解析映射中TIFF各页的IFD，返回 (元数据类型集合, None)；EXIF字段由调用方按IFD读取"""
+    _, ifds = image_streams.read_tiff_ifds(data)
+    flags = set()
+    for _, entries, _, _ in ifds:
+        for entry in entries:
+            if entry[0] in image_streams.TIFF_METADATA_TAGS:
+                flags.add(TIFF_TAG_FLAGS.get(entry[0], '文本'))
+    return flags, None
+
+
+def probe_tiff(f):
+    """读取TIFF各页的IFD，返回元数据类型集合"""
+    return _probe_mapped(f, scan_tiff)
+
+
+def scan_heif(data, want_exif=False):
+    """解析映射中HEIF的 meta box，返回 (元数据类型集合, TIFF结构的EXIF数据或None)
+
+    已被清空的Exif/XMP项目不计入
+    """
+    flags = set()
+    exif = None
+    for kind, extents in image_streams.heif_metadata_items(data):
+        payload = image_streams.heif_item_bytes(data, extents)
+        if image_streams.heif_item_is_empty(kind, payload):
+            continue
+        flags.add(kind)
+        if kind == 'EXIF' and want_exif and exif is None:
+            exif = image_streams.heif_exif_tiff(payload)
+    return flags, exif
+
+
+def probe_heif(f):
+    """读取HEIF的 meta box 和其中登记的Exif/XMP项目，返回元数据类型集合"""
+    return _probe_mapped(f, scan_heif)
+
+
+_PDF_INFO_PATTERN = re.compile(rb'/Info\s+\d+\s+\d+\s+R')
+_PDF_ROOT_PATTERN = re.compile(rb'/Root\s+(\d+)\s+(\d+)\s+R')
+_PDF_METADATA_PATTERN = re.compile(rb'/Metadata\s+\d+\s+\d+\s+R')
+_PDF_XREF_STREAM_PATTERN = re.compile(rb'/Type\s*/XRef\b')
+
+
+def probe_pdf(f):
+    """读取PDF文件尾部，根据最后一个trailer（或交叉引用流字典）判断
+
+    trailer引用了Info字典时记为 Info；目录对象也在尾部范围内且引用了XMP流时记为 XMP
+    """
+    f.seek(0, 2)
+    size = f.tell()
+    f.seek(max(0, size - PDF_TAIL_SIZE))
+    tail = f.read(PDF_TAIL_SIZE)
+    if b'%%EOF' not in tail:
+        raise ValueError("PDF文件尾部损坏")
+
+    flags = set()
+    # 增量更新时以最后一个trailer（或交叉引用流对象）为准
+    position = tail.rfind(b'trailer')
+    xref_stream = None
+    for xref_stream in _PDF_XREF_STREAM_PATTERN.finditer(tail, max(position, 0)):
+        pass
+    if xref_stream:
+        position = tail.rfind(b'obj', 0, xref_stream.start())
+    if position < 0:
+        return flags
+    if _PDF_INFO_PATTERN.search(tail, position):
+        flags.add('Info')
+
+    root = _PDF_ROOT_PATTERN.search(tail, position)
+    if root:
+        header = re.compile(rb'(?<!\d)' + root.group(1) + rb'\s+' + root.group(2) + rb'\s+obj\b')
+        catalog = None
+        for catalog in header.finditer(tail):
+            pass
+        if catalog:
+            end = tail.find(b'endobj', catalog.end())
+            if _PDF_METADATA_PATTERN.search(tail, catalog.end(), end if end >= 0 else len(tail)):
+                flags.add('XMP')
+    return flags
+
+
+def probe_ooxml(f):
+    """读取ZIP中央目录和 docProps 部件，返回元数据类型集合（core/app/custom）"""
+    entries, _ = ooxml_streams.read_central_directory(f)
+    if entries is None:
+        raise ValueError("不支持ZIP64格式的快速探测")
+
+    flags = set()
+    parts = {entry['name']: entry for entry in entries}
+    for name, prefix in ((ooxml_streams.CORE_PART, 'core'), (ooxml_streams.APP_PART, 'app'),
+                         (ooxml_streams.CUSTOM_PART, 'custom')):
+        entry = parts.get(name)
+        if entry is None:
+            continue
+        if entry['compress_size'] > OOXML_PART_LIMIT:
+            flags.add(prefix)
+            continue
+        data = ooxml_streams.read_member(f, entry)
+        _, removed = ooxml_streams.PART_SCRUBBERS[name](data)
+        if removed:
+            flags.add(prefix)
+    return flags
+
+
+def probe_file(filepath, prober):
+    """以二进制方式打开文件并调用探测函数"""
+    with open(filepath, 'rb') as f:
+        return prober(f)
+
+
+def scan_image_file(filepath, scanner):
+    """映射图片文件并用 scan_jpeg / scan_png 解析，返回 (元数据类型集合, EXIF数据或None)"""
+    with open(filepath, 'rb') as f, image_streams.map_file(f) as data:
+        return scanner(data, want_exif=True)
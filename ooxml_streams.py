@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Office Open XML（DOCX/XLSX/PPTX）属性流式清除
+在ZIP层面工作：只重写 docProps/core.xml、app.xml、custom.xml 三个部件，
+其余成员连同压缩数据原样复制，不解压、不重新压缩，内存占用与文件大小无关
+"""
+
+import re
+import struct
+import zlib
+import zipfile
+
+CORE_PART = 'docProps/core.xml'
+APP_PART = 'docProps/app.xml'
+CUSTOM_PART = 'docProps/custom.xml'
+
+# core.xml 中需要清空的元素（本地名称）
+CORE_FIELDS = ('title', 'subject', 'creator', 'keywords', 'description',
+               'lastModifiedBy', 'category')
+
+# app.xml 中需要清空的元素
+APP_FIELDS = ('Company', 'Manager', 'HyperlinkBase')
+
+# 可被清除的字段（不含 custom:*）
+SCRUBBED_FIELDS = tuple(f"core:{name}" for name in CORE_FIELDS) + tuple(f"app:{name}" for name in APP_FIELDS)
+
+# ZIP结构签名和长度
+LOCAL_HEADER_SIGNATURE = b'PK\x03\x04'
+CENTRAL_HEADER_SIGNATURE = b'PK\x01\x02'
+END_RECORD_SIGNATURE = b'PK\x05\x06'
+DATA_DESCRIPTOR_SIGNATURE = b'PK\x07\x08'
+LOCAL_HEADER_SIZE = 30
+CENTRAL_HEADER_SIZE = 46
+END_RECORD_SIZE = 22
+MAX_COMMENT_SIZE = 0xFFFF
+
+FLAG_DATA_DESCRIPTOR = 0x08
+FLAG_UTF8 = 0x800
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+def _element_pattern(name):
+    """匹配带任意命名空间前缀、含文本内容的元素"""
+    return re.compile(
+        r'<(?P<tag>(?:[\w.-]+:)?' + re.escape(name) + r')(?P<attrs>(?:\s[^>]*)?)>'
+        r'(?P<text>.*?)</(?P=tag)\s*>', re.S)
+
+
+_CORE_PATTERNS = [(name, _element_pattern(name)) for name in CORE_FIELDS]
+_APP_PATTERNS = [(name, _element_pattern(name)) for name in APP_FIELDS]
+_CUSTOM_PROPERTY_PATTERN = re.compile(
+    r'<(?P<tag>(?:[\w.-]+:)?property)\b(?P<attrs>[^>]*?)(?:/>|>.*?</(?P=tag)\s*>)\s*', re.S)
+_NAME_ATTR_PATTERN = re.compile(r'\bname\s*=\s*"([^"]*)"')
+
+
+def _blank_elements(text, patterns, prefix):
+    """清空匹配元素的文本，返回 (新文本, 被清除的字段名列表)"""
+    removed = []
+    for name, pattern in patterns:
+        def blank(match, name=name):
+            if match.group('text').strip():
+                removed.append(f"{prefix}{name}")
+            return f"<{match.group('tag')}{match.group('attrs')}></{match.group('tag')}>"
+        text = pattern.sub(blank, text)
+    return text, removed
+
+
+def scrub_core_xml(data):
+    text, removed = _blank_elements(data.decode('utf-8'), _CORE_PATTERNS, 'core:')
+    return text.encode('utf-8'), removed
+
+
+def scrub_app_xml(data):
+    text, removed = _blank_elements(data.decode('utf-8'), _APP_PATTERNS, 'app:')
+    return text.encode('utf-8'), removed
+
+
+def scrub_custom_xml(data):
+    """删除全部自定义属性，保留根元素"""
+    removed = []
+
+    def drop(match):
+        name = _NAME_ATTR_PATTERN.search(match.group('attrs'))
+        removed.append(f"custom:{name.group(1) if name else '?'}")
+        return ''
+
+    text = _CUSTOM_PROPERTY_PATTERN.sub(drop, data.decode('utf-8'))
+    return text.encode('utf-8'), removed
+
+
+PART_SCRUBBERS = {
+    CORE_PART: scrub_core_xml,
+    APP_PART: scrub_app_xml,
+    CUSTOM_PART: scrub_custom_xml,
+}
+
+
+def _read_exact(src, size):
+    data = src.read(size)
+    if len(data) != size:
+        raise ValueError("文件不完整")
+    return data
+
+
+def _copy_exact(src, dst, size):
+    while size > 0:
+        data = src.read(min(size, COPY_BUFFER_SIZE))
+        if not data:
+            raise ValueError("文件不完整")
+        dst.write(data)
+        size -= len(data)
+
+
+def _find_end_record(src):
+    """定位中央目录结束记录，返回 (记录偏移, 记录字节)"""
+    src.seek(0, 2)
+    file_size = src.tell()
+    tail_size = min(file_size, END_RECORD_SIZE + MAX_COMMENT_SIZE)
+    src.seek(file_size - tail_size)
+    tail = src.read(tail_size)
+    pos = tail.rfind(END_RECORD_SIGNATURE)
+    if pos < 0 or len(tail) - pos < END_RECORD_SIZE:
+        raise ValueError("不是有效的ZIP文件")
+    return file_size - tail_size + pos, tail[pos:]
+
+
+def read_central_directory(src):
+    """读取中央目录，返回 (条目列表, 结束记录字节)；遇到ZIP64时返回 (None, None)"""
+    _, end_record = _find_end_record(src)
+    (_, disk, cd_disk, disk_entries, total_entries,
+     cd_size, cd_offset, comment_len) = struct.unpack('<4s4H2LH', end_record[:END_RECORD_SIZE])
+    if disk != 0 or cd_disk != 0 or disk_entries != total_entries:
+        raise ValueError("不支持分卷ZIP文件")
+    if total_entries == 0xFFFF or cd_size == 0xFFFFFFFF or cd_offset == 0xFFFFFFFF:
+        return None, None
+
+    src.seek(cd_offset)
+    directory = _read_exact(src, cd_size)
+    entries = []
+    pos = 0
+    for _ in range(total_entries):
+        if directory[pos:pos + 4] != CENTRAL_HEADER_SIGNATURE:
+            raise ValueError("ZIP中央目录损坏")
+        fields = struct.unpack('<4s6H3L5H2L', directory[pos:pos + CENTRAL_HEADER_SIZE])
+        compress_size, file_size = fields[8], fields[9]
+        name_len, extra_len, entry_comment_len = fields[10], fields[11], fields[12]
+        header_offset = fields[16]
+        if 0xFFFFFFFF in (compress_size, file_size, header_offset):
+            return None, None
+        record_len = CENTRAL_HEADER_SIZE + name_len + extra_len + entry_comment_len
+        record = directory[pos:pos + record_len]
+        name_bytes = record[CENTRAL_HEADER_SIZE:CENTRAL_HEADER_SIZE + name_len]
+        flags = fields[3]
+        name = name_bytes.decode('utf-8' if flags & FLAG_UTF8 else 'cp437')
+        entries.append({
+            'name': name,
+            'name_bytes': name_bytes,
+            'flags': flags,
+            'compress_size': compress_size,
+            'header_offset': header_offset,
+            'record': bytearray(record),
+        })
+        pos += record_len
+    return entries, bytearray(end_record[:END_RECORD_SIZE + comment_len])
+
+
+def _copy_member_raw(src, dst, entry):
+    """原样复制成员的本地文件头、压缩数据和数据描述符"""
+    src.seek(entry['header_offset'])
+    header = _read_exact(src, LOCAL_HEADER_SIZE)
+    if header[:4] != LOCAL_HEADER_SIGNATURE:
+        raise ValueError("ZIP本地文件头损坏")
+    name_len, extra_len = struct.unpack('<2H', header[26:30])
+    dst.write(header)
+    _copy_exact(src, dst, name_len + extra_len + entry['compress_size'])
+
+    if entry['flags'] & FLAG_DATA_DESCRIPTOR:
+        descriptor = src.read(16)
+        size = 16 if descriptor[:4] == DATA_DESCRIPTOR_SIGNATURE else 12
+        dst.write(descriptor[:size])
+
+
+def _write_member(dst, entry, data):
+    """以deflate压缩写入重写后的成员，并更新中央目录记录"""
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+    compressed = compressor.compress(data) + compressor.flush()
+    crc = zlib.crc32(data) & 0xFFFFFFFF
+    flags = entry['flags'] & FLAG_UTF8
+
+    record = entry['record']
+    mod_time, mod_date = struct.unpack('<2H', record[12:16])
+    dst.write(struct.pack('<4s5H3L2H', LOCAL_HEADER_SIGNATURE, 20, flags, zipfile.ZIP_DEFLATED,
+                          mod_time, mod_date, crc, len(compressed), len(data),
+                          len(entry['name_bytes']), 0))
+    dst.write(entry['name_bytes'])
+    dst.write(compressed)
+
+    struct.pack_into('<2H', record, 8, flags, zipfile.ZIP_DEFLATED)
+    struct.pack_into('<3L', record, 16, crc, len(compressed), len(data))
+
+
+def read_member(src, entry):
+    """读取并解压单个成员（仅用于体积很小的 docProps 部件）"""
+    src.seek(entry['header_offset'])
+    header = _read_exact(src, LOCAL_HEADER_SIZE)
+    name_len, extra_len = struct.unpack('<2H', header[26:30])
+    src.seek(name_len + extra_len, 1)
+    raw = _read_exact(src, entry['compress_size'])
+    method = struct.unpack('<H', entry['record'][10:12])[0]
+    if method == zipfile.ZIP_STORED:
+        return raw
+    if method == zipfile.ZIP_DEFLATED:
+        return zlib.decompress(raw, -15)
+    raise ValueError(f"不支持的压缩方式: {method}")
+
+
+def _scrub_with_zipfile(src_path, dst_path):
+    """ZIP64等特殊情况的后备方案：通过zipfile逐个成员流式复制"""
+    removed = []
+    with zipfile.ZipFile(src_path) as zin, zipfile.ZipFile(dst_path, 'w', allowZip64=True) as zout:
+        for info in zin.infolist():
+            scrubber = PART_SCRUBBERS.get(info.filename)
+            if scrubber is not None:
+                data, fields = scrubber(zin.read(info))
+                removed.extend(fields)
+                zout.writestr(info, data, compress_type=zipfile.ZIP_DEFLATED)
+                continue
+            with zin.open(info) as member, zout.open(info, 'w', force_zip64=True) as out:
+                while True:
+                    chunk = member.read(COPY_BUFFER_SIZE)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+    return removed
+
+
+def scrub_ooxml_file(src_path, dst_path):
+    """把 src_path 中的Office文档复制到 dst_path，清除 docProps 中的属性
+
+    返回被清除的字段名列表，如 ['core:creator', 'app:Company', 'custom:项目']。
+    """
+    removed = []
+    with open(src_path, 'rb') as src:
+        entries, end_record = read_central_directory(src)
+        if entries is not None:
+            with open(dst_path, 'wb') as dst:
+                for entry in entries:
+                    offset = dst.tell()
+                    scrubber = PART_SCRUBBERS.get(entry['name'])
+                    if scrubber is None:
+                        _copy_member_raw(src, dst, entry)
+                    else:
+                        data, fields = scrubber(read_member(src, entry))
+                        removed.extend(fields)
+                        _write_member(dst, entry, data)
+                    struct.pack_into('<L', entry['record'], 42, offset)
+
+                cd_offset = dst.tell()
+                for entry in entries:
+                    dst.write(entry['record'])
+                cd_size = dst.tell() - cd_offset
+                struct.pack_into('<2L', end_record, 12, cd_size, cd_offset)
+                dst.write(end_record)
+            return removed
+
+    return _scrub_with_zipfile(src_path, dst_path)
+
+
+def _element_texts(text, names, prefix):
+    properties = {}
+    for name in names:
+        match = _element_pattern(name).search(text)
+        if match and match.group('text').strip():
+            properties[f"{prefix}{name}"] = match.group('text').strip()
+    return properties
+
+
+def read_document_properties(filepath):
+    """读取 docProps 中的属性，返回 {'core:creator': 文本, 'app:Company': 文本, 'custom:名称': 文本, ...}
+
+    只解压三个 docProps 部件，不解析文档正文；空值不返回
+    """
+    properties = {}
+    with zipfile.ZipFile(filepath) as archive:
+        names = set(archive.namelist())
+        if CORE_PART in names:
+            text = archive.read(CORE_PART).decode('utf-8')
+            properties.update(_element_texts(
+                text, CORE_FIELDS + ('revision', 'created', 'modified', 'lastPrinted'), 'core:'))
+        if APP_PART in names:
+            text = archive.read(APP_PART).decode('utf-8')
+            properties.update(_element_texts(text, APP_FIELDS, 'app:'))
+        if CUSTOM_PART in names:
+            text = archive.read(CUSTOM_PART).decode('utf-8')
+            for match in _CUSTOM_PROPERTY_PATTERN.finditer(text):
+                name = _NAME_ATTR_PATTERN.search(match.group('attrs'))
+                value = re.sub(r'<[^>]+>', '', match.group(0)).strip()
+                properties[f"custom:{name.group(1) if name else '?'}"] = value
+    return properties
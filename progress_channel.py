@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量处理进度通道
+工作线程写入进度和结果文本，界面线程按固定帧率一次取走自上一帧以来的全部更新，
+避免每处理一个文件就向Tk事件队列投递一次回调；
+待显示的文本超过上限时写入方等待界面取走，内存占用有上限
+"""
+
+import time
+import threading
+import collections
+
+# 计算处理速度的滑动时间窗口（秒）
+RATE_WINDOW = 5.0
+
+# 等待界面取走的文本上限（字符数）
+MAX_PENDING_CHARS = 4 * 1024 * 1024
+
+
+class ProgressFrame:
+    """一帧的更新：新增文本、完成数、总数、速度（个/秒）、预计剩余秒数和是否已结束"""
+
+    __slots__ = ('text', 'done', 'total', 'rate', 'eta', 'finished')
+
+    def __init__(self, text, done, total, rate, eta, finished):
+        self.text = text
+        self.done = done
+        self.total = total
+        self.rate = rate
+        self.eta = eta
+        self.finished = finished
+
+
+class ProgressChannel:
+    """线程安全的进度与结果通道，一个写入方（工作线程）对应一个读取方（界面线程）"""
+
+    def __init__(self, total, max_pending_chars=MAX_PENDING_CHARS):
+        self.total = total
+        self.max_pending_chars = max_pending_chars
+        self._condition = threading.Condition()
+        self._chunks = []
+        self._pending_chars = 0
+        self._done = 0
+        self._finished = False
+        self._samples = collections.deque([(time.monotonic(), 0)])
+
+    def publish(self, text, advance=1):
+        """追加一段结果文本并把完成数增加 advance；待显示文本过多时等待界面取走"""
+        with self._condition:
+            while self._pending_chars > self.max_pending_chars and not self._finished:
+                self._condition.wait()
+            if text:
+                self._chunks.append(text)
+                self._pending_chars += len(text)
+            self._done += advance
+
+    def finish(self, text=""):
+        """写入最后一段文本并标记结束"""
+        with self._condition:
+            if text:
+                self._chunks.append(text)
+                self._pending_chars += len(text)
+            self._finished = True
+            self._condition.notify_all()
+
+    def _rate(self, now):
+        """按滑动窗口估算处理速度"""
+        self._samples.append((now, self._done))
+        while len(self._samples) > 2 and now - self._samples[1][0] > RATE_WINDOW:
+            self._samples.popleft()
+        start_time, start_done = self._samples[0]
+        if now <= start_time:
+            return 0.0
+        return (self._done - start_done) / (now - start_time)
+
+    def take_frame(self):
+        """取走自上一帧以来的全部更新，返回 ProgressFrame"""
+        with self._condition:
+            text = "".join(self._chunks)
+            self._chunks = []
+            self._pending_chars = 0
+            self._condition.notify_all()
+            rate = self._rate(time.monotonic())
+            remaining = max(0, self.total - self._done)
+            eta = remaining / rate if rate > 0 else None
+            return ProgressFrame(text, self._done, self.total, rate, eta, self._finished)
+
+
+def format_eta(seconds):
+    """把预计剩余秒数格式化为 时:分:秒"""
+    if seconds is None:
+        return "--:--"
+    seconds = int(seconds + 0.5)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes:02d}:{seconds:02d}"
+
+
+def format_frame_status(frame):
+    """生成状态栏文字：进度、速度和预计剩余时间"""
+    status = f"{frame.done}/{frame.total} 个文件 | {frame.rate:.1f} 个/秒"
+    if not frame.finished:
+        status += f" | 预计剩余 {format_eta(frame.eta)}"
+    return status
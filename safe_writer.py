@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+原子替换输出文件
+在目标文件所在目录创建唯一命名的临时文件，写完后按持久化级别同步到磁盘，
+再复制原文件的权限、属主和扩展属性，以 os.replace 原子替换目标文件；出错时删除临时文件。
+复制整个文件时优先使用reflink（FICLONE）共享数据块，其次由内核复制（copy_file_range）
+"""
+
+import os
+import stat
+import shutil
+import tempfile
+
+# 持久化级别
+DURABILITY_NONE = 'none'       # 不同步，依赖操作系统回写
+DURABILITY_FILE = 'file'       # 替换前同步临时文件，断电后不会得到空文件或半个文件
+DURABILITY_DIRECTORY = 'dir'   # 另外同步所在目录，替换本身在断电后也不会丢失
+DURABILITY_LEVELS = (DURABILITY_NONE, DURABILITY_FILE, DURABILITY_DIRECTORY)
+
+TEMP_SUFFIX = '.tmp'
+
+# Linux FICLONE ioctl：在支持的文件系统（btrfs、XFS等）上共享数据块
+FICLONE = 0x40049409
+
+COPY_CHUNK_SIZE = 64 * 1024 * 1024
+
+
+def _fsync_path(path):
+    """同步文件内容到磁盘；macOS上使用F_FULLFSYNC让磁盘也写出缓存"""
+    fd = os.open(path, os.O_RDWR | getattr(os, 'O_BINARY', 0))
+    try:
+        try:
+            import fcntl
+            if hasattr(fcntl, 'F_FULLFSYNC'):
+                fcntl.fcntl(fd, fcntl.F_FULLFSYNC)
+                return
+        except (ImportError, OSError):
+            pass
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def fsync_directory(directory):
+    """同步目录项；Windows不支持打开目录，直接跳过"""
+    try:
+        fd = os.open(directory, os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0))
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def copy_file_metadata(src_path, dst_path):
+    """把 src_path 的权限位、属主和扩展属性复制到 dst_path，无权复制的部分跳过"""
+    st = os.stat(src_path)
+    if hasattr(os, 'chown'):
+        for uid, gid in ((st.st_uid, st.st_gid), (-1, st.st_gid)):
+            try:
+                os.chown(dst_path, uid, gid)
+                break
+            except OSError:
+                continue
+    os.chmod(dst_path, stat.S_IMODE(st.st_mode))
+    if hasattr(os, 'listxattr'):
+        try:
+            names = os.listxattr(src_path)
+        except OSError:
+            names = []
+        for name in names:
+            try:
+                os.setxattr(dst_path, name, os.getxattr(src_path, name))
+            except OSError:
+                continue
+
+
+def _reflink(src, dst):
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    try:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    except OSError:
+        return False
+    return True
+
+
+def _copy_file_range(src, dst):
+    """由内核复制整个文件，不支持时返回False（此时尚未写入任何数据）"""
+    if not hasattr(os, 'copy_file_range'):
+        return False
+    copied_any = False
+    while True:
+        try:
+            copied = os.copy_file_range(src.fileno(), dst.fileno(), COPY_CHUNK_SIZE)
+        except OSError:
+            if copied_any:
+                raise
+            return False
+        if copied == 0:
+            return copied_any or os.fstat(src.fileno()).st_size == 0
+        copied_any = True
+
+
+def clone_file(src_path, dst_path):
+    """把 src_path 的内容写到 dst_path（覆盖），返回所用方式 'reflink'、'copy_file_range' 或 'copy'"""
+    with open(src_path, 'rb') as src, open(dst_path, 'wb') as dst:
+        if _reflink(src, dst):
+            return 'reflink'
+        if _copy_file_range(src, dst):
+            return 'copy_file_range'
+        shutil.copyfileobj(src, dst, COPY_CHUNK_SIZE)
+        return 'copy'
+
+
+class AtomicOutput:
+    """目标文件的原子替换输出
+
+    path 为同目录下的临时文件，由调用方写入；commit() 时按 durability 同步，复制原文件的权限、属主和
+    扩展属性（preserve为True且目标存在时）后替换目标；discard() 删除临时文件。作为上下文管理器使用时，
+    正常退出自动 commit，出现异常时自动 discard
+    """
+
+    def __init__(self, target, durability=DURABILITY_FILE, preserve=True):
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"未知的持久化级别: {durability}")
+        # 目标为符号链接时替换链接指向的文件，链接本身保留
+        self.target = os.path.realpath(target)
+        self.durability = durability
+        self.preserve = preserve
+        self.directory = os.path.dirname(self.target)
+        fd, self.path = tempfile.mkstemp(prefix='.' + os.path.basename(self.target) + '.',
+                                         suffix=TEMP_SUFFIX, dir=self.directory)
+        os.close(fd)
+        self._done = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.discard()
+        elif not self._done:
+            self.commit()
+
+    def commit(self):
+        """用临时文件替换目标文件"""
+        if self._done:
+            return
+        try:
+            # 先同步再复制权限：目标为只读时临时文件复制权限后将无法以写方式打开
+            if self.durability != DURABILITY_NONE:
+                _fsync_path(self.path)
+            if self.preserve and os.path.exists(self.target):
+                copy_file_metadata(self.target, self.path)
+            os.replace(self.path, self.target)
+        except BaseException:
+            self.discard()
+            raise
+        self._done = True
+        if self.durability == DURABILITY_DIRECTORY:
+            fsync_directory(self.directory)
+
+    def discard(self):
+        """放弃输出，删除临时文件"""
+        if self._done:
+            return
+        self._done = True
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
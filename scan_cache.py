@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+持久化扫描缓存
+用SQLite（WAL模式）记录每个文件的快速探测结果和“已清除”状态，
+以 (路径, 大小, mtime_ns, inode) 判断文件是否变化；未变化的文件再次扫描时只需一次stat
+"""
+
+import os
+import json
+import time
+import sqlite3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path       TEXT PRIMARY KEY,
+    size       INTEGER NOT NULL,
+    mtime_ns   INTEGER NOT NULL,
+    inode      INTEGER NOT NULL,
+    flags      TEXT,
+    scrubbed   INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_updated_at ON files (updated_at);
+"""
+
+CACHED_SCRUBBED_MESSAGE = "属性此前已清除，文件未变化，已跳过"
+
+
+def default_cache_path():
+    """默认缓存位置：Windows为 %LOCALAPPDATA%，其他系统为 ~/.cache"""
+    base = os.environ.get('LOCALAPPDATA') or os.environ.get('XDG_CACHE_HOME') \
+        or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'file_properties_manager', 'scan_cache.sqlite3')
+
+
+def _file_key(filepath, stat_result=None):
+    stat = stat_result if stat_result is not None else os.stat(filepath)
+    return stat.st_size, stat.st_mtime_ns, stat.st_ino
+
+
+class ScanCache:
+    """文件扫描缓存，同一实例只能在创建它的线程中使用
+
+    max_entries  最多保留的记录数，超出时删除最久未更新的记录
+    max_age_days 超过该天数未更新的记录在打开和关闭时删除
+    """
+
+    def __init__(self, path=None, max_entries=None, max_age_days=None):
+        self.path = path or default_cache_path()
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.evict()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if self.conn is not None:
+            self.evict()
+            self.conn.close()
+            self.conn = None
+
+    def lookup(self, filepath, stat_result=None):
+        """返回文件未变化时的缓存记录 {'flags': 集合或None, 'scrubbed': bool}，否则返回None"""
+        try:
+            key = _file_key(filepath, stat_result)
+        except OSError:
+            return None
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, inode, flags, scrubbed FROM files WHERE path = ?",
+            (filepath,)).fetchone()
+        if row is None or tuple(row[:3]) != key:
+            return None
+        flags = set(json.loads(row[3])) if row[3] is not None else None
+        return {'flags': flags, 'scrubbed': bool(row[4])}
+
+    def _store(self, filepath, flags, scrubbed, stat_result=None):
+        size, mtime_ns, inode = _file_key(filepath, stat_result)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO files (path, size, mtime_ns, inode, flags, scrubbed, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (filepath, size, mtime_ns, inode,
+             json.dumps(sorted(flags)) if flags is not None else None,
+             1 if scrubbed else 0, time.time()))
+        self.conn.commit()
+
+    def store_probe(self, filepath, flags, stat_result=None):
+        """记录快速探测结果；flags为None表示无法判断"""
+        self._store(filepath, flags, False, stat_result)
+
+    def mark_scrubbed(self, filepath, stat_result=None):
+        """记录文件已清除，以清除后的文件状态为准"""
+        self._store(filepath, set(), True, stat_result)
+
+    def evict(self, max_entries=None, max_age_days=None):
+        """按记录数和最后更新时间淘汰旧记录，返回删除的记录数"""
+        max_entries = max_entries if max_entries is not None else self.max_entries
+        max_age_days = max_age_days if max_age_days is not None else self.max_age_days
+        removed = 0
+        if max_age_days is not None:
+            cutoff = time.time() - max_age_days * 86400
+            removed += self.conn.execute(
+                "DELETE FROM files WHERE updated_at < ?", (cutoff,)).rowcount
+        if max_entries is not None:
+            removed += self.conn.execute(
+                "DELETE FROM files WHERE path NOT IN "
+                "(SELECT path FROM files ORDER BY updated_at DESC LIMIT ?)",
+                (max_entries,)).rowcount
+        if removed:
+            self.conn.commit()
+        return removed
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+
+def partition(cache, files, action):
+    """把文件分为缓存命中和需要处理两部分，返回 ([(序号, 缓存记录)], [序号])
+
+    probe 命中条件为文件未变化且已有探测结果；clear 命中条件为文件自上次清除后未变化
+    """
+    hits, pending = [], []
+    for index, filepath in enumerate(files):
+        entry = cache.lookup(filepath)
+        if entry is not None and (
+                (action == 'probe' and entry['flags'] is not None) or
+                (action == 'clear' and entry['scrubbed'])):
+            hits.append((index, entry))
+        else:
+            pending.append(index)
+    return hits, pending
+
+
+def record_result(cache, action, filepath, flags=None):
+    """把成功的处理结果写入缓存；probe 的 flags 为探测到的元数据类型集合"""
+    if action == 'probe':
+        cache.store_probe(filepath, flags)
+    elif action == 'clear':
+        cache.mark_scrubbed(filepath)